@@ -1,3 +1,4 @@
+import argparse
 import customtkinter as ctk
 import sounddevice as sd
 import soundfile as sf
@@ -5,38 +6,83 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy import signal
 from scipy.fft import fft, fftfreq
-from scipy.spatial.distance import cosine, euclidean
-from scipy.stats import pearsonr
-from fastdtw import fastdtw
-import librosa
-import librosa.display
 import os
-import whisper
 import warnings
-import difflib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asr
+from audio_io import AudioCache, AudioLoader, read_audio
+from catalogue import SampleCatalog
+from instrumentation import metrics
+import comparaison
+from comparaison import CONFIG_CARACTERISTIQUES
+from corpus import AUDIO_EXTENSIONS
+from feature_store import FeatureStore, default_path
+from capture_buffer import CaptureBuffer, StreamingWavWriter, to_pcm16
+from dtw import FEATURE_CONFIG as CONFIG_DTW
+from streaming_features import ExtractorThread, StreamingFeatureExtractor
 import ssl
 import certifi
 
 # SSL pour whisper (mac)
 ssl._create_default_https_context = ssl._create_unverified_context
 
+MODELE_WHISPER = "base"
+
+
 class VoiceAuthApp:
-    def __init__(self):
+    def __init__(self, enregistrement_direct=False):
         # --- Variables d'enregistrement ---
         self.fs = 16000
-        self.audio_data = []
+        # Mode "direct sur disque" pour les longs enregistrements: l'audio est écrit au fil
+        # de l'eau dans un fichier temporaire, renommé à la validation
+        self.enregistrement_direct = enregistrement_direct
+        self.writer = None
+        self.fichier_temporaire = None
+        # Tampon préalloué pour 60 s, agrandi si nécessaire
+        self.capture = CaptureBuffer(channels=1, capacity=self.fs * 60)
         self.stream = None 
         self.is_recording = False
         self.audio_array = None
+        # Features DTW calculées pendant l'enregistrement (thread d'extraction), mises en cache à la validation
+        self.extraction_live = None
+        self.caracteristiques_live = None
         
-        self.whisper_model = None 
+        # Modèle Whisper chargé en arrière-plan dès le démarrage (pool partagé de asr.py)
+        self.chargement_whisper = asr.preload(MODELE_WHISPER)
         
         # --- Configuration des dossiers ---
-        dossier_script = os.path.dirname(os.path.abspath(__file__))
-        self.dossier_samples = os.path.join(dossier_script, "samples")
+        # À côté des scripts, comme les valeurs par défaut des autres outils (feature_store.default_path)
+        self.fichier_metriques = default_path("voice_metrics.json")
+        self.dossier_samples = default_path("samples")
 
         if not os.path.exists(self.dossier_samples):
             os.makedirs(self.dossier_samples)
+
+        # Cache disque des caractéristiques (partagé avec dtw.py et gmm.py)
+        self.feature_store = FeatureStore(default_path("feature_cache"))
+        # Catalogue des enregistrements (racine et sous-dossiers pNN/), mis à jour incrémentalement
+        self.catalogue = SampleCatalog(self.dossier_samples,
+                                       default_path("sample_catalog.sqlite"),
+                                       self.feature_store,
+                                       {"mvp": CONFIG_CARACTERISTIQUES, "dtw": CONFIG_DTW})
+        self.catalogue.sync()
+        # Features ajoutées au cache par d'autres outils (corpus.py, dtw.py...) depuis le dernier lancement
+        self.catalogue.refresh_features()
+
+        # Chaque fichier n'est décodé qu'une fois (16 kHz float32), pour les features comme pour Whisper
+        # (depuis les copies pré-transcodées de audio_cache/ quand elles existent)
+        self.audio = AudioLoader(sr=CONFIG_CARACTERISTIQUES["sr"],
+                                 audio_cache=AudioCache(default_path("audio_cache"),
+                                                        CONFIG_CARACTERISTIQUES["sr"]))
+        # Cache disque des transcriptions Whisper
+        self.cache_transcriptions = asr.TranscriptionCache(default_path("transcription_cache"))
+
+        # Analyse de comparaison en arrière-plan
+        self.analyse_en_cours = None
+        self.analyse_annulee = None
+        self.file_progression = None
         
         # --- Configuration de l'interface (CTK) ---
         ctk.set_appearance_mode("dark")
@@ -84,6 +130,16 @@ class VoiceAuthApp:
         )
         self.btn_stop.pack(pady=10)
 
+        # Mode direct sur disque pour les longs enregistrements (mémoire constante)
+        self.case_direct = ctk.CTkCheckBox(
+            self.main_frame,
+            text="Écriture directe sur disque (longs enregistrements)",
+            font=("Arial", 12)
+        )
+        if self.enregistrement_direct:
+            self.case_direct.select()
+        self.case_direct.pack(pady=5)
+
         self.entry_nom = ctk.CTkEntry(
             self.main_frame,
             placeholder_text="Entrez votre nom",
@@ -262,6 +318,18 @@ class VoiceAuthApp:
         )
         self.btn_comparer.pack(pady=10)
 
+        self.btn_annuler = ctk.CTkButton(
+            self.main_frame,
+            text="Annuler l'analyse",
+            command=self.annuler_comparaison,
+            font=("Arial", 14),
+            height=35,
+            width=250,
+            fg_color="gray",
+            state="disabled"
+        )
+        self.btn_annuler.pack(pady=5)
+
         # --- Bouton Quitter ---
         self.btn_quit = ctk.CTkButton(
             self.main_frame,
@@ -273,26 +341,29 @@ class VoiceAuthApp:
             fg_color="red"
         )
         self.btn_quit.pack(pady=20) 
+
+        self.app.after(200, self.surveiller_chargement_whisper)
     
     # --- Fonctions d'enregistrement ---
     
     def charger_liste_fichiers(self):
-        """Charge la liste des fichiers WAV depuis le dossier samples"""
+        """Liste des enregistrements du catalogue (sous-dossiers compris, ex. "p05/Simon_1")"""
         try:
-            fichiers_wav = []
-            fichiers = os.listdir(self.dossier_samples)
-            for fichier in fichiers:
-                chemin_complet = os.path.join(self.dossier_samples, fichier)
-                # Vérifier que c'est un fichier (pas un dossier) et qu'il se termine par .wav
-                if os.path.isfile(chemin_complet) and fichier.endswith(".wav"):
-                    # Enlever l'extension .wav
-                    nom_sans_extension = fichier.replace('.wav', '')
-                    fichiers_wav.append(nom_sans_extension)
-
-            return sorted(fichiers_wav) if fichiers_wav else ["Aucun fichier"]
+            fichiers = []
+            for chemin in self.catalogue.list_paths():
+                # Enlever l'extension .wav (les autres formats la gardent)
+                fichiers.append(chemin[:-4] if chemin.endswith(".wav") else chemin)
+
+            return sorted(fichiers) if fichiers else ["Aucun fichier"]
         except Exception as e:
             print(f"Erreur lors du chargement des fichiers: {e}")
             return ["Erreur de chargement"]
+
+    def chemin_sample(self, nom):
+        """Chemin complet d'une entrée de la liste"""
+        if os.path.splitext(nom)[1].lower() in AUDIO_EXTENSIONS:
+            return os.path.join(self.dossier_samples, nom)
+        return os.path.join(self.dossier_samples, nom + ".wav")
     
     def mettre_a_jour_liste(self):
         fichiers = self.charger_liste_fichiers()
@@ -303,18 +374,38 @@ class VoiceAuthApp:
     def audio_callback(self, indata, frames, time, status):
         if status:
             print(f"Erreur audio: {status}")
-        self.audio_data.append(indata.copy())
+        if self.writer is not None:
+            self.writer.write(indata)
+        else:
+            self.capture.write(indata)
+        if self.extraction_live is not None:
+            # Valeurs PCM 16 bits du fichier qui sera écrit: features identiques à celles du fichier
+            self.extraction_live.push(to_pcm16(indata) / 32768.0)
     
     def start_recording(self):
         self.is_recording = True
-        self.audio_data = []
         self.audio_array = None
+        self.capture.reset()
+        if self.fichier_temporaire is not None:
+            # Prise directe précédente jamais validée
+            if os.path.exists(self.fichier_temporaire):
+                os.remove(self.fichier_temporaire)
+            self.fichier_temporaire = None
+        self.enregistrement_direct = bool(self.case_direct.get())
+        if self.enregistrement_direct:
+            self.fichier_temporaire = os.path.join(self.dossier_samples, ".enregistrement_en_cours.wav")
+            self.writer = StreamingWavWriter(self.fichier_temporaire, self.fs)
+        else:
+            # Pas en mode direct: l'extracteur garde tout le signal, sa mémoire croît avec la durée
+            self.extraction_live = ExtractorThread(StreamingFeatureExtractor.from_config(CONFIG_DTW, input_sr=self.fs))
+        self.caracteristiques_live = None
         self.stream = sd.InputStream(samplerate=self.fs, channels=1, callback=self.audio_callback)
         self.stream.start()
         self.label_status.configure(text="Enregistrement en cours...", text_color="red")
         self.btn_start.configure(state="disabled")
         self.btn_stop.configure(state="normal")
         self.btn_valider.configure(state="disabled")
+        self.case_direct.configure(state="disabled")
         self.entry_nom.delete(0, 'end')
         print("Enregistrement démarré.")
     
@@ -324,14 +415,27 @@ class VoiceAuthApp:
         self.is_recording = False
         self.stream.stop()
         self.stream.close()
-        self.audio_array = np.concatenate(self.audio_data, axis=0)
+        if self.writer is not None:
+            # En-tête WAV finalisé; le fichier sera renommé à la validation
+            self.writer.close()
+            self.writer = None
+        else:
+            # Vue sur le tampon de capture, sans copie
+            self.audio_array = self.capture.view()
+        if self.extraction_live is not None:
+            # Seuls le trim, la CMS et les deltas restent à faire: pas de nouvelle STFT
+            extracteur = self.extraction_live.close()
+            self.extraction_live = None
+            if extracteur is not None:
+                self.caracteristiques_live = extracteur.features_for_config(CONFIG_DTW)
         self.label_status.configure(text="Enregistrement arrêté. Entrez votre nom et validez.", text_color="orange")
         self.btn_stop.configure(state="disabled")
         self.btn_valider.configure(state="normal")
+        self.case_direct.configure(state="normal")
         print("Enregistrement arrêté.")
     
     def valider_enregistrement(self):
-        if self.audio_array is None:
+        if self.audio_array is None and self.fichier_temporaire is None:
             self.label_status.configure(text="Erreur: Pas d'audio à sauvegarder !", text_color="red")
             return
 
@@ -344,7 +448,16 @@ class VoiceAuthApp:
         numero = self.trouver_prochain_numero_simple(nom)
         filename = os.path.join(self.dossier_samples, f"{nom}_{numero}.wav")
 
-        sf.write(filename, self.audio_array, self.fs)
+        if self.fichier_temporaire is not None:
+            os.replace(self.fichier_temporaire, filename)
+            self.fichier_temporaire = None
+        else:
+            sf.write(filename, to_pcm16(self.audio_array), self.fs)
+        if self.caracteristiques_live is not None:
+            # Cache de features rempli sans relire le fichier (dtw.py, corpus.py, catalogue)
+            self.feature_store.save(filename, CONFIG_DTW, {"features": self.caracteristiques_live})
+            self.caracteristiques_live = None
+        self.catalogue.add(filename)
         self.label_status.configure(text=f"Enregistré: {nom}_{numero}.wav", text_color="green")
         self.btn_start.configure(state="normal")
         self.btn_valider.configure(state="disabled")
@@ -353,23 +466,8 @@ class VoiceAuthApp:
         self.audio_array = None
     
     def trouver_prochain_numero_simple(self, nom_personne):
-        """Trouve le prochain numéro disponible pour un enregistrement"""
-        fichiers = os.listdir(self.dossier_samples)
-        fichiers_personne = [f for f in fichiers if f.startswith(f"{nom_personne}_") and f.endswith(".wav")]
-
-        if not fichiers_personne:
-            return 1
-
-        numeros = []
-        for fichier in fichiers_personne:
-            try:
-                partie = fichier.replace(f"{nom_personne}_", "").replace(".wav", "")
-                numero = int(partie)
-                numeros.append(numero)
-            except ValueError:
-                continue
-
-        return max(numeros) + 1 if numeros else 1
+        """Trouve le prochain numéro disponible pour un enregistrement (requête sur le catalogue)"""
+        return self.catalogue.next_take(nom_personne)
     
     # --- Fonctions de visualisation ---
 
@@ -379,13 +477,13 @@ class VoiceAuthApp:
             self.label_status.configure(text="Veuillez sélectionner un fichier !", text_color="red")
             return
 
-        chemin_complet = os.path.join(self.dossier_samples, fichier_selectionne + ".wav")
+        chemin_complet = self.chemin_sample(fichier_selectionne)
         if not os.path.exists(chemin_complet):
             self.label_status.configure(text=f"Fichier introuvable: {fichier_selectionne}.wav", text_color="red")
             return
 
         try:
-            data, samplerate = sf.read(chemin_complet)
+            data, samplerate = read_audio(chemin_complet)
             duree = len(data) / samplerate
             temps = np.linspace(0, duree, len(data))
             plt.figure(figsize=(12, 4))
@@ -409,13 +507,13 @@ class VoiceAuthApp:
             self.label_status.configure(text="Veuillez sélectionner un fichier !", text_color="red")
             return
 
-        chemin_complet = os.path.join(self.dossier_samples, fichier_selectionne + ".wav")
+        chemin_complet = self.chemin_sample(fichier_selectionne)
         if not os.path.exists(chemin_complet):
             self.label_status.configure(text=f"Fichier introuvable: {fichier_selectionne}.wav", text_color="red")
             return
 
         try:
-            data, samplerate = sf.read(chemin_complet)
+            data, samplerate = read_audio(chemin_complet)
 
             # Créer le spectrogramme avec scipy
             f, t, Sxx = signal.spectrogram(data, samplerate, nperseg=1024)
@@ -442,13 +540,13 @@ class VoiceAuthApp:
             self.label_status.configure(text="Veuillez sélectionner un fichier !", text_color="red")
             return
 
-        chemin_complet = os.path.join(self.dossier_samples, fichier_selectionne + ".wav")
+        chemin_complet = self.chemin_sample(fichier_selectionne)
         if not os.path.exists(chemin_complet):
             self.label_status.configure(text=f"Fichier introuvable: {fichier_selectionne}.wav", text_color="red")
             return
 
         try:
-            data, samplerate = sf.read(chemin_complet)
+            data, samplerate = read_audio(chemin_complet)
 
             # Calculer la FFT
             N = len(data)
@@ -480,13 +578,13 @@ class VoiceAuthApp:
             self.label_status.configure(text="Veuillez sélectionner un fichier !", text_color="red")
             return
 
-        chemin_complet = os.path.join(self.dossier_samples, fichier_selectionne + ".wav")
+        chemin_complet = self.chemin_sample(fichier_selectionne)
         if not os.path.exists(chemin_complet):
             self.label_status.configure(text=f"Fichier introuvable: {fichier_selectionne}.wav", text_color="red")
             return
 
         try:
-            data, samplerate = sf.read(chemin_complet)
+            data, samplerate = read_audio(chemin_complet)
             self.label_status.configure(text=f"Lecture de {fichier_selectionne}...", text_color="yellow")
             self.app.update_idletasks()
 
@@ -501,15 +599,33 @@ class VoiceAuthApp:
 
     # --- Fonctions de transcription ---
     
-    def charger_modele_whisper(self):
-        if self.whisper_model is None:
-            self.label_status.configure(text="Chargement", text_color="yellow")
-            print("Chargement")
-            self.app.update_idletasks()
+    def surveiller_chargement_whisper(self):
+        """Vérifie périodiquement (sans bloquer l'interface) si le modèle Whisper est prêt"""
+        if not self.chargement_whisper.done():
+            self.app.after(200, self.surveiller_chargement_whisper)
+        elif self.chargement_whisper.exception() is not None:
+            print(f"Erreur de chargement Whisper: {self.chargement_whisper.exception()}")
+        else:
+            print("Modèle Whisper chargé.")
+
+    def attendre_whisper(self, suite):
+        """
+        Appelle suite() une fois le modèle Whisper chargé. Le préchargement est surveillé
+        par after(), comme dans surveiller_chargement_whisper, pour ne pas figer l'interface.
+        """
+        if not self.chargement_whisper.done():
+            self.label_status.configure(text="Chargement du modèle Whisper...", text_color="yellow")
+            self.app.after(200, self.attendre_whisper, suite)
+            return
+
+        erreur = self.chargement_whisper.exception()
+        if erreur is not None:
+            self.label_status.configure(text=f"Erreur de chargement Whisper: {erreur}", text_color="red")
+            print(f"Erreur de chargement Whisper: {erreur}")
+            self.btn_transcrire.configure(state="normal")
+            return
+        suite()
 
-            self.whisper_model = whisper.load_model("base")
-            print("Modèle chargé.")
-            
     def transcrire_signal_selectionne(self):
         warnings.filterwarnings("ignore")
 
@@ -518,7 +634,7 @@ class VoiceAuthApp:
             self.label_status.configure(text="Veuillez sélectionner un fichier !", text_color="red")
             return
 
-        chemin_complet = os.path.normpath(os.path.join(self.dossier_samples, fichier_selectionne + ".wav"))
+        chemin_complet = os.path.normpath(self.chemin_sample(fichier_selectionne))
 
         print(f"DEBUG - Fichier sélectionné: {fichier_selectionne}")
         print(f"DEBUG - Chemin complet: {chemin_complet}")
@@ -530,38 +646,63 @@ class VoiceAuthApp:
             print(f"Chemin recherché: {chemin_complet}")
             return
 
-        try:
-            self.charger_modele_whisper()
+        # Relance le préchargement s'il a échoué (sinon renvoie le chargement en cours)
+        self.chargement_whisper = asr.preload(MODELE_WHISPER)
+        self.btn_transcrire.configure(state="disabled")
+        self.attendre_whisper(lambda: self.lancer_transcription(fichier_selectionne, chemin_complet))
 
-            self.label_status.configure(text=f"Transcription de {fichier_selectionne}...", text_color="yellow")
-            self.app.update_idletasks()
+    def lancer_transcription(self, fichier_selectionne, chemin_complet):
+        """
+        Transcription hors du thread Tk; le résultat est relevé par suivre_transcription.
+        """
+        self.label_status.configure(text=f"Transcription de {fichier_selectionne}...", text_color="yellow")
+        resultat = {}
 
-            result = self.whisper_model.transcribe(
-                chemin_complet,
-                word_timestamps=True,
-                fp16=False
-            )
+        def tache():
+            try:
+                resultat["result"] = asr.transcribe_cached(
+                    chemin_complet,
+                    MODELE_WHISPER,
+                    self.cache_transcriptions,
+                    self.audio,
+                    word_timestamps=True,
+                    fp16=False
+                )
+            except Exception as e:
+                resultat["erreur"] = e
+
+        thread = threading.Thread(target=tache, daemon=True)
+        thread.start()
+        self.app.after(100, self.suivre_transcription, fichier_selectionne, thread, resultat)
+
+    def suivre_transcription(self, fichier_selectionne, thread, resultat):
+        if thread.is_alive():
+            self.app.after(100, self.suivre_transcription, fichier_selectionne, thread, resultat)
+            return
+        self.btn_transcrire.configure(state="normal")
 
-            full_text = result.get("text", "Aucun texte détecté.").strip()
+        if "erreur" in resultat:
+            self.label_status.configure(text=f"Erreur de transcription: {resultat['erreur']}", text_color="red")
+            print(f"Erreur Whisper: {resultat['erreur']}")
+            return
 
-            output_text = f"--- TRANSCRIPTION COMPLÈTE ---\n{full_text}\n\n"
-            output_text += "--- DÉTAIL DES MOTS ---\n"
+        result = resultat["result"]
+        full_text = result.get("text", "Aucun texte détecté.").strip()
 
-            for segment in result.get("segments", []):
-                for word_info in segment.get("words", []):
-                    start = word_info.get('start', 0)
-                    end = word_info.get('end', 0)
-                    word = word_info.get('word', '')
-                    output_text += f"[{start:.2f}s - {end:.2f}s] : {word}\n"
+        output_text = f"--- TRANSCRIPTION COMPLÈTE ---\n{full_text}\n\n"
+        output_text += "--- DÉTAIL DES MOTS ---\n"
 
-            self.afficher_resultat_transcription(fichier_selectionne, output_text)
+        for segment in result.get("segments", []):
+            for word_info in segment.get("words", []):
+                start = word_info.get('start', 0)
+                end = word_info.get('end', 0)
+                word = word_info.get('word', '')
+                output_text += f"[{start:.2f}s - {end:.2f}s] : {word}\n"
 
-            self.label_status.configure(text=f"Transcription terminée: {fichier_selectionne}", text_color="green")
-            print(f"Transcription terminée pour: {fichier_selectionne}")
+        self.afficher_resultat_transcription(fichier_selectionne, output_text)
 
-        except Exception as e:
-            self.label_status.configure(text=f"Erreur de transcription: {str(e)}", text_color="red")
-            print(f"Erreur Whisper: {e}")
+        self.label_status.configure(text=f"Transcription terminée: {fichier_selectionne}", text_color="green")
+        print(f"Transcription terminée pour: {fichier_selectionne}")
 
     def afficher_resultat_transcription(self, titre, texte):
         popup = ctk.CTkToplevel(self.app)
@@ -588,189 +729,24 @@ class VoiceAuthApp:
 
     # --- Fonctions de comparaison vocale  ---
 
-    def pretraiter_audio(self, y, sr):
-        """Pré-traitement audio avancé"""
-        try:
-            # Supprimer les silences aux extrémités
-            y_trimmed, _ = librosa.effects.trim(y, top_db=20)
-
-            y_normalized = librosa.util.normalize(y_trimmed)
-
-            return y_normalized
-        except Exception as e:
-            print(f"Erreur lors du prétraitement: {e}")
-            return y
-
-    def extraire_caracteristiques_avancees(self, chemin_audio):
-        """Extraction de caractéristiques vocales enrichies"""
-        try:
-            # Charger l'audio
-            y, sr = librosa.load(chemin_audio, sr=16000)
-
-            # Pré-traiter
-            y = self.pretraiter_audio(y, sr)
-
-            # 1. MFCC avec plus de coefficients
-            mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=20)
-
-            # 2. Delta MFCC
-            mfcc_delta = librosa.feature.delta(mfccs)
-
-            # 3. Delta-Delta MFCC
-            mfcc_delta2 = librosa.feature.delta(mfccs, order=2)
-
-            # 4. Chroma
-            chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-
-            # 5. Spectral Contrast
-            spectral_contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
-
-            # 6. Zero Crossing Rate
-            zcr = librosa.feature.zero_crossing_rate(y)
-
-            # Combiner toutes les caractéristiques
-            caracteristiques = np.vstack([
-                mfccs,
-                mfcc_delta,
-                mfcc_delta2,
-                chroma,
-                spectral_contrast,
-                zcr
-            ])
-
-            # Normaliser
-            caracteristiques_norm = (caracteristiques - np.mean(caracteristiques, axis=1, keepdims=True)) / (np.std(caracteristiques, axis=1, keepdims=True) + 1e-10)
+    # --- Analyse vocale (calculs dans comparaison.py) ---
 
-            return caracteristiques_norm, mfccs
-        except Exception as e:
-            print(f"Erreur lors de l'extraction: {e}")
-            return None, None
-
-    def calculer_similarite_dtw(self, feat1, feat2):
-        """Calcul de similarité avec DTW (Dynamic Time Warping)"""
-        try:
-            # Utiliser DTW pour comparer les séquences de différentes longueurs
-            distance, _ = fastdtw(feat1.T, feat2.T, dist=euclidean)
-
-            # Normaliser par la longueur moyenne
-            longueur_moyenne = (feat1.shape[1] + feat2.shape[1]) / 2
-            distance_normalisee = distance / longueur_moyenne
-
-            # Convertir en similarité 
-            similarite_dtw = 100 * np.exp(-distance_normalisee / 15)
-
-            return similarite_dtw, distance_normalisee
-        except Exception as e:
-            print(f"Erreur DTW: {e}")
-            return 0, float('inf')
-
-    def calculer_similarite_cosine(self, feat1, feat2):
-        """Calcul de similarité cosinus"""
-        try:
-            # Aplatir et calculer la similarité cosinus
-            min_frames = min(feat1.shape[1], feat2.shape[1])
-            feat1_flat = feat1[:, :min_frames].flatten()
-            feat2_flat = feat2[:, :min_frames].flatten()
-
-            # Similarité cosinus (1 = identique, 0 = différent)
-            cos_sim = 1 - cosine(feat1_flat, feat2_flat)
-
-            # Convertir en pourcentage
-            similarite_cos = max(0, cos_sim * 100)
-
-            return similarite_cos
-        except Exception as e:
-            print(f"Erreur cosine: {e}")
-            return 0
-
-    def calculer_correlation(self, feat1, feat2):
-        """Calcul de corrélation de Pearson"""
-        try:
-            min_frames = min(feat1.shape[1], feat2.shape[1])
-            feat1_flat = feat1[:, :min_frames].flatten()
-            feat2_flat = feat2[:, :min_frames].flatten()
-
-            # Corrélation de Pearson
-            corr, _ = pearsonr(feat1_flat, feat2_flat)
-
-            # Convertir en pourcentage
-            similarite_corr = max(0, (corr + 1) / 2 * 100)
-
-            return similarite_corr
-        except Exception as e:
-            print(f"Erreur corrélation: {e}")
-            return 0
+    @metrics.timed("comparaison.extraction")
+    def extraire_caracteristiques_avancees(self, chemin_audio, y=None):
+        """Extraction de caractéristiques vocales enrichies (y: signal déjà décodé à 16 kHz)"""
+        return comparaison.extraire_caracteristiques_avancees(chemin_audio, self.feature_store, y, self.audio)
 
     def calculer_score_composite(self, feat1, feat2, mfcc1, mfcc2):
         """Calcul d'un score composite pondéré"""
-        try:
-            # 1. Similarité DTW
-            sim_dtw, dist_dtw = self.calculer_similarite_dtw(mfcc1, mfcc2)
-
-            # 2. Similarité cosinus
-            sim_cos = self.calculer_similarite_cosine(feat1, feat2)
-
-            # 3. Corrélation
-            sim_corr = self.calculer_correlation(feat1, feat2)
-
-            # Score composite pondéré
-            score_final = (0.40 * sim_dtw + 0.30 * sim_cos + 0.30 * sim_corr)
-
-            details = {
-                'dtw': sim_dtw,
-                'cosine': sim_cos,
-                'correlation': sim_corr,
-                'distance_dtw': dist_dtw
-            }
-
-            return score_final, details
-        except Exception as e:
-            print(f"Erreur score composite: {e}")
-            return 0, {}
+        return comparaison.calculer_score_composite(feat1, feat2, mfcc1, mfcc2)
 
     def transcrire_pour_comparaison(self, chemin_audio):
-        try:
-            self.charger_modele_whisper()
-
-            result = self.whisper_model.transcribe(
-                chemin_audio,
-                word_timestamps=True,
-                fp16=False
-            )
-
-            texte = result.get("text", "").strip()
-            mots = texte.split()
-
-            return texte, mots, len(mots)
-        except Exception as e:
-            print(f"Erreur lors de la transcription: {e}")
-            return "", [], 0
+        # Appelée hors du thread Tk: le pool attend lui-même la fin du préchargement
+        return comparaison.transcrire(chemin_audio, MODELE_WHISPER, self.cache_transcriptions, self.audio)
 
     def comparer_textes(self, mots1, mots2):
-        # Normaliser les mots
-        def normaliser_mot(mot):
-            return ''.join(c.lower() for c in mot if c.isalnum())
-
-        mots1_norm = [normaliser_mot(m) for m in mots1 if normaliser_mot(m)]
-        mots2_norm = [normaliser_mot(m) for m in mots2 if normaliser_mot(m)]
-
-        # Utiliser difflib pour trouver les différences
-        matcher = difflib.SequenceMatcher(None, mots1_norm, mots2_norm)
-
-        # Calculer le ratio de similarité
-        ratio = matcher.ratio() * 100
-
-        # Trouver les mots ajoutés et supprimés
-        mots_ajoutes = []
-        mots_supprimes = []
-
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == 'delete':
-                mots_supprimes.extend(mots1[i1:i2])
-            elif tag == 'insert':
-                mots_ajoutes.extend(mots2[j1:j2])
-
-        return ratio, mots_ajoutes, mots_supprimes
+        """Comparaison mot à mot des transcriptions (ratio, mots ajoutés, mots supprimés)"""
+        return comparaison.comparer_textes(mots1, mots2)
 
     def comparer_samples(self):
         warnings.filterwarnings("ignore")
@@ -786,119 +762,196 @@ class VoiceAuthApp:
             self.label_status.configure(text="Veuillez sélectionner le Sample 2 !", text_color="red")
             return
 
-        chemin1 = os.path.join(self.dossier_samples, sample1 + ".wav")
-        chemin2 = os.path.join(self.dossier_samples, sample2 + ".wav")
+        chemin1 = self.chemin_sample(sample1)
+        chemin2 = self.chemin_sample(sample2)
 
         if not os.path.exists(chemin1) or not os.path.exists(chemin2):
             self.label_status.configure(text="Un ou plusieurs fichiers introuvables !", text_color="red")
             return
 
-        try:
-            self.label_status.configure(text="Analyse avancée en cours.", text_color="yellow")
-            self.app.update_idletasks()
-
-            # 1. Extraction des caractéristiques avancées
-            print("Extraction des caractéristiques avancées.")
-            feat1, mfcc1 = self.extraire_caracteristiques_avancees(chemin1)
-            feat2, mfcc2 = self.extraire_caracteristiques_avancees(chemin2)
+        if self.analyse_en_cours is not None:
+            return
 
-            if feat1 is None or feat2 is None or mfcc1 is None or mfcc2 is None:
-                self.label_status.configure(text="Erreur lors de l'extraction des caractéristiques !", text_color="red")
+        # L'analyse tourne hors du thread Tk; elle communique par une file lue avec after()
+        self.analyse_annulee = threading.Event()
+        self.chemins_analyse = (chemin1, chemin2)
+        self.file_progression = queue.SimpleQueue()
+        self.analyse_en_cours = threading.Thread(
+            target=self.pipeline_comparaison,
+            args=(sample1, sample2, chemin1, chemin2, self.file_progression, self.analyse_annulee),
+            daemon=True
+        )
+        self.btn_comparer.configure(state="disabled")
+        self.btn_annuler.configure(state="normal")
+        self.label_status.configure(text="Analyse avancée en cours.", text_color="yellow")
+        self.analyse_en_cours.start()
+        self.app.after(100, self.suivre_analyse)
+
+    def annuler_comparaison(self):
+        if self.analyse_en_cours is not None:
+            self.analyse_annulee.set()
+            self.label_status.configure(text="Annulation...", text_color="orange")
+
+    @metrics.timed("comparaison.total")
+    def pipeline_comparaison(self, sample1, sample2, chemin1, chemin2, progression, annulee):
+        """
+        Thread d'analyse: extraction des deux fichiers en parallèle et transcriptions
+        (en série, Whisper n'étant pas thread-safe) pendant le calcul acoustique.
+        Chaque étape est signalée dans la file de progression; l'annulation est prise
+        en compte entre les étapes (une transcription commencée va à son terme).
+        """
+        # Levé quand l'analyse s'arrête sans résultat: la transcription restante est sautée
+        abandon = threading.Event()
+
+        def transcrire_les_deux():
+            if not asr.is_ready(MODELE_WHISPER):
+                progression.put(("etape", "Chargement du modèle Whisper..."))
+            resultats = []
+            for chemin in (chemin1, chemin2):
+                if annulee.is_set() or abandon.is_set():
+                    return None
+                with metrics.timer("comparaison.transcription"):
+                    resultats.append(self.transcrire_pour_comparaison(chemin))
+            progression.put(("etape", "Transcriptions terminées."))
+            return resultats
+
+        # Pas de "with": sa sortie attendrait les transcriptions même après une erreur d'extraction
+        pool = ThreadPoolExecutor(max_workers=3)
+        try:
+            # Un même fichier n'est extrait qu'une fois
+            extractions = {chemin: pool.submit(self.extraire_caracteristiques_avancees, chemin)
+                           for chemin in dict.fromkeys((chemin1, chemin2))}
+            transcriptions = pool.submit(transcrire_les_deux)
+
+            # 1. Extraction des caractéristiques avancées (arrêt dès le premier échec)
+            progression.put(("etape", "Extraction des caractéristiques avancées..."))
+            with metrics.timer("comparaison.attente_extraction"):
+                for extraction in as_completed(extractions.values()):
+                    feat, mfcc = extraction.result()
+                    if feat is None or mfcc is None:
+                        abandon.set()
+                        progression.put(("erreur", "Erreur lors de l'extraction des caractéristiques !"))
+                        return
+            if annulee.is_set():
+                progression.put(("annule", None))
                 return
+            feat1, mfcc1 = extractions[chemin1].result()
+            feat2, mfcc2 = extractions[chemin2].result()
 
-            # 2. Calcul du score composite
-            print("Calcul des métriques de similarité.")
-            score_final, details = self.calculer_score_composite(feat1, feat2, mfcc1, mfcc2)
+            # 2. Calcul du score composite (pendant les transcriptions)
+            progression.put(("etape", "Calcul des métriques de similarité..."))
+            with metrics.timer("comparaison.score_composite"):
+                score_final, details = self.calculer_score_composite(feat1, feat2, mfcc1, mfcc2)
 
             # 3. Transcription et comparaison de texte
-            print("Transcription des samples...")
-            texte1, mots1, nb_mots1 = self.transcrire_pour_comparaison(chemin1)
-            texte2, mots2, nb_mots2 = self.transcrire_pour_comparaison(chemin2)
+            if not transcriptions.done():
+                progression.put(("etape", "Transcription des samples..."))
+            with metrics.timer("comparaison.attente_transcription"):
+                resultats = transcriptions.result()
+            if resultats is None or annulee.is_set():
+                progression.put(("annule", None))
+                return
 
+            (texte1, mots1, nb_mots1), (texte2, mots2, nb_mots2) = resultats
             ratio_texte, mots_ajoutes, mots_supprimes = self.comparer_textes(mots1, mots2)
 
-            resultat = "═══════════════════════════════════════\n"
-            resultat += "   RAPPORT D'ANALYSE VOCALE AVANCÉE\n"
-            resultat += "═══════════════════════════════════════\n\n"
-
-            resultat += f"📁 Sample 1: {sample1}\n"
-            resultat += f"📁 Sample 2: {sample2}\n\n"
-
-            resultat += "--- ANALYSE VOCALE MULTI-MÉTRIQUES ---\n"
-            resultat += f"🎯 Score de similarité vocal: {score_final:.2f}%\n\n"
-
-            resultat += "Métriques détaillées:\n"
-            resultat += f"  • DTW (Dynamic Time Warping): {details.get('dtw', 0):.2f}%\n"
-            resultat += f"  • Similarité Cosinus: {details.get('cosine', 0):.2f}%\n"
-            resultat += f"  • Corrélation de Pearson: {details.get('correlation', 0):.2f}%\n"
-            resultat += f"  • Distance DTW normalisée: {details.get('distance_dtw', 0):.4f}\n\n"
-
-            # Interprétation du score vocal
-            if score_final > 85:
-                resultat += "✓✓ Voix TRÈS SIMILAIRES - Même personne avec haute confiance\n"
-                confiance_vocale = "HAUTE"
-            elif score_final > 70:
-                resultat += "✓ Voix similaires - Probablement la même personne\n"
-                confiance_vocale = "BONNE"
-            elif score_final > 55:
-                resultat += "⚠ Voix moyennement similaires - Possiblement la même personne\n"
-                confiance_vocale = "MOYENNE"
-            else:
-                resultat += "✗ Voix DIFFÉRENTES - Probablement pas la même personne\n"
-                confiance_vocale = "FAIBLE"
-
-            resultat += "\n--- ANALYSE TEXTUELLE ---\n"
-            resultat += f"Sample 1 ({nb_mots1} mots):\n  \"{texte1}\"\n\n"
-            resultat += f"Sample 2 ({nb_mots2} mots):\n  \"{texte2}\"\n\n"
-
-            resultat += f"Similarité textuelle: {ratio_texte:.2f}%\n"
-            resultat += f"Différence de mots: {abs(nb_mots1 - nb_mots2)}\n\n"
-
-            if mots_supprimes:
-                resultat += f"Mots supprimés (dans Sample 1 seulement):\n"
-                resultat += f"  {', '.join(mots_supprimes)}\n\n"
-
-            if mots_ajoutes:
-                resultat += f"Mots ajoutés (dans Sample 2 seulement):\n"
-                resultat += f"  {', '.join(mots_ajoutes)}\n\n"
-
-            resultat += "--- VERDICT FINAL ---\n"
-
-            if score_final > 80 and ratio_texte > 70:
-                resultat += "MÊME PERSONNE - Haute confiance\n"
-                resultat += "    Voix ET contenu très similaires\n"
-                verdict = "MATCH CONFIRMÉ"
-            elif score_final > 80 and ratio_texte <= 70:
-                resultat += "MÊME PERSONNE - Bonne confiance\n"
-                resultat += "    Même voix mais contenu différent\n"
-                verdict = "MATCH PROBABLE"
-            elif score_final > 65 and ratio_texte > 60:
-                resultat += "PROBABLEMENT LA MÊME PERSONNE\n"
-                resultat += "    Similarités vocales et textuelles moyennes\n"
-                verdict = "MATCH POSSIBLE"
-            elif score_final <= 65 and ratio_texte > 80:
-                resultat += "Personnes DIFFÉRENTES mais contenu similaire\n"
-                resultat += "    Attention: phrases identiques prononcées par des voix différentes\n"
-                verdict = "PAS DE MATCH"
-            else:
-                resultat += "PERSONNES DIFFÉRENTES - Haute confiance\n"
-                resultat += "    Voix ET contenu différents\n"
-                verdict = "PAS DE MATCH"
-
-            resultat += f"\nConfiance vocale: {confiance_vocale}\n"
-            resultat += f"Verdict: {verdict}\n"
-
-            # Afficher le résultat
-            self.afficher_resultat_comparaison(resultat)
-
-            self.label_status.configure(text="Analyse terminée !", text_color="green")
-            print("Analyse terminée.")
+            resultat = self.construire_rapport(sample1, sample2, score_final, details,
+                                               texte1, nb_mots1, texte2, nb_mots2,
+                                               ratio_texte, mots_ajoutes, mots_supprimes)
+            progression.put(("resultat", resultat))
 
         except Exception as e:
-            self.label_status.configure(text=f"Erreur lors de la comparaison: {str(e)}", text_color="red")
+            abandon.set()
             print(f"Erreur: {e}")
             import traceback
             traceback.print_exc()
+            progression.put(("erreur", f"Erreur lors de la comparaison: {str(e)}"))
+        finally:
+            # Sans attendre: une transcription commencée se termine seule en arrière-plan
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def suivre_analyse(self):
+        """Lit la file de progression depuis le thread Tk"""
+        termine = False
+        while not termine:
+            try:
+                message, contenu = self.file_progression.get_nowait()
+            except queue.Empty:
+                break
+
+            if message == "etape":
+                self.label_status.configure(text=contenu, text_color="yellow")
+                print(contenu)
+            elif message == "resultat":
+                # Le catalogue (SQLite) n'est utilisé que depuis le thread Tk
+                self.catalogue.refresh_features(self.chemins_analyse)
+                self.afficher_resultat_comparaison(contenu)
+                self.label_status.configure(text="Analyse terminée !", text_color="green")
+                print("Analyse terminée.")
+                termine = True
+            elif message == "erreur":
+                self.label_status.configure(text=contenu, text_color="red")
+                termine = True
+            elif message == "annule":
+                self.label_status.configure(text="Analyse annulée.", text_color="orange")
+                print("Analyse annulée.")
+                termine = True
+
+        if termine:
+            self.analyse_en_cours = None
+            self.btn_comparer.configure(state="normal")
+            self.btn_annuler.configure(state="disabled")
+        else:
+            self.app.after(100, self.suivre_analyse)
+
+    def construire_rapport(self, sample1, sample2, score_final, details,
+                           texte1, nb_mots1, texte2, nb_mots2,
+                           ratio_texte, mots_ajoutes, mots_supprimes):
+        """Texte du rapport de comparaison (scores vocaux, texte et verdict)"""
+        resultat = "═══════════════════════════════════════\n"
+        resultat += "   RAPPORT D'ANALYSE VOCALE AVANCÉE\n"
+        resultat += "═══════════════════════════════════════\n\n"
+
+        resultat += f"📁 Sample 1: {sample1}\n"
+        resultat += f"📁 Sample 2: {sample2}\n\n"
+
+        resultat += "--- ANALYSE VOCALE MULTI-MÉTRIQUES ---\n"
+        resultat += f"🎯 Score de similarité vocal: {score_final:.2f}%\n\n"
+
+        resultat += "Métriques détaillées:\n"
+        resultat += f"  • DTW (Dynamic Time Warping): {details.get('dtw', 0):.2f}%\n"
+        resultat += f"  • Similarité Cosinus: {details.get('cosine', 0):.2f}%\n"
+        resultat += f"  • Corrélation de Pearson: {details.get('correlation', 0):.2f}%\n"
+        resultat += f"  • Distance DTW normalisée: {details.get('distance_dtw', 0):.4f}\n\n"
+
+        # Interprétation du score vocal
+        confiance_vocale, interpretation = comparaison.interpreter_score_vocal(score_final)
+        resultat += interpretation + "\n"
+
+        resultat += "\n--- ANALYSE TEXTUELLE ---\n"
+        resultat += f"Sample 1 ({nb_mots1} mots):\n  \"{texte1}\"\n\n"
+        resultat += f"Sample 2 ({nb_mots2} mots):\n  \"{texte2}\"\n\n"
+
+        resultat += f"Similarité textuelle: {ratio_texte:.2f}%\n"
+        resultat += f"Différence de mots: {abs(nb_mots1 - nb_mots2)}\n\n"
+
+        if mots_supprimes:
+            resultat += f"Mots supprimés (dans Sample 1 seulement):\n"
+            resultat += f"  {', '.join(mots_supprimes)}\n\n"
+
+        if mots_ajoutes:
+            resultat += f"Mots ajoutés (dans Sample 2 seulement):\n"
+            resultat += f"  {', '.join(mots_ajoutes)}\n\n"
+
+        resultat += "--- VERDICT FINAL ---\n"
+
+        verdict, conclusion, explication = comparaison.determiner_verdict(score_final, ratio_texte)
+        resultat += f"{conclusion}\n"
+        resultat += f"    {explication}\n"
+
+        resultat += f"\nConfiance vocale: {confiance_vocale}\n"
+        resultat += f"Verdict: {verdict}\n"
+        return resultat
 
     def afficher_resultat_comparaison(self, texte):
         popup = ctk.CTkToplevel(self.app)
@@ -927,7 +980,16 @@ class VoiceAuthApp:
 
     def run(self):
         self.app.mainloop()
+        # Instantané des métriques par étape (VOICE_METRICS=1)
+        if metrics.enabled:
+            metrics.dump(self.fichier_metriques)
+            print(f"Métriques écrites dans {self.fichier_metriques}")
 
 if __name__ == "__main__":
-    application = VoiceAuthApp()
+    parser = argparse.ArgumentParser(description="Voice analysis app: recording, visualisation and sample comparison.")
+    parser.add_argument("--direct", action="store_true",
+                        help="write recordings straight to disk (constant memory, for long recordings)")
+    args = parser.parse_args()
+
+    application = VoiceAuthApp(enregistrement_direct=args.direct)
     application.run()
\ No newline at end of file
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+from feature_store import FeatureStore, default_path
+from instrumentation import metrics
+
+DEFAULT_MODEL = "base"
+
+_futures = {}   # nom -> Future du modèle
+_locks = {}     # nom -> verrou de transcription
+_pool_lock = threading.Lock()
+
+
+def _load(name, future):
+    try:
+        # Import paresseux: torch + whisper coûtent plusieurs secondes à eux seuls
+        import whisper
+        future.set_result(whisper.load_model(name))
+    except BaseException as e:
+        future.set_exception(e)
+
+
+def preload(name=DEFAULT_MODEL):
+    """
+    Lance le chargement du modèle Whisper dans un thread d'arrière-plan (une seule fois
+    par processus) et retourne le Future correspondant. Les appels suivants, depuis
+    n'importe quel point d'entrée, partagent le même modèle.
+    """
+    with _pool_lock:
+        future = _futures.get(name)
+        if future is None or (future.done() and future.exception() is not None):
+            future = Future()
+            future.set_running_or_notify_cancel()
+            _futures[name] = future
+            _locks.setdefault(name, threading.Lock())
+            threading.Thread(target=_load, args=(name, future), name=f"whisper-{name}", daemon=True).start()
+        return future
+
+
+def is_ready(name=DEFAULT_MODEL):
+    future = _futures.get(name)
+    return future is not None and future.done() and future.exception() is None
+
+
+def get_model(name=DEFAULT_MODEL, timeout=None):
+    """
+    Modèle chargé (attend la fin du préchargement si nécessaire).
+    """
+    return preload(name).result(timeout)
+
+
+def transcribe(audio, name=DEFAULT_MODEL, **options):
+    """
+    model.transcribe(audio, **options) sur le modèle partagé. Whisper n'est pas
+    thread-safe: les transcriptions d'un même modèle sont sérialisées.
+    """
+    with metrics.timer("asr.model_wait"):
+        model = get_model(name)
+    with _locks[name], metrics.timer("asr.transcribe"):
+        return model.transcribe(audio, **options)
+
+
+class TranscriptionCache:
+    """
+    Cache disque des transcriptions, indexé par le contenu du fichier audio, le nom du
+    modèle et les options de décodage. Chaque entrée est un JSON (texte, segments avec
+    les mots horodatés, langue), écrit atomiquement.
+    """
+
+    def __init__(self, root=default_path("transcription_cache")):
+        self.root = root
+        # Pour FeatureStore.content_digest
+        self._store = FeatureStore(root)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, audio_path, name, options):
+        h = hashlib.sha1(self._store.content_digest(audio_path).encode())
+        h.update(json.dumps({"model": name, "options": options}, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def load(self, audio_path, name, options):
+        try:
+            with open(self._entry_path(self.key(audio_path, name, options)), "r") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def save(self, audio_path, name, options, result):
+        """
+        Échecs signalés, jamais levés.
+        """
+        entry = {
+            "text": result.get("text", ""),
+            "segments": result.get("segments", []),
+            "language": result.get("language"),
+        }
+        try:
+            path = self._entry_path(self.key(audio_path, name, options))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                # Les probabilités de mots peuvent être des scalaires numpy
+                json.dump(entry, f, default=float)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Transcription cache write failed for {audio_path}: {e}")
+
+
+def transcribe_cached(audio_path, name=DEFAULT_MODEL, cache=None, decoder=None, **options):
+    """
+    transcribe() précédé d'une recherche dans le cache: un fichier déjà transcrit
+    avec le même modèle et les mêmes options ne repasse pas par Whisper.
+    decoder: fonction chemin -> signal float32 16 kHz (ex. audio_io.AudioLoader), pour
+    donner à Whisper un signal déjà décodé au lieu de relancer ffmpeg.
+    """
+    result = None if cache is None else cache.load(audio_path, name, options)
+    metrics.count("asr.cache.hits" if result is not None else "asr.cache.misses")
+    if result is None:
+        audio = audio_path if decoder is None else decoder(audio_path)
+        result = transcribe(audio, name, **options)
+        if cache is not None:
+            cache.save(audio_path, name, options, result)
+    return result
@@ -0,0 +1,266 @@
+import argparse
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from feature_store import FeatureStore, default_path, stat_key
+from workers import map_files
+
+ANALYSIS_SR = 16000
+
+# Taille maximale par défaut du dossier audio_cache/
+DEFAULT_CACHE_BYTES = 2 * 1024 ** 3
+
+
+def decode_audio(path, sr=ANALYSIS_SR):
+    """
+    Décode un fichier en signal mono float32 à sr Hz (format attendu par Whisper et
+    par les extracteurs de features).
+    """
+    y, _ = librosa.load(path, sr=sr, mono=True)
+    return np.ascontiguousarray(y, dtype=np.float32)
+
+
+def read_audio(path):
+    """
+    Signal à sa fréquence d'origine, (data, sr) comme soundfile.read, pour l'affichage
+    et l'écoute. Les formats que libsndfile ne lit pas (m4a) passent par librosa.
+    """
+    try:
+        return sf.read(path)
+    except RuntimeError:
+        y, sr = librosa.load(path, sr=None, mono=False)
+        return (y.T if y.ndim > 1 else y), sr
+
+
+class AudioCache:
+    """
+    Copies pré-transcodées du corpus: chaque fichier (m4a, wav 44.1 kHz...) est décodé
+    et rééchantillonné une seule fois en .npy mono float32 à sr Hz. Une entrée est
+    indexée par le contenu du fichier (comme FeatureStore) et sr: un fichier déplacé
+    garde son entrée, un fichier réenregistré en obtient une nouvelle.
+
+    max_bytes: taille maximale du dossier; au-delà, les entrées les moins récemment
+    lues sont supprimées (prune). None = pas de limite.
+    """
+
+    def __init__(self, root=default_path("audio_cache"), sr=ANALYSIS_SR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.root = root
+        self.sr = sr
+        self.max_bytes = max_bytes
+        # Pour FeatureStore.content_digest
+        self._store = FeatureStore(root)
+        self._bytes = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Transmis aux processus des pools (functools.partial): le verrou n'est pas picklable
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def path_for(self, path):
+        key = hashlib.sha1(f"{self._store.content_digest(path)}|{self.sr}".encode()).hexdigest()
+        return os.path.join(self.root, key[:2], key + ".npy")
+
+    def load(self, path):
+        cached = self.path_for(path)
+        try:
+            y = np.load(cached)
+            # Date de dernière utilisation, pour l'ordre de prune()
+            os.utime(cached)
+            return y
+        except (OSError, ValueError):
+            pass
+
+        y = decode_audio(path, self.sr)
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            tmp = f"{cached[:-4]}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+            np.save(tmp, y)
+            os.replace(tmp, cached)
+            self._added(os.path.getsize(cached))
+        except OSError as e:
+            print(f"Audio cache write failed for {path}: {e}")
+        return y
+
+    def contains(self, path):
+        return os.path.exists(self.path_for(path))
+
+    def entries(self):
+        """
+        Liste des entrées du cache: (chemin, octets, date de dernière utilisation).
+        """
+        found = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if not name.endswith(".npy") or ".tmp." in name:
+                    continue
+                try:
+                    st = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+                found.append((os.path.join(directory, name), st.st_size, st.st_mtime))
+        return found
+
+    def _added(self, nbytes):
+        with self._lock:
+            # Taille du dossier lue une fois, tenue à jour ensuite
+            self._bytes = sum(size for _, size, _ in self.entries()) if self._bytes is None else self._bytes + nbytes
+            over = self.max_bytes is not None and self._bytes > self.max_bytes
+        if over:
+            self.prune()
+
+    def prune(self, max_bytes=None):
+        """
+        Supprime les entrées les moins récemment utilisées jusqu'à revenir sous max_bytes
+        (par défaut self.max_bytes; 0 vide le cache). Retourne (entrées supprimées, octets libérés).
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        removed, freed = 0, 0
+        for cached, size, _ in entries:
+            if limit is None or total - freed <= limit:
+                break
+            try:
+                os.remove(cached)
+            except OSError:
+                continue  # déjà supprimée par un autre processus
+            removed += 1
+            freed += size
+        with self._lock:
+            self._bytes = total - freed
+        return removed, freed
+
+
+def load_audio(path, sr=ANALYSIS_SR, audio_cache=None):
+    """
+    Signal mono float32 à sr Hz, lu depuis la copie pré-transcodée quand audio_cache
+    (de même sr) est fourni, sinon décodé directement.
+    """
+    if audio_cache is not None and audio_cache.sr == sr:
+        return audio_cache.load(path)
+    return decode_audio(path, sr)
+
+
+def _transcode(path, audio_cache):
+    """
+    Worker de normalize_corpus: True si le fichier vient d'être transcodé.
+    """
+    if audio_cache.contains(path):
+        return False
+    audio_cache.load(path)
+    return True
+
+
+def normalize_corpus(root=default_path("samples"), audio_dir=default_path("audio_cache"), sr=ANALYSIS_SR,
+                     n_jobs=None,
+                     max_bytes=DEFAULT_CACHE_BYTES):
+    """
+    Transcode une fois tous les fichiers audio de root (récursivement) dans audio_dir,
+    puis ramène le cache sous max_bytes (entrées les moins récemment utilisées d'abord).
+    Retourne un résumé (fichiers, transcodés, erreurs, supprimés, secondes).
+    """
+    from corpus import AUDIO_EXTENSIONS
+
+    start = time.perf_counter()
+    files = sorted(os.path.join(directory, entry)
+                   for directory, _, entries in os.walk(root)
+                   for entry in entries
+                   if os.path.splitext(entry)[1].lower() in AUDIO_EXTENSIONS)
+
+    transcoded, errors = 0, 0
+    # Pas de prune pendant le transcodage: les workers se disputeraient les suppressions
+    results = map_files(partial(_transcode, audio_cache=AudioCache(audio_dir, sr, max_bytes=None)), files, n_jobs)
+    for path, (done, error) in zip(files, results):
+        if error is not None:
+            print(f"  Error transcoding {path}: {error}")
+            errors += 1
+        elif done:
+            transcoded += 1
+    pruned, _ = AudioCache(audio_dir, sr, max_bytes).prune()
+
+    return {
+        "files": len(files),
+        "transcoded": transcoded,
+        "errors": errors,
+        "pruned": pruned,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+class AudioLoader:
+    """
+    Décodage unique et partagé: les étapes features et transcription d'un même fichier
+    réutilisent le même signal. Thread-safe (un décodage en cours est attendu, pas
+    relancé); les max_items derniers signaux restent en mémoire, invalidés si le
+    fichier change sur le disque. audio_cache: AudioCache consulté avant tout décodage.
+    """
+
+    def __init__(self, sr=ANALYSIS_SR, max_items=8, audio_cache=None):
+        self.sr = sr
+        self.audio_cache = audio_cache
+        self.max_items = max_items
+        self.decodes = 0
+        self._signals = OrderedDict()  # chemin -> ((mtime, taille), signal)
+        self._pending = {}             # chemin -> Event du décodage en cours
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        current = stat_key(path)
+        while True:
+            with self._lock:
+                entry = self._signals.get(path)
+                if entry is not None and entry[0] == current:
+                    self._signals.move_to_end(path)
+                    return entry[1]
+                waiting = self._pending.get(path)
+                if waiting is None:
+                    done = self._pending[path] = threading.Event()
+                    break
+            waiting.wait()
+
+        try:
+            y = load_audio(path, self.sr, self.audio_cache)
+            with self._lock:
+                self.decodes += 1
+                self._signals[path] = (current, y)
+                self._signals.move_to_end(path)
+                while len(self._signals) > self.max_items:
+                    self._signals.popitem(last=False)
+            return y
+        finally:
+            with self._lock:
+                del self._pending[path]
+            done.set()
+
+    def __call__(self, path):
+        return self.load(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-transcodes the corpus to 16 kHz mono float32 (.npy).")
+    parser.add_argument("--root", default=default_path("samples"))
+    parser.add_argument("--audio-dir", default=default_path("audio_cache"))
+    parser.add_argument("--sr", type=int, default=ANALYSIS_SR)
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_CACHE_BYTES / 1024 ** 2,
+                        help="cache size cap, least recently used entries are removed first")
+    args = parser.parse_args()
+
+    summary = normalize_corpus(args.root, args.audio_dir, args.sr, args.jobs, int(args.max_mb * 1024 ** 2))
+    print(f"  Files: {summary['files']} ({summary['transcoded']} transcoded, {summary['errors']} errors, "
+          f"{summary['pruned']} old entries pruned)")
+    print(f"  Time: {summary['seconds']:.2f}s")
@@ -0,0 +1,206 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+from sklearn.mixture import GaussianMixture
+
+import comparaison
+import dtw_engine
+from audio_io import decode_audio
+from corpus import AUDIO_EXTENSIONS
+from dtw import compute_dynamic_features
+from feature_store import default_path
+from gmm import UBM_NAME, GMMVoiceAuth, compute_features
+
+# Une étape est plus lente que la référence au-delà de ce rapport de médianes
+DEFAULT_TOLERANCE = 0.10
+
+
+def corpus_files(root=default_path("samples"), limit=None):
+    """
+    Fichiers audio de root (récursivement) décodables sans backend externe, triés.
+    """
+    files = []
+    for directory, _, entries in os.walk(root):
+        for entry in sorted(entries):
+            if os.path.splitext(entry)[1].lower() not in AUDIO_EXTENSIONS or entry.startswith("."):
+                continue
+            path = os.path.join(directory, entry)
+            try:
+                decode_audio(path)
+            except Exception as e:
+                print(f"  Skipping {path}: {type(e).__name__}")
+                continue
+            files.append(path)
+    files.sort()
+    return files[:limit] if limit else files
+
+
+def measure(func, items, repeat=1):
+    """
+    Appelle func sur chaque élément (repeat passes). Retourne les statistiques de latence,
+    le débit et le pic mémoire (tracemalloc, mesuré sur une passe séparée non chronométrée).
+    """
+    items = list(items)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            t0 = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+
+    tracemalloc.start()
+    for item in items:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = np.array(latencies) * 1000.0
+    return {
+        "calls": len(latencies),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(ms, 90)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "throughput_per_s": round(len(latencies) / total, 3) if total > 0 else None,
+        "peak_bytes": int(peak),
+    }
+
+
+def _pairs(n, limit):
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    return pairs[:limit]
+
+
+def run_benchmarks(root=default_path("samples"), repeat=3, populations=(10, 100, 1000), max_files=None,
+                   max_pairs=200):
+    """
+    Exécute toutes les étapes sur le corpus et retourne le rapport (dict sérialisable en JSON).
+    Les caches disque sont désactivés: on mesure le calcul, pas la lecture d'un cache.
+    """
+    files = corpus_files(root, max_files)
+    if len(files) < 2:
+        raise ValueError(f"Not enough decodable audio files in {root}")
+    stages = {}
+
+    print(f"Benchmarking on {len(files)} files from {root}")
+
+    stages["decode"] = measure(decode_audio, files, repeat)
+    stages["dtw_features"] = measure(compute_dynamic_features, files, repeat)
+    stages["gmm_features"] = measure(compute_features, files, repeat)
+    stages["mvp_features"] = measure(comparaison.extraire_caracteristiques_avancees, files, repeat)
+
+    dtw_feats = [f for f in (compute_dynamic_features(path) for path in files) if f is not None]
+    pairs = _pairs(len(dtw_feats), max_pairs)
+    stages["dtw_pair"] = measure(lambda p: dtw_engine.dtw(dtw_feats[p[0]], dtw_feats[p[1]]), pairs, repeat)
+
+    mvp_feats = [comparaison.extraire_caracteristiques_avancees(path) for path in files]
+    mvp_feats = [f for f in mvp_feats if f[0] is not None]
+    pairs = _pairs(len(mvp_feats), max_pairs)
+    stages["composite_pair"] = measure(
+        lambda p: comparaison.calculer_score_composite(mvp_feats[p[0]][0], mvp_feats[p[1]][0],
+                                                       mvp_feats[p[0]][1], mvp_feats[p[1]][1]),
+        pairs, repeat)
+
+    # Modèle de fond entraîné sur tout le corpus (hors chronométrage)
+    gmm_feats = [compute_features(path) for path in files]
+    ubm = GaussianMixture(n_components=16, covariance_type='diag', random_state=0).fit(np.vstack(gmm_feats))
+    stages["gmm_score"] = measure(ubm.score, gmm_feats, repeat)
+
+    # Identification contre des populations synthétiques: locuteurs MAP-adaptés sur les fichiers du corpus
+    with tempfile.TemporaryDirectory() as model_dir:
+        for size in populations:
+            auth = GMMVoiceAuth(model_dir=model_dir, feature_dir=None, audio_dir=None, enroll_method="map")
+            auth.models[UBM_NAME] = ubm
+            adapted = [auth.map_adapt(X) for X in gmm_feats]
+            for i in range(size):
+                auth.models[f"speaker_{i:05d}"] = adapted[i % len(adapted)]
+            auth.score_all(gmm_feats[0])  # construction de la banque hors chronométrage
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                stages[f"identify_speaker_{size}"] = measure(auth.identify_speaker, files[:10], repeat)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "root": root,
+            "files": len(files),
+            "repeat": repeat,
+        },
+        "stages": stages,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare deux rapports étape par étape (médiane et pic mémoire).
+    Retourne la liste des lignes {stage, p50 avant/après, ratio, regression}.
+    """
+    rows = []
+    for stage, now in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if before is None:
+            continue
+        ratio = now["p50_ms"] / before["p50_ms"] if before["p50_ms"] > 0 else float("inf")
+        rows.append({
+            "stage": stage,
+            "baseline_p50_ms": before["p50_ms"],
+            "p50_ms": now["p50_ms"],
+            "ratio": round(ratio, 3),
+            "baseline_peak_bytes": before["peak_bytes"],
+            "peak_bytes": now["peak_bytes"],
+            "regression": ratio > 1.0 + tolerance,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the voice pipeline hot paths on the samples corpus.")
+    parser.add_argument("--root", default=default_path("samples"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--populations", default="10,100,1000", help="speaker counts for identify_speaker")
+    parser.add_argument("--max-files", type=int, default=None)
+    parser.add_argument("--max-pairs", type=int, default=200)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    populations = [int(n) for n in args.populations.split(",") if n]
+    report = run_benchmarks(args.root, args.repeat, populations, args.max_files, args.max_pairs)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'stage':<26}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'per s':>10}{'peak MB':>10}")
+    for stage, r in report["stages"].items():
+        print(f"{stage:<26}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['throughput_per_s']:>10.1f}{r['peak_bytes'] / 1e6:>10.2f}")
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        print(f"\n--- Comparison with {args.baseline} ---")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"  {row['stage']:<26}{row['baseline_p50_ms']:>10.2f} -> {row['p50_ms']:>10.2f} ms (x{row['ratio']:.2f}){flag}")
+        if any(row["regression"] for row in rows):
+            raise SystemExit(1)
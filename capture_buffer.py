@@ -0,0 +1,99 @@
+import queue
+import threading
+
+import numpy as np
+import soundfile as sf
+
+
+def to_pcm16(samples):
+    """
+    Échantillons float arrondis en int16, exactement tels qu'ils sont écrits dans un WAV PCM 16 bits.
+    """
+    return np.clip(np.round(np.asarray(samples) * 32768.0), -32768, 32767).astype(np.int16)
+
+
+class CaptureBuffer:
+    """
+    Tampon de capture audio préalloué (float32), rempli par le callback sans allocation par bloc.
+
+    La zone mémoire double de taille quand elle est pleine (rare: prévoir une capacité
+    initiale adaptée à la durée attendue) et reste allouée d'un enregistrement à l'autre.
+    view() renvoie les échantillons écrits sans copie.
+    """
+
+    def __init__(self, channels=1, capacity=16000 * 60, dtype=np.float32):
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    def write(self, block):
+        n = len(block)
+        end = self.size + n
+        if end > len(self._data):
+            grown = np.zeros((max(end, 2 * len(self._data)), self._data.shape[1]), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:end] = block
+        self.size = end
+
+    def view(self):
+        """
+        Échantillons enregistrés, forme (n, channels). Vue sur le tampon: valable jusqu'au prochain reset().
+        """
+        return self._data[:self.size]
+
+    def reset(self):
+        self.size = 0
+
+
+class StreamingWavWriter:
+    """
+    Écriture directe sur disque pour les longs enregistrements.
+
+    Le callback ne fait que déposer une copie du bloc dans une file (SimpleQueue, sans
+    verrou côté producteur); un thread d'arrière-plan l'écrit dans un SoundFile ouvert
+    en écriture et vide régulièrement les tampons. close() finalise l'en-tête WAV.
+    La mémoire reste constante quelle que soit la durée.
+    """
+
+    def __init__(self, path, samplerate, channels=1, flush_seconds=1.0):
+        self.path = path
+        self.frames_written = 0
+        self._flush_frames = int(flush_seconds * samplerate)
+        self._queue = queue.SimpleQueue()
+        self._file = sf.SoundFile(path, mode='w', samplerate=samplerate, channels=channels)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, block):
+        """
+        Appelé depuis le callback audio: copie du bloc (le tampon de sounddevice est réutilisé).
+        """
+        self._queue.put(block.copy())
+
+    def _run(self):
+        since_flush = 0
+        while True:
+            block = self._queue.get()
+            if block is None:
+                break
+            self._file.write(block)
+            self.frames_written += len(block)
+            since_flush += len(block)
+            if since_flush >= self._flush_frames:
+                self._file.flush()
+                since_flush = 0
+
+    def close(self):
+        """
+        Vide la file, attend le thread d'écriture et ferme le fichier (en-tête finalisé).
+        """
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
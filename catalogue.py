@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+
+import soundfile as sf
+
+from corpus import AUDIO_EXTENSIONS, split_take
+from feature_store import default_path, file_digest, stat_key
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    path        TEXT PRIMARY KEY,   -- relatif à root, ex. "p05/Simon_1.wav"
+    directory   TEXT NOT NULL,      -- "" pour les fichiers à la racine
+    speaker     TEXT NOT NULL,      -- préfixe du nom de fichier (corpus.split_take)
+    take        INTEGER,
+    duration    REAL,
+    sample_rate INTEGER,
+    hash        TEXT NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    features    TEXT NOT NULL DEFAULT '[]'  -- extracteurs présents dans le cache de features
+);
+CREATE INDEX IF NOT EXISTS samples_by_speaker ON samples (speaker);
+"""
+
+
+class SampleCatalog:
+    """
+    Catalogue SQLite des enregistrements de root (racine et sous-dossiers pNN/).
+
+    sync() ne relit que les fichiers nouveaux ou modifiés (date/taille); add() enregistre
+    un fichier qu'on vient de sauvegarder. Les listes et le prochain numéro de prise
+    d'un locuteur sont des requêtes indexées, sans parcours du dossier.
+    feature_configs: {nom: FEATURE_CONFIG} dont on suit la présence dans feature_store.
+    """
+
+    def __init__(self, root=default_path("samples"), db_path=default_path("sample_catalog.sqlite"), feature_store=None,
+                 feature_configs=None):
+        self.root = root
+        self.feature_store = feature_store
+        self.feature_configs = feature_configs or {}
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def relative(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _scan(self):
+        """
+        {chemin relatif: (mtime, taille)} des fichiers audio, fichiers cachés exclus.
+        """
+        found = {}
+        for directory, subdirs, entries in os.walk(self.root):
+            subdirs[:] = [d for d in subdirs if not d.startswith(".")]
+            for entry in entries:
+                if entry.startswith(".") or os.path.splitext(entry)[1].lower() not in AUDIO_EXTENSIONS:
+                    continue
+                path = os.path.join(directory, entry)
+                found[self.relative(path)] = stat_key(path)
+        return found
+
+    def _row(self, rel_path, stat=None):
+        path = os.path.join(self.root, rel_path)
+        mtime_ns, size = stat or stat_key(path)
+        directory, name = os.path.split(rel_path)
+        speaker, take = split_take(os.path.splitext(name)[0])
+        try:
+            info = sf.info(path)
+            duration, sample_rate = info.duration, info.samplerate
+        except Exception:
+            # m4a: format non lu par libsndfile, la durée reste inconnue
+            duration, sample_rate = None, None
+        digest = file_digest(path)
+        return (rel_path, directory, speaker, take, duration, sample_rate, digest, mtime_ns, size,
+                json.dumps(self._cached_features(digest)))
+
+    def _cached_features(self, digest):
+        if self.feature_store is None:
+            return []
+        return [name for name, config in self.feature_configs.items()
+                if self.feature_store.contains_digest(digest, config)]
+
+    def _upsert(self, rows):
+        self.db.executemany("INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def sync(self):
+        """
+        Met le catalogue à jour avec le disque. Retourne (ajoutés/modifiés, supprimés).
+        """
+        on_disk = self._scan()
+        known = {path: (mtime, size) for path, mtime, size in self.db.execute("SELECT path, mtime_ns, size FROM samples")}
+
+        changed = [path for path, stat in on_disk.items() if known.get(path) != stat]
+        removed = [path for path in known if path not in on_disk]
+
+        with self.db:
+            self._upsert([self._row(path, on_disk[path]) for path in changed])
+            self.db.executemany("DELETE FROM samples WHERE path = ?", [(path,) for path in removed])
+        return len(changed), len(removed)
+
+    def add(self, path):
+        """
+        Enregistre (ou met à jour) un fichier qui vient d'être écrit sous root.
+        """
+        with self.db:
+            self._upsert([self._row(self.relative(path))])
+
+    def refresh_features(self, paths=None):
+        """
+        Recalcule la présence dans le cache de features à partir des hash stockés (sans relire l'audio),
+        pour tout le catalogue ou seulement les fichiers paths.
+        """
+        if paths is None:
+            rows = self.db.execute("SELECT path, hash FROM samples").fetchall()
+        else:
+            rows = [row for path in paths
+                    for row in self.db.execute("SELECT path, hash FROM samples WHERE path = ?", (self.relative(path),))]
+        with self.db:
+            self.db.executemany("UPDATE samples SET features = ? WHERE path = ?",
+                                [(json.dumps(self._cached_features(digest)), path) for path, digest in rows])
+
+    def list_paths(self, directory=None):
+        """
+        Chemins relatifs triés, pour tout le catalogue ou un seul dossier ("" = racine).
+        """
+        if directory is None:
+            rows = self.db.execute("SELECT path FROM samples ORDER BY path")
+        else:
+            rows = self.db.execute("SELECT path FROM samples WHERE directory = ? ORDER BY path", (directory,))
+        return [path for path, in rows]
+
+    def by_speaker(self, speaker, directory=None):
+        """
+        Prises d'un locuteur: liste de dicts (path, take, duration, sample_rate, hash, features).
+        """
+        query = "SELECT path, take, duration, sample_rate, hash, features FROM samples WHERE speaker = ?"
+        params = [speaker]
+        if directory is not None:
+            query += " AND directory = ?"
+            params.append(directory)
+        rows = self.db.execute(query + " ORDER BY take, path", params)
+        return [{"path": path, "take": take, "duration": duration, "sample_rate": sample_rate,
+                 "hash": digest, "features": json.loads(features)}
+                for path, take, duration, sample_rate, digest, features in rows]
+
+    def next_take(self, speaker, directory=""):
+        """
+        Prochain numéro libre parmi les fichiers "<speaker>_<numéro>.<ext>" du dossier.
+        Parcours d'une plage de la clé primaire (préfixe du chemin), pas de tout le catalogue;
+        le numéro est ensuite vérifié sur le disque (fichier ajouté depuis le dernier sync).
+        """
+        prefix = f"{directory}/{speaker}_" if directory else f"{speaker}_"
+        upper = prefix[:-1] + chr(ord("_") + 1)
+        rows = self.db.execute("SELECT path FROM samples WHERE path >= ? AND path < ?", (prefix, upper))
+
+        numbers = []
+        for path, in rows:
+            rest = os.path.splitext(path[len(prefix):])[0]
+            if rest.isdigit():
+                numbers.append(int(rest))
+        take = max(numbers) + 1 if numbers else 1
+        base = os.path.join(self.root, directory, speaker)
+        while any(os.path.exists(f"{base}_{take}{ext}") for ext in AUDIO_EXTENSIONS):
+            take += 1
+        return take
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
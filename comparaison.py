@@ -0,0 +1,305 @@
+import difflib
+from functools import lru_cache
+
+import librosa
+import numpy as np
+from scipy.spatial.distance import cosine
+from scipy.stats import pearsonr
+
+import asr
+from audio_io import load_audio
+from dtw_engine import dtw
+from streaming_features import mfcc_basis
+
+# Paramètres de extraire_caracteristiques_avancees, utilisés comme clé du cache de features
+CONFIG_CARACTERISTIQUES = {
+    "extractor": "mvp_avancees",
+    # 2: MFCC, chroma et contraste spectral calculés sur une seule STFT
+    "version": 2,
+    "sr": 16000,
+    "top_db": 20,
+    "n_mfcc": 20,
+    "delta_order": 2,
+}
+
+# Options Whisper des transcriptions comparées (partie de la clé du cache de transcriptions)
+OPTIONS_TRANSCRIPTION = {"word_timestamps": True, "fp16": False}
+
+# Paramètres de la STFT partagée (ceux par défaut de librosa.feature)
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+
+
+@lru_cache(maxsize=64)
+def chroma_basis(sr, n_fft, tuning):
+    """
+    Banc de filtres chroma (12, 1 + n_fft // 2) pour un accord donné (résolution 0.01).
+    """
+    return librosa.filters.chroma(sr=sr, n_fft=n_fft, tuning=tuning)
+
+
+def pretraiter_audio(y):
+    """Pré-traitement audio avancé"""
+    try:
+        # Supprimer les silences aux extrémités
+        y_trimmed, _ = librosa.effects.trim(y, top_db=CONFIG_CARACTERISTIQUES["top_db"])
+
+        y_normalized = librosa.util.normalize(y_trimmed)
+
+        return y_normalized
+    except Exception as e:
+        print(f"Erreur lors du prétraitement: {e}")
+        return y
+
+
+def calculer_caracteristiques(y, sr):
+    """
+    MFCC, deltas, chroma, contraste spectral et ZCR d'un signal prétraité, normalisés
+    par ligne. Retourne (caracteristiques_norm, mfccs).
+
+    Une seule STFT par fichier: le spectre de puissance alimente le mel/MFCC et le
+    chroma, son module le contraste spectral (mêmes valeurs que les fonctions de
+    librosa.feature appelées séparément). Les matrices mel, DCT et chroma sont
+    calculées une fois par configuration.
+    """
+    n_mfcc = CONFIG_CARACTERISTIQUES["n_mfcc"]
+    magnitude = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    puissance = magnitude ** 2
+
+    # 1. MFCC avec plus de coefficients
+    mel_basis, dct = mfcc_basis(sr, N_FFT, N_MELS, n_mfcc)
+    mfccs = dct @ librosa.power_to_db(mel_basis @ puissance)
+
+    # 2. Delta MFCC
+    mfcc_delta = librosa.feature.delta(mfccs)
+
+    # 3. Delta-Delta MFCC
+    mfcc_delta2 = librosa.feature.delta(mfccs, order=2)
+
+    # 4. Chroma
+    accord = librosa.estimate_tuning(S=puissance, sr=sr, n_fft=N_FFT)
+    chroma = librosa.util.normalize(chroma_basis(sr, N_FFT, float(accord)) @ puissance, norm=np.inf, axis=0)
+
+    # 5. Spectral Contrast
+    spectral_contrast = librosa.feature.spectral_contrast(S=magnitude, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH)
+
+    # 6. Zero Crossing Rate
+    zcr = librosa.feature.zero_crossing_rate(y)
+
+    # Combiner toutes les caractéristiques
+    caracteristiques = np.vstack([
+        mfccs,
+        mfcc_delta,
+        mfcc_delta2,
+        chroma,
+        spectral_contrast,
+        zcr
+    ])
+
+    # Normaliser
+    caracteristiques_norm = (caracteristiques - np.mean(caracteristiques, axis=1, keepdims=True)) / (np.std(caracteristiques, axis=1, keepdims=True) + 1e-10)
+    return caracteristiques_norm, mfccs
+
+
+def extraire_caracteristiques_avancees(chemin_audio, feature_store=None, y=None, chargeur=None):
+    """
+    Extraction de caractéristiques vocales enrichies d'un fichier.
+    y: signal déjà décodé à 16 kHz; chargeur: fonction chemin -> signal (ex. audio_io.AudioLoader).
+    Retourne (caracteristiques, mfccs), ou (None, None) en cas d'erreur.
+    """
+    try:
+        # Cache disque
+        if feature_store is not None:
+            stockees = feature_store.load(chemin_audio, CONFIG_CARACTERISTIQUES)
+            if stockees is not None:
+                return stockees["caracteristiques"], stockees["mfccs"]
+
+        # Charger l'audio (décodage partagé avec la transcription)
+        sr = CONFIG_CARACTERISTIQUES["sr"]
+        if y is None:
+            y = chargeur(chemin_audio) if chargeur is not None else load_audio(chemin_audio, sr)
+
+        # Pré-traiter
+        y = pretraiter_audio(y)
+
+        caracteristiques_norm, mfccs = calculer_caracteristiques(y, sr)
+
+        if feature_store is not None:
+            feature_store.save(chemin_audio, CONFIG_CARACTERISTIQUES,
+                               {"caracteristiques": caracteristiques_norm, "mfccs": mfccs})
+        return caracteristiques_norm, mfccs
+    except Exception as e:
+        print(f"Erreur lors de l'extraction: {e}")
+        return None, None
+
+
+def calculer_similarite_dtw(feat1, feat2):
+    """Calcul de similarité avec DTW (Dynamic Time Warping)"""
+    try:
+        # Utiliser DTW pour comparer les séquences de différentes longueurs
+        distance, _ = dtw(feat1.T, feat2.T)
+
+        # Normaliser par la longueur moyenne
+        longueur_moyenne = (feat1.shape[1] + feat2.shape[1]) / 2
+        distance_normalisee = distance / longueur_moyenne
+
+        # Convertir en similarité
+        similarite_dtw = 100 * np.exp(-distance_normalisee / 15)
+
+        return similarite_dtw, distance_normalisee
+    except Exception as e:
+        print(f"Erreur DTW: {e}")
+        return 0, float('inf')
+
+
+def calculer_similarite_cosine(feat1, feat2):
+    """Calcul de similarité cosinus"""
+    try:
+        # Aplatir et calculer la similarité cosinus
+        min_frames = min(feat1.shape[1], feat2.shape[1])
+        feat1_flat = feat1[:, :min_frames].flatten()
+        feat2_flat = feat2[:, :min_frames].flatten()
+
+        # Similarité cosinus (1 = identique, 0 = différent)
+        cos_sim = 1 - cosine(feat1_flat, feat2_flat)
+
+        # Convertir en pourcentage
+        similarite_cos = max(0, cos_sim * 100)
+
+        return similarite_cos
+    except Exception as e:
+        print(f"Erreur cosine: {e}")
+        return 0
+
+
+def calculer_correlation(feat1, feat2):
+    """Calcul de corrélation de Pearson"""
+    try:
+        min_frames = min(feat1.shape[1], feat2.shape[1])
+        feat1_flat = feat1[:, :min_frames].flatten()
+        feat2_flat = feat2[:, :min_frames].flatten()
+
+        # Corrélation de Pearson
+        corr, _ = pearsonr(feat1_flat, feat2_flat)
+
+        # Convertir en pourcentage
+        similarite_corr = max(0, (corr + 1) / 2 * 100)
+
+        return similarite_corr
+    except Exception as e:
+        print(f"Erreur corrélation: {e}")
+        return 0
+
+
+def calculer_score_composite(feat1, feat2, mfcc1, mfcc2):
+    """Calcul d'un score composite pondéré"""
+    try:
+        # 1. Similarité DTW
+        sim_dtw, dist_dtw = calculer_similarite_dtw(mfcc1, mfcc2)
+
+        # 2. Similarité cosinus
+        sim_cos = calculer_similarite_cosine(feat1, feat2)
+
+        # 3. Corrélation
+        sim_corr = calculer_correlation(feat1, feat2)
+
+        # Score composite pondéré
+        score_final = (0.40 * sim_dtw + 0.30 * sim_cos + 0.30 * sim_corr)
+
+        details = {
+            'dtw': sim_dtw,
+            'cosine': sim_cos,
+            'correlation': sim_corr,
+            'distance_dtw': dist_dtw
+        }
+
+        return score_final, details
+    except Exception as e:
+        print(f"Erreur score composite: {e}")
+        return 0, {}
+
+
+def transcrire(chemin_audio, modele=asr.DEFAULT_MODEL, cache=None, decodeur=None, strict=False):
+    """
+    Transcription d'un fichier pour la comparaison de textes.
+    Retourne (texte, mots, nombre de mots), ("", [], 0) en cas d'erreur.
+    strict: l'erreur est propagée au lieu d'être remplacée par une transcription vide.
+    """
+    try:
+        result = asr.transcribe_cached(chemin_audio, modele, cache, decodeur, **OPTIONS_TRANSCRIPTION)
+
+        texte = result.get("text", "").strip()
+        mots = texte.split()
+
+        return texte, mots, len(mots)
+    except Exception as e:
+        if strict:
+            raise
+        print(f"Erreur lors de la transcription: {e}")
+        return "", [], 0
+
+
+def normaliser_mot(mot):
+    return ''.join(c.lower() for c in mot if c.isalnum())
+
+
+def comparer_textes(mots1, mots2):
+    """
+    Comparaison mot à mot de deux transcriptions.
+    Retourne (ratio de similarité en %, mots ajoutés dans mots2, mots supprimés de mots1).
+    """
+    # Normaliser les mots
+    mots1_norm = [normaliser_mot(m) for m in mots1 if normaliser_mot(m)]
+    mots2_norm = [normaliser_mot(m) for m in mots2 if normaliser_mot(m)]
+
+    # Utiliser difflib pour trouver les différences
+    matcher = difflib.SequenceMatcher(None, mots1_norm, mots2_norm)
+
+    # Calculer le ratio de similarité
+    ratio = matcher.ratio() * 100
+
+    # Trouver les mots ajoutés et supprimés
+    mots_ajoutes = []
+    mots_supprimes = []
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'delete':
+            mots_supprimes.extend(mots1[i1:i2])
+        elif tag == 'insert':
+            mots_ajoutes.extend(mots2[j1:j2])
+
+    return ratio, mots_ajoutes, mots_supprimes
+
+
+def interpreter_score_vocal(score_final):
+    """
+    Niveau de confiance vocale d'un score composite: (confiance, interprétation).
+    """
+    if score_final > 85:
+        return "HAUTE", "✓✓ Voix TRÈS SIMILAIRES - Même personne avec haute confiance"
+    elif score_final > 70:
+        return "BONNE", "✓ Voix similaires - Probablement la même personne"
+    elif score_final > 55:
+        return "MOYENNE", "⚠ Voix moyennement similaires - Possiblement la même personne"
+    else:
+        return "FAIBLE", "✗ Voix DIFFÉRENTES - Probablement pas la même personne"
+
+
+def determiner_verdict(score_final, ratio_texte):
+    """
+    Verdict final à partir du score vocal et de la similarité textuelle:
+    (verdict, conclusion, explication).
+    """
+    if score_final > 80 and ratio_texte > 70:
+        return "MATCH CONFIRMÉ", "MÊME PERSONNE - Haute confiance", "Voix ET contenu très similaires"
+    elif score_final > 80 and ratio_texte <= 70:
+        return "MATCH PROBABLE", "MÊME PERSONNE - Bonne confiance", "Même voix mais contenu différent"
+    elif score_final > 65 and ratio_texte > 60:
+        return ("MATCH POSSIBLE", "PROBABLEMENT LA MÊME PERSONNE",
+                "Similarités vocales et textuelles moyennes")
+    elif score_final <= 65 and ratio_texte > 80:
+        return ("PAS DE MATCH", "Personnes DIFFÉRENTES mais contenu similaire",
+                "Attention: phrases identiques prononcées par des voix différentes")
+    else:
+        return "PAS DE MATCH", "PERSONNES DIFFÉRENTES - Haute confiance", "Voix ET contenu différents"
@@ -0,0 +1,219 @@
+import argparse
+import contextlib
+import csv
+import json
+import math
+import os
+import sys
+import time
+import warnings
+from collections import Counter
+from functools import lru_cache, partial
+
+import asr
+import comparaison
+from audio_io import AudioCache, AudioLoader, load_audio
+from comparaison import CONFIG_CARACTERISTIQUES
+from corpus import AUDIO_EXTENSIONS
+from feature_store import FeatureStore, default_path
+from workers import map_files
+
+
+def read_pairs(path, root=""):
+    """
+    Paires de fichiers d'une liste: une paire par ligne, séparée par une virgule, un
+    point-virgule, une tabulation ou des espaces (CSV avec ou sans en-tête sur la première ligne).
+    Lignes vides et commentaires (#) ignorés; chemins relatifs résolus depuis root.
+    path: fichier, ou "-" pour l'entrée standard (qui reste ouverte).
+    """
+    if path == "-":
+        return _parse_pairs(sys.stdin, root)
+    with open(path, "r", newline="") as f:
+        return _parse_pairs(f, root)
+
+
+def _parse_pairs(lines, root):
+    pairs = []
+    first = True
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        delimiter = next((d for d in ",;\t" if d in line), None)
+        row = next(csv.reader([line], delimiter=delimiter)) if delimiter else line.split()
+        row = [field.strip() for field in row if field.strip()]
+
+        # Seule la première ligne peut être un en-tête; elle est signalée comme les autres lignes rejetées
+        if first:
+            first = False
+            if row and not row[0].lower().endswith(AUDIO_EXTENSIONS):
+                print(f"  Ignoring line {number} as a header: {row}")
+                continue
+        if len(row) < 2:
+            print(f"  Ignoring line {number}: expected two files, got {row}")
+            continue
+        pairs.append((os.path.join(root, row[0]), os.path.join(root, row[1])))
+    return pairs
+
+
+# --- Tâches des processus du pool ---
+
+@lru_cache(maxsize=None)
+def _stores(feature_dir, audio_dir):
+    audio_cache = AudioCache(audio_dir, CONFIG_CARACTERISTIQUES["sr"]) if audio_dir else None
+    return FeatureStore(feature_dir), partial(load_audio, sr=CONFIG_CARACTERISTIQUES["sr"], audio_cache=audio_cache)
+
+
+@lru_cache(maxsize=256)
+def _features(path, feature_dir, audio_dir):
+    store, chargeur = _stores(feature_dir, audio_dir)
+    return comparaison.extraire_caracteristiques_avancees(path, store, chargeur=chargeur)
+
+
+def _extract(path, feature_dir, audio_dir):
+    """
+    Remplit le cache de features d'un fichier. Retourne True si l'extraction a réussi.
+    """
+    warnings.filterwarnings("ignore")
+    return _features(path, feature_dir, audio_dir)[0] is not None
+
+
+def _score_pair(pair, feature_dir, audio_dir):
+    """
+    Score composite d'une paire, features lues depuis le cache (mémorisées par processus).
+    """
+    warnings.filterwarnings("ignore")
+    feat1, mfcc1 = _features(pair[0], feature_dir, audio_dir)
+    feat2, mfcc2 = _features(pair[1], feature_dir, audio_dir)
+    score, details = comparaison.calculer_score_composite(feat1, feat2, mfcc1, mfcc2)
+    return float(score), {name: _json_number(value) for name, value in details.items()}
+
+
+def _json_number(value):
+    """
+    float, ou None (null en JSON) pour une valeur non finie comme une distance DTW infinie.
+    """
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def compare_pairs(pairs, output, feature_dir=default_path("feature_cache"), audio_dir=default_path("audio_cache"),
+                  transcription_dir=default_path("transcription_cache"), model=asr.DEFAULT_MODEL, n_jobs=None,
+                  transcribe=True):
+    """
+    Compare chaque paire comme le bouton "Comparer" de VoiceAuthApp et écrit une ligne
+    JSON par paire dans output (objet fichier), dans l'ordre des paires.
+
+    1. Extraction des features de chaque fichier distinct (pool de processus, cache disque).
+    2. Scores composites des paires (pool de processus, features mémorisées par processus).
+    3. Transcriptions (un seul modèle Whisper, cache disque) et verdicts, écrits au fil de l'eau.
+    Whisper n'est chargé qu'au premier fichier absent du cache de transcriptions, après
+    les pools (pas de fork pendant son chargement).
+    Retourne le décompte des verdicts.
+    """
+    files = list(dict.fromkeys(path for pair in pairs for path in pair))
+    missing = {path for path in files if not os.path.exists(path)}
+
+    print(f"--- Extracting features of {len(files) - len(missing)} files ---")
+    extract = partial(_extract, feature_dir=feature_dir, audio_dir=audio_dir)
+    present = [path for path in files if path not in missing]
+    failed = set(missing)
+    for path, (ok, error) in zip(present, map_files(extract, present, n_jobs)):
+        if error is not None or not ok:
+            print(f"  Extraction failed for {path}: {error or 'no features'}")
+            failed.add(path)
+
+    print(f"--- Scoring {len(pairs)} pairs ---")
+    valid = [pair for pair in pairs if pair[0] not in failed and pair[1] not in failed]
+    score = partial(_score_pair, feature_dir=feature_dir, audio_dir=audio_dir)
+    scores = dict(zip(valid, map_files(score, valid, n_jobs)))
+
+    print("--- Transcribing and writing results ---")
+    cache = asr.TranscriptionCache(transcription_dir)
+    sr = CONFIG_CARACTERISTIQUES["sr"]
+    decodeur = AudioLoader(sr=sr, audio_cache=AudioCache(audio_dir, sr) if audio_dir else None)
+    transcriptions = {}
+    verdicts = Counter()
+
+    def transcription(path):
+        """
+        (texte, mots, nombre de mots) d'un fichier, ou l'exception de sa transcription.
+        """
+        if path not in transcriptions:
+            try:
+                transcriptions[path] = comparaison.transcrire(path, model, cache, decodeur, strict=True)
+            except Exception as e:
+                print(f"  Transcription failed for {path}: {e}")
+                transcriptions[path] = e
+        return transcriptions[path]
+
+    for pair in pairs:
+        record = {"sample1": pair[0], "sample2": pair[1]}
+        result, error = scores.get(pair, (None, None))
+        if result is None:
+            bad = [path for path in pair if path in failed]
+            record["error"] = error or "missing or unreadable file: " + ", ".join(bad)
+        else:
+            score_final, details = result
+            confiance_vocale, _ = comparaison.interpreter_score_vocal(score_final)
+            record.update(score=score_final, **details, voice_confidence=confiance_vocale)
+
+            erreurs = [f"{path}: {transcription(path)}" for path in pair
+                       if transcribe and isinstance(transcription(path), Exception)]
+            if erreurs:
+                # Pas de verdict sans les deux transcriptions (un texte vide passerait pour identique)
+                record["error"] = "transcription failed for " + "; ".join(erreurs)
+            elif transcribe:
+                texte1, mots1, nb_mots1 = transcription(pair[0])
+                texte2, mots2, nb_mots2 = transcription(pair[1])
+                ratio_texte, mots_ajoutes, mots_supprimes = comparaison.comparer_textes(mots1, mots2)
+                verdict, _, _ = comparaison.determiner_verdict(score_final, ratio_texte)
+                record.update(text1=texte1, text2=texte2, words1=nb_mots1, words2=nb_mots2,
+                              text_ratio=ratio_texte, words_added=mots_ajoutes,
+                              words_removed=mots_supprimes, verdict=verdict)
+                verdicts[verdict] += 1
+            else:
+                verdicts[confiance_vocale] += 1
+
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        if "error" in record:
+            verdicts["error"] += 1
+
+    print(f"Transcription cache: {cache.hits} hits, {cache.misses} misses")
+    return verdicts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless batch comparison of audio file pairs (composite voice score, "
+                                                 "transcript diff and verdict of the GUI), one JSON line per pair.")
+    parser.add_argument("pairs", help="list or CSV of file pairs ('-' for stdin)")
+    parser.add_argument("--root", default="", help="directory the relative paths of the list are resolved from")
+    parser.add_argument("--output", default="compare_batch.jsonl", help="JSON lines output ('-' for stdout)")
+    parser.add_argument("--feature-dir", default=default_path("feature_cache"))
+    parser.add_argument("--audio-dir", default=default_path("audio_cache"))
+    parser.add_argument("--transcription-dir", default=default_path("transcription_cache"))
+    parser.add_argument("--model", default=asr.DEFAULT_MODEL, help="Whisper model")
+    parser.add_argument("--no-transcription", action="store_true", help="voice scores only (no text diff nor verdict)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    pairs = read_pairs(args.pairs, args.root)
+    start = time.perf_counter()
+    if args.output == "-":
+        # Résultats sur stdout, messages de progression sur stderr
+        out = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            verdicts = compare_pairs(pairs, out, args.feature_dir, args.audio_dir, args.transcription_dir,
+                                     args.model, args.jobs, not args.no_transcription)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            verdicts = compare_pairs(pairs, f, args.feature_dir, args.audio_dir, args.transcription_dir,
+                                     args.model, args.jobs, not args.no_transcription)
+
+    log = sys.stderr if args.output == "-" else sys.stdout
+    print(f"\n{len(pairs)} pairs in {time.perf_counter() - start:.1f}s", file=log)
+    for verdict, n in verdicts.most_common():
+        print(f"  {verdict}: {n}", file=log)
+    if args.output != "-":
+        print(f"Results written to {args.output}")
@@ -0,0 +1,192 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from functools import partial
+
+from audio_io import AudioCache
+from dtw import DTWVoiceAuth, compute_dynamic_features
+from feature_store import FeatureStore, default_path, file_digest
+from gmm import UBM_NAME, GMMVoiceAuth, compute_features
+from workers import map_files
+
+AUDIO_EXTENSIONS = (".wav", ".m4a")
+
+# Trailing take number: "simon_1", "tiago_01", "b1", "Victor_01_1"
+_TAKE_SUFFIX = re.compile(r"[_-]?(\d+)$")
+
+
+def split_take(stem):
+    """
+    Splits a file stem into (speaker prefix, take number).
+    "simon_wrongvoice_01" -> ("simon_wrongvoice", 1), "Victor_01_1" -> ("Victor", 1), "b1" -> ("b", 1).
+    """
+    prefix, take = stem, None
+    while True:
+        match = _TAKE_SUFFIX.search(prefix)
+        if match is None or match.start() == 0:
+            break
+        if take is None:
+            take = int(match.group(1))
+        prefix = prefix[:match.start()]
+    return prefix, take
+
+
+def discover_speakers(root=default_path("samples"), pattern="p*"):
+    """
+    Groups the corpus files per speaker from the samples/pNN/ layout.
+    Speaker id = "<directory>_<filename prefix>", e.g. samples/p13/simon_2.wav -> "p13_simon".
+    Returns {speaker_id: [sorted file paths]}.
+    """
+    speakers = {}
+    for directory in sorted(glob.glob(os.path.join(root, pattern))):
+        if not os.path.isdir(directory):
+            continue
+        for entry in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(entry)
+            if ext.lower() not in AUDIO_EXTENSIONS:
+                continue
+            prefix, _ = split_take(stem)
+            speaker = f"{os.path.basename(directory)}_{prefix}"
+            speakers.setdefault(speaker, []).append(os.path.join(directory, entry))
+    return speakers
+
+
+def _extract_file(path, feature_store, audio_cache=None):
+    """
+    Worker: fills the feature store for both the DTW and the GMM extractors.
+    """
+    dtw_feat = compute_dynamic_features(path, feature_store, audio_cache)
+    gmm_feat = compute_features(path, feature_store, audio_cache)
+    return (0 if dtw_feat is None else len(dtw_feat)) + len(gmm_feat)
+
+
+def _signature(store, files):
+    """
+    Digest of a speaker's inputs: file names and contents.
+    """
+    h = hashlib.sha1()
+    for f in files:
+        h.update(f.encode())
+        h.update(store.content_digest(f).encode())
+    return h.hexdigest()
+
+
+def enroll_corpus(root=default_path("samples"), model_dir=default_path("voice_models"),
+                  feature_dir=default_path("feature_cache"), method="map", n_jobs=None, retrain_ubm=False,
+                  force=False, audio_dir=default_path("audio_cache")):
+    """
+    Enrolls every speaker of the corpus in the DTW gallery and the GMM bank.
+    The GMM models are saved in model_dir; the DTW galleries are listed in
+    model_dir/corpus_manifest.json (see DTWVoiceAuth.load_gallery).
+
+    Speakers whose files did not change since the last run (and whose UBM is the same)
+    are skipped. The UBM is trained on the whole corpus when missing or on request.
+    Returns a summary dict.
+    """
+    start = time.perf_counter()
+    speakers = discover_speakers(root)
+    store = FeatureStore(feature_dir)
+    audio_cache = AudioCache(audio_dir) if audio_dir else None
+
+    manifest_path = os.path.join(model_dir, "corpus_manifest.json")
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    previous = manifest.get("speakers", {})
+
+    dtw_auth = DTWVoiceAuth(feature_dir=feature_dir, n_jobs=1, audio_dir=audio_dir)
+    gmm_auth = GMMVoiceAuth(model_dir=model_dir, feature_dir=feature_dir, enroll_method=method, n_jobs=1,
+                            audio_dir=audio_dir)
+
+    ubm_path = os.path.join(model_dir, f"{UBM_NAME}.gmm")
+    train_ubm = retrain_ubm or not os.path.exists(ubm_path)
+
+    signatures = {name: _signature(store, files) for name, files in speakers.items()}
+    ubm_digest = None if train_ubm else file_digest(ubm_path)
+
+    def unchanged(name):
+        entry = previous.get(name)
+        return (not force and ubm_digest is not None and entry is not None
+                and entry.get("signature") == signatures[name]
+                and entry.get("ubm") == ubm_digest
+                and os.path.exists(os.path.join(model_dir, f"{name}.gmm")))
+
+    todo = [name for name in speakers if not unchanged(name)]
+    skipped = [name for name in speakers if name not in todo]
+
+    # 1. Feature extraction of every needed file in one worker pool
+    needed = sorted({f for name in (speakers if train_ubm else todo) for f in speakers[name]})
+    failed = set()
+    extract = partial(_extract_file, feature_store=store, audio_cache=audio_cache)
+    for f, (_, error) in zip(needed, map_files(extract, needed, n_jobs)):
+        if error is not None:
+            print(f"  Error extracting {f}: {error}")
+            failed.add(f)
+
+    # 2. Background model: trained once on the whole corpus, reused afterwards
+    if train_ubm:
+        gmm_auth.train_ubm([f for f in needed if f not in failed])
+        ubm_digest = file_digest(ubm_path)
+
+    # 3. Per-speaker enrollment, features now come from the cache
+    for name in todo:
+        files = [f for f in speakers[name] if f not in failed]
+        dtw_auth.enroll_user(name, files)
+        gmm_auth.enroll_user(name, files)
+        previous[name] = {
+            "signature": signatures[name],
+            "ubm": ubm_digest,
+            # Absolute paths: DTWVoiceAuth.load_gallery may run from another directory
+            "files": [os.path.abspath(f) for f in dtw_auth.user_templates.get(name, [])],
+        }
+
+    # Speakers whose directory disappeared are dropped from the manifest, with their model
+    for name in previous:
+        if name not in speakers:
+            gmm_auth.remove_user(name)
+    manifest = {"ubm": ubm_digest, "speakers": {name: previous[name] for name in speakers if name in previous}}
+    os.makedirs(model_dir, exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "speakers": len(speakers),
+        "enrolled": len(todo),
+        "skipped": len(skipped),
+        "files_extracted": len(needed),
+        "errors": len(failed),
+        "ubm_trained": train_ubm,
+        "seconds": round(elapsed, 2),
+        "files_per_second": round(len(needed) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk enrollment of the samples/pNN corpus (DTW gallery + GMM bank).")
+    parser.add_argument("--root", default=default_path("samples"))
+    parser.add_argument("--model-dir", default=default_path("voice_models"))
+    parser.add_argument("--feature-dir", default=default_path("feature_cache"))
+    parser.add_argument("--audio-dir", default=default_path("audio_cache"),
+                        help="pre-transcoded audio (see audio_io.py)")
+    parser.add_argument("--method", choices=["em", "map"], default="map")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--retrain-ubm", action="store_true")
+    parser.add_argument("--force", action="store_true", help="re-enroll unchanged speakers too")
+    args = parser.parse_args()
+
+    summary = enroll_corpus(args.root, args.model_dir, args.feature_dir, args.method,
+                            args.jobs, args.retrain_ubm, args.force, args.audio_dir)
+
+    print("\n--- Corpus enrollment ---")
+    print(f"  Speakers: {summary['speakers']} ({summary['enrolled']} enrolled, {summary['skipped']} unchanged)")
+    print(f"  Files extracted: {summary['files_extracted']} ({summary['errors']} errors)")
+    print(f"  UBM trained: {summary['ubm_trained']}")
+    print(f"  Time: {summary['seconds']:.2f}s ({summary['files_per_second']:.2f} files/s)")
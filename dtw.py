@@ -1,77 +1,212 @@
+import json
 import librosa
 import numpy as np
 import os
 import warnings
-from fastdtw import fastdtw
-from scipy.spatial.distance import euclidean
+from functools import partial
+from dtw_engine import band_radius, dtw, keogh_envelope, lb_keogh, lb_kim, max_path_length
+from audio_io import AudioCache, load_audio
+from feature_store import FeatureCache, FeatureStore, default_path, stat_key
+from instrumentation import metrics
+from workers import map_files
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
+# Parameters of extract_dynamic_features, also used as the feature cache key
+FEATURE_CONFIG = {
+    "extractor": "dtw_dynamic",
+    "version": 1,
+    "sr": 16000,
+    "top_db": 20,
+    "n_mfcc": 13,
+    "delta_order": 2,
+    "cms": True,
+}
+
+
+def compute_dynamic_features(file_path, feature_store=None, audio_cache=None):
+    """
+    MFCC + Deltas with CMS normalization for one file (no in-memory caching).
+    Module-level so that enrollment can run it in worker processes.
+    audio_cache: optional AudioCache holding pre-transcoded 16 kHz copies.
+    Returns None when the file is missing or too short.
+    """
+    if not os.path.exists(file_path):
+        return None
+
+    # Persistent cache, survives process restarts
+    if feature_store is not None:
+        stored = feature_store.load(file_path, FEATURE_CONFIG)
+        if stored is not None:
+            metrics.count("dtw.feature_store.hits")
+            return stored["features"]
+        metrics.count("dtw.feature_store.misses")
+
+    sr = FEATURE_CONFIG["sr"]
+    with metrics.timer("dtw.load"):
+        y = load_audio(file_path, sr, audio_cache)
+    with metrics.timer("dtw.trim"):
+        y, _ = librosa.effects.trim(y, top_db=FEATURE_CONFIG["top_db"])
+
+    if len(y) < 1024:
+        return None
+
+    # 1. MFCC
+    with metrics.timer("dtw.mfcc"):
+        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=FEATURE_CONFIG["n_mfcc"])
+
+    # 2. CMS (Normalize)
+    mfcc = mfcc - np.mean(mfcc, axis=1, keepdims=True)
+
+    # 3. Deltas
+    with metrics.timer("dtw.deltas"):
+        delta = librosa.feature.delta(mfcc)
+        delta2 = librosa.feature.delta(mfcc, order=2)
+
+    features = np.vstack([mfcc, delta, delta2]).T
+    metrics.observe_size("dtw.frames", len(features))
+
+    if feature_store is not None:
+        feature_store.save(file_path, FEATURE_CONFIG, {"features": features})
+    return features
+
 
 class DTWVoiceAuth:
-    def __init__(self):
+    def __init__(self, band=None, feature_dir=default_path("feature_cache"), cache_bytes=256 * 1024 * 1024,
+                 n_jobs=1, audio_dir=default_path("audio_cache")):
+        """
+        band: optional Sakoe-Chiba radius (in frames) for the DTW alignment.
+        feature_dir: on-disk feature cache shared with the other extractors (None to disable).
+        cache_bytes: memory budget of the in-process feature cache (LRU).
+        n_jobs: worker processes for enrollment feature extraction (None = one per core).
+        audio_dir: pre-transcoded 16 kHz copies of the inputs, see audio_io.py (None to disable).
+        """
         self.user_templates = {}
-        self.cache = {}
+        self.template_bounds = {}
+        self.cache = FeatureCache(cache_bytes)
+        self.band = band
+        self.feature_store = FeatureStore(feature_dir) if feature_dir else None
+        self.n_jobs = n_jobs
+        self.audio_cache = AudioCache(audio_dir, FEATURE_CONFIG["sr"]) if audio_dir else None
 
     def extract_dynamic_features(self, file_path):
         """
         Extracts robust MFCC + Deltas with CMS normalization.
         """
-        # Simple caching to avoid re-reading the same enrollment files
-        if file_path in self.cache:
-            return self.cache[file_path]
+        # Bounded caching to avoid re-reading the same enrollment files
+        cached = self.cache.get(file_path)
+        if cached is not None:
+            metrics.count("dtw.memory_cache.hits")
+            return cached
+        metrics.count("dtw.memory_cache.misses")
 
         try:
-            if not os.path.exists(file_path):
-                return None
-
-            y, sr = librosa.load(file_path, sr=16000)
-            y, _ = librosa.effects.trim(y, top_db=20)
-
-            if len(y) < 1024:
-                return None
-
-            # 1. MFCC
-            mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-
-            # 2. CMS (Normalize)
-            mfcc = mfcc - np.mean(mfcc, axis=1, keepdims=True)
-
-            # 3. Deltas
-            delta = librosa.feature.delta(mfcc)
-            delta2 = librosa.feature.delta(mfcc, order=2)
-
-            features = np.vstack([mfcc, delta, delta2]).T
-
-            # Store in cache
-            self.cache[file_path] = features
-            return features
-
+            features = compute_dynamic_features(file_path, self.feature_store, self.audio_cache)
         except Exception as e:
             print(f"Error extracting {file_path}: {e}")
             return None
 
-    def enroll_user(self, name, file_paths):
+        # Store in cache
+        if features is not None:
+            self.cache.put(file_path, features)
+        return features
+
+    def enroll_user(self, name, file_paths, n_jobs=None):
         """
         Registers a list of valid reference files for a user.
+        n_jobs: worker processes used for feature extraction (default: self.n_jobs).
         """
         print(f"--- Enrolling Templates for: {name} ---")
-        valid_files = []
+        existing = []
         for f in file_paths:
             if os.path.exists(f):
-                # Pre-calculate features now to save time later
-                if self.extract_dynamic_features(f) is not None:
-                    valid_files.append(f)
+                existing.append(f)
             else:
                 print(f"  Warning: File not found {f}")
 
+        # Pre-calculate features now to save time later (files not yet in memory, in parallel)
+        missing = [f for f in existing if self.cache.get(f) is None]
+        extract = partial(compute_dynamic_features, feature_store=self.feature_store,
+                          audio_cache=self.audio_cache)
+        failed = set()
+        for f, (feat, error) in zip(missing, map_files(extract, missing, n_jobs or self.n_jobs)):
+            if error is not None:
+                print(f"  Error extracting {f}: {error}")
+                failed.add(f)
+            elif feat is not None:
+                self.cache.put(f, feat)
+
+        valid_files = []
+        for f in existing:
+            if f in failed:
+                continue
+            feat = self.extract_dynamic_features(f)
+            if feat is not None:
+                valid_files.append(f)
+                self.template_bounds[f] = self._template_bounds(f, feat)
+
         self.user_templates[name] = valid_files
         print(f"  {len(valid_files)} templates stored.")
 
-    def verify_passphrase(self, claimed_name, test_file):
+    def load_gallery(self, manifest_path):
+        """
+        Restores the galleries written by corpus.enroll_corpus (corpus_manifest.json).
+        Template features and bounds are rebuilt lazily from the feature store.
+        Returns the number of speakers loaded.
+        """
+        try:
+            with open(manifest_path, "r") as f:
+                speakers = json.load(f).get("speakers", {})
+        except (OSError, ValueError) as e:
+            print(f"Cannot read gallery manifest {manifest_path}: {e}")
+            return 0
+
+        for name, entry in speakers.items():
+            files = [f for f in entry.get("files", []) if os.path.exists(f)]
+            if len(files) < len(entry.get("files", [])):
+                print(f"  Warning: {len(entry['files']) - len(files)} template(s) of {name} not found")
+            self.user_templates[name] = files
+        return len(speakers)
+
+    def _template_bounds(self, ref_file, feat):
+        """
+        Data needed for the lower bounds of a template: end frames (LB_Kim) and LB_Keogh envelope.
+        """
+        lower, upper = keogh_envelope(feat, self.band)
+        return {
+            "path": ref_file,
+            "stat": stat_key(ref_file),
+            "ends": np.array(feat[[0, -1]] if len(feat) > 1 else feat[:1]),
+            "length": len(feat),
+            "lower": lower,
+            "upper": upper,
+        }
+
+    def _lower_bound(self, test_feat, bounds):
+        """
+        Lower bound of the normalized DTW distance between test_feat and a template.
+        """
+        n, m = len(test_feat), bounds["length"]
+        kim = lb_kim(test_feat, bounds["ends"])
+
+        lower, upper = bounds["lower"], bounds["upper"]
+        radius = band_radius(n, m, self.band)
+        if self.band is not None and radius > self.band:
+            # Length difference widens the band beyond the stored envelope
+            ref_feat = self.extract_dynamic_features(bounds["path"])
+            lower, upper = keogh_envelope(ref_feat, radius)
+        keogh = lb_keogh(test_feat, lower, upper)
+
+        return max(kim, keogh) / max_path_length(n, m)
+
+    @metrics.timed("dtw.verify")
+    def verify_passphrase(self, claimed_name, test_file, threshold=None):
         """
         Compares test_file against ALL enrolled templates for this user.
         Returns the BEST (Lowest) distance found.
+
+        Templates are visited in order of their lower bound and the search stops once no
+        remaining template can beat the best distance (or the threshold, if given).
         """
         if claimed_name not in self.user_templates:
             return float('inf'), "User not enrolled"
@@ -81,23 +216,60 @@ class DTWVoiceAuth:
             return float('inf'), "Bad Audio"
 
         # Compare against every template in the user's gallery
-        best_distance = float('inf')
+        best_distance = float('inf') if threshold is None else threshold
         best_template = None
 
         templates = self.user_templates[claimed_name]
 
+        # Cheap lower bounds first, most promising templates first
+        candidates = []
         for ref_file in templates:
-            ref_feat = self.extract_dynamic_features(ref_file)
+            bounds = self.template_bounds.get(ref_file)
+            try:
+                current = stat_key(ref_file)
+            except OSError:
+                # Template deleted since enrollment
+                self.template_bounds.pop(ref_file, None)
+                continue
+            if bounds is None or bounds["stat"] != current:
+                # Template re-recorded since enrollment: bounds must be recomputed
+                ref_feat = self.extract_dynamic_features(ref_file)
+                if ref_feat is None:
+                    self.template_bounds.pop(ref_file, None)
+                    continue
+                bounds = self.template_bounds[ref_file] = self._template_bounds(ref_file, ref_feat)
+            candidates.append((self._lower_bound(test_feat, bounds), ref_file))
+        candidates.sort(key=lambda c: c[0])
+
+        metrics.count("dtw.templates", len(candidates))
+        for i, (bound, ref_file) in enumerate(candidates):
+            if bound >= best_distance:
+                metrics.count("dtw.pruned", len(candidates) - i)
+                break
 
-            # Run DTW
-            dist, path = fastdtw(ref_feat, test_feat, dist=euclidean)
-            normalized_dist = dist / len(path)
+            ref_feat = self.extract_dynamic_features(ref_file)
+            if ref_feat is None:
+                continue
+
+            # Run DTW, abandoned as soon as it can no longer beat the best distance
+            abandon_above = best_distance * max_path_length(len(ref_feat), len(test_feat))
+            with metrics.timer("dtw.align"):
+                dist, path_length = dtw(ref_feat, test_feat, band=self.band,
+                                        abandon_above=abandon_above if np.isfinite(abandon_above) else None)
+            metrics.count("dtw.alignments")
+            if path_length == 0:
+                metrics.count("dtw.abandoned")
+                continue
+            normalized_dist = dist / path_length
 
             # Keep the lowest score (Best Match)
             if normalized_dist < best_distance:
                 best_distance = normalized_dist
                 best_template = os.path.basename(ref_file)
 
+        if best_template is None and threshold is not None:
+            return float('inf'), "Above threshold"
+
         return best_distance, best_template
 
 
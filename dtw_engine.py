@@ -0,0 +1,137 @@
+import numpy as np
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+
+
+def pairwise_distances(x, y):
+    """
+    Euclidean distance between every frame of x (n, d) and every frame of y (m, d).
+    Computed in one pass with the |a|^2 + |b|^2 - 2ab expansion (same result as scipy's cdist).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    sq = (np.einsum('ij,ij->i', x, x)[:, None]
+          + np.einsum('ij,ij->i', y, y)[None, :]
+          - 2.0 * (x @ y.T))
+    # Rounding can push identical frames slightly below zero
+    np.maximum(sq, 0.0, out=sq)
+    return np.sqrt(sq, out=sq)
+
+
+def band_radius(n, m, band=None):
+    """
+    Effective Sakoe-Chiba radius for an (n, m) pair.
+    The band is widened to |n - m| so that the end cell stays reachable.
+    """
+    if band is None:
+        return max(n, m)
+    return max(int(band), abs(n - m))
+
+
+def dtw(x, y, band=None, abandon_above=None):
+    """
+    Exact DTW between two feature sequences of shape (n_frames, n_features).
+
+    band: optional Sakoe-Chiba radius in frames (None = unconstrained).
+    abandon_above: optional raw cost; the sweep stops as soon as every path is known to exceed it.
+    Returns (distance, path_length), where distance is the accumulated euclidean
+    cost of the optimal path and path_length the number of cells on it.
+    An abandoned alignment returns (inf, 0).
+    """
+    return dtw_from_cost(pairwise_distances(x, y), band=band, abandon_above=abandon_above)
+
+
+def dtw_from_cost(cost, band=None, abandon_above=None):
+    """
+    Accumulates a precomputed local cost matrix with vectorized row sweeps.
+
+    Inside a row, D[i, j] = min(a[j], C[i, j] + D[i, j-1]) with
+    a[j] = C[i, j] + min(D[i-1, j-1], D[i-1, j]). Unrolled, this is
+    D[i, j] = P[j] + min_{k <= j}(a[k] - P[k]) where P is the prefix sum of the row,
+    so each row costs one cumsum and one running minimum instead of a Python loop.
+    """
+    n, m = cost.shape
+    if n == 0 or m == 0:
+        return float('inf'), 0
+
+    radius = band_radius(n, m, band)
+
+    # Rows are padded by one leading cell: index j + 1 holds column j
+    prev_D = np.full(m + 1, np.inf)
+    prev_D[0] = 0.0
+    prev_L = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(n):
+        lo = max(0, i - radius)
+        hi = min(m - 1, i + radius)
+
+        row = cost[i, lo:hi + 1]
+        diag = prev_D[lo:hi + 1]
+        up = prev_D[lo + 1:hi + 2]
+
+        # 1. Best vertical/diagonal predecessor and the length of its path
+        from_up = up < diag
+        a = row + np.where(from_up, up, diag)
+        a_len = np.where(from_up, prev_L[lo + 1:hi + 2], prev_L[lo:hi + 1]) + 1
+
+        # 2. Horizontal moves resolved with a prefix sum and a running minimum
+        P = np.cumsum(row)
+        v = a - P
+        running_min = np.minimum.accumulate(v)
+        cols = np.arange(len(row))
+        start = np.maximum.accumulate(np.where(v <= running_min, cols, 0))
+
+        cur_D = np.full(m + 1, np.inf)
+        cur_L = np.zeros(m + 1, dtype=np.int64)
+        cur_D[lo + 1:hi + 2] = P + running_min
+        cur_L[lo + 1:hi + 2] = a_len[start] + (cols - start)
+
+        prev_D, prev_L = cur_D, cur_L
+
+        # Every path crosses every row and costs never decrease along a path
+        if abandon_above is not None and np.min(cur_D[lo + 1:hi + 2]) > abandon_above:
+            return float('inf'), 0
+
+    return float(prev_D[m]), int(prev_L[m])
+
+
+def max_path_length(n, m):
+    """Upper bound on the number of cells of any warping path (used to normalise lower bounds)."""
+    return n + m - 1
+
+
+def lb_kim(x, y):
+    """
+    LB_Kim: every warping path contains the first and the last cell.
+    """
+    first = np.linalg.norm(x[0] - y[0])
+    if len(x) == 1 and len(y) == 1:
+        return float(first)
+    return float(first + np.linalg.norm(x[-1] - y[-1]))
+
+
+def keogh_envelope(template, radius=None):
+    """
+    Per-frame lower/upper envelope of a template for LB_Keogh.
+    With radius=None the envelope is the global min/max box, returned as a single row.
+    """
+    template = np.asarray(template, dtype=np.float64)
+    if radius is None or radius >= len(template):
+        return template.min(axis=0, keepdims=True), template.max(axis=0, keepdims=True)
+
+    size = 2 * int(radius) + 1
+    lower = minimum_filter1d(template, size=size, axis=0, mode='nearest')
+    upper = maximum_filter1d(template, size=size, axis=0, mode='nearest')
+    return lower, upper
+
+
+def lb_keogh(query, lower, upper):
+    """
+    LB_Keogh for multivariate frames: each query frame is matched to at least one
+    template frame inside its envelope box, so its distance to the box lower-bounds its cost.
+    Query frames past the end of the envelope reuse its last row, which is never narrower.
+    """
+    query = np.asarray(query, dtype=np.float64)
+    rows = np.minimum(np.arange(len(query)), len(lower) - 1)
+    excess = query - np.clip(query, lower[rows], upper[rows])
+    return float(np.sqrt(np.einsum('ij,ij->i', excess, excess)).sum())
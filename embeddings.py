@@ -0,0 +1,149 @@
+import json
+import os
+
+import numpy as np
+
+
+def map_means(ubm, X, relevance_factor=16.0):
+    """
+    Moyennes MAP-adaptées de l'UBM sur les frames X (une passe de Baum-Welch).
+    """
+    resp = ubm.predict_proba(X)
+    n_k = resp.sum(axis=0) + 10 * np.finfo(resp.dtype).eps
+    first_order = (resp.T @ X) / n_k[:, None]
+
+    # Plus une composante a vu de frames, plus elle s'éloigne de l'UBM
+    alpha = (n_k / (n_k + relevance_factor))[:, None]
+    return alpha * first_order + (1 - alpha) * ubm.means_
+
+
+def supervector(means, ubm):
+    """
+    Supervecteur normalisé d'un jeu de moyennes adaptées de l'UBM:
+    sqrt(w_k) * (m_k - mu_k) / sigma_k pour chaque composante, concaténés puis normés (L2).
+    Le produit scalaire de deux supervecteurs approche la divergence KL entre les GMM.
+    """
+    scale = np.sqrt(ubm.weights_)[:, None] * ubm.precisions_cholesky_
+    return l2_normalize(((means - ubm.means_) * scale).reshape(-1))
+
+
+def l2_normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingIndex:
+    """
+    Index d'embeddings de dimension fixe, une ligne par nom, dans une matrice float32
+    contiguë (agrandie par doublement). La recherche est un produit matrice-vecteur
+    (cosinus, les lignes sont normées) suivi d'un top-k partiel.
+    tags: information libre par nom (ex. date/taille du fichier modèle) pour savoir
+    si une ligne est à recalculer.
+    """
+
+    def __init__(self, dim, capacity=64):
+        self.dim = dim
+        self.names = []
+        self.tags = {}
+        self._rows = {}
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    @property
+    def matrix(self):
+        return self._matrix[:len(self.names)]
+
+    def add(self, name, vector, tag=None):
+        """
+        Ajoute ou remplace l'embedding de name (normalisé L2).
+        """
+        vector = l2_normalize(vector)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Embedding de dimension {vector.shape}, attendu ({self.dim},)")
+
+        row = self._rows.get(name)
+        if row is None:
+            row = len(self.names)
+            if row == len(self._matrix):
+                grown = np.zeros((2 * len(self._matrix), self.dim), dtype=np.float32)
+                grown[:row] = self._matrix[:row]
+                self._matrix = grown
+            self.names.append(name)
+            self._rows[name] = row
+        self._matrix[row] = vector
+        self.tags[name] = tag
+
+    def remove(self, name):
+        """
+        Retire name; la dernière ligne prend sa place (pas de trou dans la matrice).
+        """
+        row = self._rows.pop(name)
+        self.tags.pop(name, None)
+        last = len(self.names) - 1
+        if row != last:
+            moved = self.names[last]
+            self._matrix[row] = self._matrix[last]
+            self.names[row] = moved
+            self._rows[moved] = row
+        self.names.pop()
+
+    def search(self, query, k=5):
+        """
+        Les k noms les plus proches de query: liste de (nom, similarité cosinus), décroissante.
+        """
+        return self.search_batch(np.asarray(query)[None, :], k)[0]
+
+    def search_batch(self, queries, k=5):
+        """
+        Recherche de plusieurs requêtes (n_queries, dim) en un seul produit matriciel.
+        """
+        if not self.names:
+            return [[] for _ in range(len(queries))]
+        scores = l2_normalize(queries) @ self.matrix.T
+        k = min(k, len(self.names))
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for q, candidates in enumerate(top):
+            order = candidates[np.argsort(-scores[q, candidates])]
+            results.append([(self.names[i], float(scores[q, i])) for i in order])
+        return results
+
+    def save(self, prefix):
+        """
+        Écrit <prefix>.npy (matrice) puis <prefix>.json (noms, tags), atomiquement.
+        """
+        tmp = f"{prefix}.{os.getpid()}.tmp.npy"
+        np.save(tmp, self.matrix)
+        os.replace(tmp, prefix + ".npy")
+        tmp = f"{prefix}.{os.getpid()}.tmp.json"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "names": self.names, "tags": self.tags}, f)
+        os.replace(tmp, prefix + ".json")
+
+    @classmethod
+    def load(cls, prefix):
+        """
+        Index sauvegardé par save(), ou None s'il est absent ou illisible.
+        """
+        try:
+            with open(prefix + ".json", "r") as f:
+                meta = json.load(f)
+            matrix = np.load(prefix + ".npy")
+        except (OSError, ValueError):
+            return None
+        if matrix.shape != (len(meta["names"]), meta["dim"]):
+            return None
+
+        index = cls(meta["dim"], capacity=max(64, len(matrix)))
+        index._matrix[:len(matrix)] = matrix
+        index.names = list(meta["names"])
+        index._rows = {name: row for row, name in enumerate(index.names)}
+        index.tags = meta["tags"]
+        return index
@@ -0,0 +1,388 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from functools import lru_cache, partial
+
+import numpy as np
+from scipy.stats import norm
+
+import comparaison
+from audio_io import AudioCache, load_audio
+from corpus import discover_speakers, split_take
+from dtw import compute_dynamic_features
+from dtw_engine import dtw
+from feature_store import FeatureStore, default_path
+from gmm import UBM_NAME, GMMVoiceAuth
+from workers import map_files
+
+SCORERS = ("dtw", "gmm", "composite")
+
+
+def corpus_trials(root=default_path("samples"), label="prefix"):
+    """
+    Fichiers du corpus et leur locuteur.
+    label="prefix": préfixe du nom de fichier en minuscules (simon_1 -> "simon", tous dossiers confondus);
+    label="directory": identifiant du corpus, ex. "p13_simon".
+    Retourne (chemins, étiquettes) triés.
+    """
+    paths, labels = [], []
+    for speaker, files in discover_speakers(root).items():
+        for path in files:
+            paths.append(path)
+            if label == "directory":
+                labels.append(speaker)
+            else:
+                labels.append(split_take(os.path.splitext(os.path.basename(path))[0])[0].lower())
+    return paths, labels
+
+
+# --- Scoreurs par paires (exécutés dans les processus du pool) ---
+
+@lru_cache(maxsize=None)
+def _stores(feature_dir, audio_dir):
+    return (FeatureStore(feature_dir) if feature_dir else None,
+            AudioCache(audio_dir) if audio_dir else None)
+
+
+@lru_cache(maxsize=4096)
+def _dtw_features(path, feature_dir, audio_dir):
+    return compute_dynamic_features(path, *_stores(feature_dir, audio_dir))
+
+
+@lru_cache(maxsize=4096)
+def _composite_features(path, feature_dir, audio_dir):
+    store, audio_cache = _stores(feature_dir, audio_dir)
+    return comparaison.extraire_caracteristiques_avancees(
+        path, store, chargeur=partial(_load, audio_cache=audio_cache))
+
+
+def _load(path, audio_cache):
+    return load_audio(path, comparaison.CONFIG_CARACTERISTIQUES["sr"], audio_cache)
+
+
+def _dtw_gallery_row(i, paths, galleries, feature_dir, audio_dir, band=None):
+    """
+    Distance DTW normalisée (par la longueur du chemin) de paths[i] à la galerie de chaque
+    locuteur: la plus petite sur ses prises, comme DTWVoiceAuth.verify_passphrase dont le
+    seuil s'applique à ce minimum. NaN pour une galerie sans features.
+    """
+    row = np.full(len(galleries), np.nan)
+    test = _dtw_features(paths[i], feature_dir, audio_dir)
+    if test is None:
+        return row
+    for col, (_, files) in enumerate(galleries):
+        distances = []
+        for ref_file in files:
+            ref = _dtw_features(ref_file, feature_dir, audio_dir)
+            if ref is not None:
+                dist, path_length = dtw(ref, test, band=band)
+                distances.append(dist / path_length)
+        if distances:
+            row[col] = min(distances)
+    return row
+
+
+def _composite_row(i, paths, feature_dir, audio_dir):
+    """
+    Scores composites (0-100) entre paths[i] et paths[j > i].
+    """
+    row = np.full(len(paths), np.nan)
+    feat1, mfcc1 = _composite_features(paths[i], feature_dir, audio_dir)
+    if feat1 is None:
+        return row
+    for j in range(i + 1, len(paths)):
+        feat2, mfcc2 = _composite_features(paths[j], feature_dir, audio_dir)
+        if feat2 is not None:
+            row[j], _ = comparaison.calculer_score_composite(feat1, feat2, mfcc1, mfcc2)
+    return row
+
+
+def pairwise_matrix(row_func, paths, feature_dir=default_path("feature_cache"), audio_dir=default_path("audio_cache"),
+                    n_jobs=None, **options):
+    """
+    Matrice symétrique (n, n) des scores de toutes les paires, une ligne par tâche du pool.
+    La diagonale vaut NaN. options: paramètres supplémentaires de row_func.
+    """
+    task = partial(row_func, paths=tuple(paths), feature_dir=feature_dir, audio_dir=audio_dir, **options)
+    matrix = np.full((len(paths), len(paths)), np.nan)
+    for i, (row, error) in enumerate(map_files(task, range(len(paths)), n_jobs)):
+        if error is not None:
+            print(f"  Error scoring {paths[i]}: {error}")
+            continue
+        matrix[i, i + 1:] = row[i + 1:]
+    upper = np.triu_indices(len(paths), 1)
+    matrix.T[upper] = matrix[upper]
+    return matrix
+
+
+def split_enrollment(paths, labels, enroll_fraction=0.5):
+    """
+    Par locuteur, les premières prises servent à l'enregistrement, les autres aux essais.
+    Les locuteurs d'une seule prise ne servent qu'aux essais (imposteurs).
+    Retourne ({locuteur: fichiers d'enregistrement}, [indices des essais]).
+    """
+    by_speaker = {}
+    for i, label in enumerate(labels):
+        by_speaker.setdefault(label, []).append(i)
+
+    enrollment, trials = {}, []
+    for label, indices in by_speaker.items():
+        n_enroll = max(1, int(len(indices) * enroll_fraction)) if len(indices) > 1 else 0
+        if n_enroll:
+            enrollment[label] = [paths[i] for i in indices[:n_enroll]]
+        trials.extend(indices[n_enroll:])
+    return enrollment, sorted(trials)
+
+
+def dtw_matrix(paths, labels, feature_dir=default_path("feature_cache"), audio_dir=default_path("audio_cache"),
+               n_jobs=None, band=None):
+    """
+    Matrice essais x galeries des distances DTW, avec le même partage enregistrement / essais
+    que gmm_matrix: chaque locuteur est représenté par la galerie de ses prises d'enregistrement.
+    Retourne (matrice, indices des essais, noms des locuteurs).
+    """
+    enrollment, trials = split_enrollment(paths, labels)
+    models = sorted(enrollment)
+    galleries = tuple((name, tuple(enrollment[name])) for name in models)
+    task = partial(_dtw_gallery_row, paths=tuple(paths), galleries=galleries, feature_dir=feature_dir,
+                   audio_dir=audio_dir, band=band)
+    matrix = np.full((len(trials), len(models)), np.nan)
+    for row, (i, (scores, error)) in enumerate(zip(trials, map_files(task, trials, n_jobs))):
+        if error is not None:
+            print(f"  Error scoring {paths[i]}: {error}")
+            continue
+        matrix[row] = scores
+    return matrix, trials, models
+
+
+def gmm_matrix(paths, labels, model_dir=None, feature_dir=default_path("feature_cache"),
+               audio_dir=default_path("audio_cache"), n_jobs=None, overwrite=False):
+    """
+    Matrice essais x modèles des marges log-vraisemblance (locuteur - UBM).
+    L'UBM est entraîné sur les fichiers d'enregistrement, les locuteurs en sont adaptés (MAP).
+    model_dir: None = dossier temporaire propre à l'évaluation. Un dossier non vide (ex.
+    les modèles de l'application) est refusé, sauf overwrite=True: ses modèles de
+    locuteurs sont alors supprimés et son UBM remplacé.
+    Retourne (matrice, indices des essais, noms des modèles).
+    """
+    if model_dir is None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            return gmm_matrix(paths, labels, temp_dir, feature_dir, audio_dir, n_jobs)
+    if not overwrite and os.path.isdir(model_dir) and os.listdir(model_dir):
+        raise ValueError(f"Model directory {model_dir} is not empty (use overwrite to replace its models)")
+
+    enrollment, trials = split_enrollment(paths, labels)
+    auth = GMMVoiceAuth(model_dir=model_dir, feature_dir=feature_dir, audio_dir=audio_dir,
+                        enroll_method="map", n_jobs=n_jobs)
+    # Modèles d'une évaluation précédente: ils seraient notés par score_all
+    for name in auth.models.keys():
+        if name != UBM_NAME:
+            auth.remove_user(name)
+    auth.train_ubm([f for files in enrollment.values() for f in files])
+    for name, files in enrollment.items():
+        auth.enroll_user(name, files, n_jobs=1)
+
+    # Un locuteur dont aucun fichier n'a pu être extrait n'a pas de modèle
+    models = sorted(name for name in enrollment if name in auth.models)
+    matrix = np.full((len(trials), len(models)), np.nan)
+    for row, i in enumerate(trials):
+        features = auth.extract_features(paths[i])
+        if features is None:
+            continue
+        scores = auth.score_all(features)
+        matrix[row] = [scores[name] - scores[UBM_NAME] for name in models]
+    return matrix, trials, models
+
+
+# --- Métriques ---
+
+def error_rates(target, nontarget):
+    """
+    Taux de faux rejets et de fausses acceptations pour chaque seuil (accepté si score >= seuil).
+    Retourne (p_miss, p_fa, seuils), le dernier seuil rejetant tout.
+    """
+    scores = np.concatenate([target, nontarget])
+    is_target = np.concatenate([np.ones(len(target)), np.zeros(len(nontarget))])
+    order = np.argsort(scores, kind="mergesort")
+    scores, is_target = scores[order], is_target[order]
+
+    p_miss = np.concatenate([[0.0], np.cumsum(is_target)]) / len(target)
+    p_fa = 1.0 - np.concatenate([[0.0], np.cumsum(1 - is_target)]) / len(nontarget)
+    thresholds = np.concatenate([scores, [np.inf]])
+    return p_miss, p_fa, thresholds
+
+
+def eer(p_miss, p_fa, thresholds):
+    """
+    Taux d'égale erreur (interpolé) et seuil correspondant.
+    """
+    i = int(np.argmax(p_miss >= p_fa))
+    if i == 0:
+        return float(p_miss[0]), float(thresholds[0])
+    d_prev, d_next = p_fa[i - 1] - p_miss[i - 1], p_miss[i] - p_fa[i]
+    w = d_prev / (d_prev + d_next) if d_prev + d_next > 0 else 0.0
+    rate = p_miss[i - 1] + w * (p_miss[i] - p_miss[i - 1])
+    return float(rate), float(thresholds[i - 1] if w < 0.5 else thresholds[i])
+
+
+def min_dcf(p_miss, p_fa, thresholds, p_target=0.01, c_miss=1.0, c_fa=1.0):
+    """
+    Coût de détection minimal normalisé (NIST) et seuil correspondant.
+    """
+    cost = c_miss * p_target * p_miss + c_fa * (1 - p_target) * p_fa
+    i = int(np.argmin(cost))
+    return float(cost[i] / min(c_miss * p_target, c_fa * (1 - p_target))), float(thresholds[i])
+
+
+def det_points(p_miss, p_fa, max_points=200):
+    """
+    Points de la courbe DET: (p_fa, p_miss) et leurs déviations normales (axes probit).
+    """
+    step = max(1, len(p_miss) // max_points)
+    keep = np.unique(np.concatenate([np.arange(0, len(p_miss), step), [len(p_miss) - 1]]))
+    eps = 1e-6
+    return [{"p_fa": float(p_fa[i]), "p_miss": float(p_miss[i]),
+             "probit_fa": float(norm.ppf(np.clip(p_fa[i], eps, 1 - eps))),
+             "probit_miss": float(norm.ppf(np.clip(p_miss[i], eps, 1 - eps)))}
+            for i in keep]
+
+
+def summarize(target, nontarget, higher_is_better=True, p_target=0.01):
+    """
+    EER, minDCF et courbe DET d'un jeu de scores. Les seuils sont rendus dans l'unité du
+    scoreur (une distance DTW pour dtw: accepté si distance <= seuil).
+    """
+    target, nontarget = np.asarray(target, float), np.asarray(nontarget, float)
+    if len(target) == 0 or len(nontarget) == 0:
+        return {"n_target": len(target), "n_nontarget": len(nontarget), "error": "not enough trials"}
+    sign = 1.0 if higher_is_better else -1.0
+    p_miss, p_fa, thresholds = error_rates(sign * target, sign * nontarget)
+    rate, eer_threshold = eer(p_miss, p_fa, thresholds)
+    dcf, dcf_threshold = min_dcf(p_miss, p_fa, thresholds, p_target)
+    return {
+        "n_target": len(target),
+        "n_nontarget": len(nontarget),
+        "eer": rate,
+        "eer_threshold": sign * eer_threshold,
+        "min_dcf": dcf,
+        "min_dcf_threshold": sign * dcf_threshold,
+        "p_target": p_target,
+        "det": det_points(p_miss, p_fa),
+    }
+
+
+def _trial_scores(matrix, trials, models, labels, digests, enrolled):
+    """
+    Scores cibles / non-cibles d'une matrice essais x modèles.
+    enrolled: {modèle: empreintes de ses fichiers d'enregistrement}; un essai identique
+    (même contenu) à l'un d'eux, ex. une copie dans un autre dossier, est ignoré.
+    """
+    target, nontarget = [], []
+    for row, i in enumerate(trials):
+        for col, name in enumerate(models):
+            if not np.isnan(matrix[row, col]) and digests[i] not in enrolled.get(name, ()):
+                (target if labels[i] == name else nontarget).append(matrix[row, col])
+    return target, nontarget
+
+
+def _pair_scores(matrix, labels, digests):
+    """
+    Scores cibles / non-cibles du triangle supérieur d'une matrice de paires.
+    Les paires de fichiers identiques (même contenu) sont ignorées.
+    """
+    target, nontarget = [], []
+    for i, j in zip(*np.triu_indices(len(labels), 1)):
+        if np.isnan(matrix[i, j]) or digests[i] == digests[j]:
+            continue
+        (target if labels[i] == labels[j] else nontarget).append(matrix[i, j])
+    return target, nontarget
+
+
+def evaluate(root=default_path("samples"), scorers=SCORERS, label="prefix", feature_dir=default_path("feature_cache"),
+             audio_dir=default_path("audio_cache"), model_dir=None, n_jobs=None, p_target=0.01,
+             matrices_path=None, band=None, overwrite=False):
+    """
+    Calcule les matrices de scores de chaque scoreur sur le corpus et leurs métriques.
+    dtw et gmm notent les essais contre les locuteurs enregistrés (split_enrollment),
+    composite note toutes les paires de fichiers comme le bouton "Comparer".
+    band: rayon Sakoe-Chiba du scoreur DTW (None = alignement complet).
+    overwrite: autorise un model_dir non vide, voir gmm_matrix.
+    """
+    paths, labels = corpus_trials(root, label)
+    store = FeatureStore(feature_dir or default_path("feature_cache"))
+    digests = [store.content_digest(p) for p in paths]
+    enrollment, _ = split_enrollment(paths, labels)
+    digest_of = dict(zip(paths, digests))
+    enrolled = {name: {digest_of[p] for p in files} for name, files in enrollment.items()}
+    report = {"root": root, "files": len(paths), "speakers": len(set(labels)), "scorers": {}}
+    matrices = {}
+
+    for scorer in scorers:
+        start = time.perf_counter()
+        print(f"--- Scoring: {scorer} ---")
+        if scorer == "dtw":
+            matrix, trials, models = dtw_matrix(paths, labels, feature_dir, audio_dir, n_jobs, band)
+            target, nontarget = _trial_scores(matrix, trials, models, labels, digests, enrolled)
+            result = summarize(target, nontarget, higher_is_better=False, p_target=p_target)
+            matrices["dtw_trials"] = np.array([paths[i] for i in trials])
+            matrices["dtw_models"] = np.array(models)
+        elif scorer == "composite":
+            matrix = pairwise_matrix(_composite_row, paths, feature_dir, audio_dir, n_jobs)
+            target, nontarget = _pair_scores(matrix, labels, digests)
+            result = summarize(target, nontarget, p_target=p_target)
+        elif scorer == "gmm":
+            matrix, trials, models = gmm_matrix(paths, labels, model_dir, feature_dir, audio_dir, n_jobs,
+                                                 overwrite)
+            target, nontarget = _trial_scores(matrix, trials, models, labels, digests, enrolled)
+            result = summarize(target, nontarget, p_target=p_target)
+            matrices["gmm_trials"] = np.array([paths[i] for i in trials])
+            matrices["gmm_models"] = np.array(models)
+        else:
+            raise ValueError(f"Unknown scorer: {scorer}")
+
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        report["scorers"][scorer] = result
+        matrices[scorer] = matrix
+
+    if matrices_path:
+        np.savez(matrices_path, paths=np.array(paths), labels=np.array(labels), **matrices)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corpus-wide evaluation of the DTW, GMM and composite scorers.")
+    parser.add_argument("--root", default=default_path("samples"))
+    parser.add_argument("--scorers", default=",".join(SCORERS))
+    parser.add_argument("--label", choices=["prefix", "directory"], default="prefix",
+                        help="speaker identity: file name prefix (default) or corpus directory + prefix")
+    parser.add_argument("--feature-dir", default=default_path("feature_cache"))
+    parser.add_argument("--audio-dir", default=default_path("audio_cache"))
+    parser.add_argument("--model-dir", default=None,
+                        help="directory of the GMM models (default: a temporary directory, removed afterwards)")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="allow a non-empty --model-dir: its speaker models and UBM are replaced")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--band", type=int, default=None, help="Sakoe-Chiba radius of the DTW scorer")
+    parser.add_argument("--p-target", type=float, default=0.01)
+    parser.add_argument("--output", default="evaluation.json")
+    parser.add_argument("--matrices", default=None, help="optional .npz with the raw score matrices")
+    args = parser.parse_args()
+
+    report = evaluate(args.root, [s for s in args.scorers.split(",") if s], args.label, args.feature_dir,
+                      args.audio_dir, args.model_dir, args.jobs, args.p_target, args.matrices, args.band,
+                      args.overwrite)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n--- Evaluation ({report['files']} files, {report['speakers']} speakers) ---")
+    for scorer, r in report["scorers"].items():
+        if "eer" not in r:
+            print(f"  {scorer}: {r['error']}")
+            continue
+        print(f"  {scorer:<10} EER {100 * r['eer']:.2f}% @ {r['eer_threshold']:.3f}   "
+              f"minDCF {r['min_dcf']:.3f} @ {r['min_dcf_threshold']:.3f}   "
+              f"({r['n_target']} target / {r['n_nontarget']} non-target, {r['seconds']:.1f}s)")
+    print(f"Report written to {args.output}")
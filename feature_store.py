@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_path(name):
+    """
+    Default location of a cache, model or corpus directory: next to the scripts, so the GUI
+    and the command-line tools share it whatever the working directory.
+    """
+    return os.path.join(PROJECT_DIR, name)
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """
+    SHA-1 of the file contents.
+    """
+    h = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stat_key(file_path):
+    """
+    (mtime, size) of a file: changes whenever the file is re-recorded.
+    """
+    st = os.stat(file_path)
+    return st.st_mtime_ns, st.st_size
+
+
+class FeatureCache:
+    """
+    In-memory LRU feature cache bounded by a byte budget.
+
+    Entries remember the (mtime, size) of their file and are dropped as soon as
+    the file on disk changes, so a re-recorded sample is never served stale.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # path -> (stat_key, array)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, file_path):
+        try:
+            current = stat_key(file_path)
+        except OSError:
+            current = None
+
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None:
+                if entry[0] == current:
+                    self._entries.move_to_end(file_path)
+                    self.hits += 1
+                    return entry[1]
+                self._drop(file_path)
+                self.invalidations += 1
+            self.misses += 1
+            return None
+
+    def put(self, file_path, array):
+        try:
+            current = stat_key(file_path)
+        except OSError:
+            return
+
+        with self._lock:
+            if file_path in self._entries:
+                self._drop(file_path)
+            if array.nbytes > self.max_bytes:
+                return
+            self._entries[file_path] = (current, array)
+            self.current_bytes += array.nbytes
+
+            # Least recently used first
+            while self.current_bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, file_path):
+        _, array = self._entries.pop(file_path)
+        self.current_bytes -= array.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class FeatureStore:
+    """
+    On-disk feature cache keyed by the audio content and the feature configuration.
+
+    Each entry is one .npy file per array plus a small JSON manifest written last,
+    so a half-written entry is never picked up. Arrays are loaded with mmap.
+    """
+
+    def __init__(self, root=default_path("feature_cache")):
+        self.root = root
+        # path -> ((mtime, size), content digest), avoids re-hashing unchanged files
+        self._digests = {}
+
+    def content_digest(self, file_path):
+        """
+        Content digest of a file, memoized by (mtime, size) so that an unchanged file is hashed once.
+        Also used by the other content-keyed caches (audio_io.AudioCache, asr.TranscriptionCache).
+        """
+        path = os.path.abspath(file_path)
+        current = stat_key(path)
+        known = self._digests.get(path)
+        if known is not None and known[0] == current:
+            return known[1]
+        digest = file_digest(path)
+        self._digests[path] = (current, digest)
+        return digest
+
+    def key(self, file_path, config):
+        """
+        Entry key: content digest + canonical JSON of the extraction parameters.
+        """
+        return self.key_for_digest(self.content_digest(file_path), config)
+
+    @staticmethod
+    def key_for_digest(digest, config):
+        """
+        Entry key of a content digest and an extractor config. Every config carries a "version"
+        to bump whenever its computation changes: entries of the old version are no longer read.
+        """
+        h = hashlib.sha1(digest.encode())
+        h.update(json.dumps(config, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def contains_digest(self, digest, config):
+        """
+        True if features of this content/config are stored (no hashing, no loading).
+        """
+        return os.path.exists(self._entry_prefix(self.key_for_digest(digest, config)) + ".json")
+
+    def _entry_prefix(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def load(self, file_path, config):
+        """
+        Returns a dict {name: array} for this file/config, or None on a miss.
+        """
+        try:
+            prefix = self._entry_prefix(self.key(file_path, config))
+            with open(prefix + ".json", "r") as f:
+                names = json.load(f)["arrays"]
+            return {name: np.load(f"{prefix}.{name}.npy", mmap_mode="r") for name in names}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, file_path, config, arrays):
+        """
+        Stores a dict {name: array} for this file/config. Failures are reported, never raised.
+        """
+        try:
+            prefix = self._entry_prefix(self.key(file_path, config))
+            os.makedirs(os.path.dirname(prefix), exist_ok=True)
+
+            for name, array in arrays.items():
+                tmp = f"{prefix}.{name}.{os.getpid()}.tmp.npy"
+                np.save(tmp, np.ascontiguousarray(array))
+                os.replace(tmp, f"{prefix}.{name}.npy")
+
+            tmp = f"{prefix}.{os.getpid()}.tmp.json"
+            with open(tmp, "w") as f:
+                json.dump({"arrays": list(arrays), "config": config}, f)
+            os.replace(tmp, prefix + ".json")
+        except OSError as e:
+            print(f"Feature cache write failed for {file_path}: {e}")
@@ -1,26 +1,34 @@
+import argparse
 import customtkinter as ctk
 import sounddevice as sd
 import soundfile as sf
-import numpy as np
 import os
 import time
 from datetime import datetime
+from capture_buffer import CaptureBuffer, StreamingWavWriter
+from feature_store import default_path
 
 class SimpleRecorder(ctk.CTk):
-    def __init__(self):
+    def __init__(self, direct_to_disk=False):
         super().__init__()
 
         # Configuration de la fenêtre
         self.title("Enregistreur avec Choix de Source")
-        self.geometry("500x400")
+        self.geometry("500x450")
         ctk.set_appearance_mode("dark")
         
         # Variables d'enregistrement
         self.fs = 44100  # Fréquence d'échantillonnage
         self.is_recording = False
-        self.audio_data = []
+        # Tampon préalloué pour 60 s, agrandi si nécessaire
+        self.capture = CaptureBuffer(channels=1, capacity=self.fs * 60)
         self.stream = None
         self.start_time = None
+        # Mode direct sur disque: écriture au fil de l'eau, mémoire constante
+        self.direct_to_disk = direct_to_disk
+        self.writer = None
+        # Catalogue partagé avec l'application, ouvert au premier fichier sauvegardé
+        self.catalogue = None
 
         # --- INTERFACE ---
         
@@ -40,6 +48,12 @@ class SimpleRecorder(ctk.CTk):
         if self.mic_options:
             self.combo_mics.set(self.mic_options[0])
 
+        # Mode direct sur disque pour les longs enregistrements
+        self.check_direct = ctk.CTkCheckBox(self, text="Écriture directe sur disque (longs enregistrements)")
+        if self.direct_to_disk:
+            self.check_direct.select()
+        self.check_direct.pack(pady=5)
+
         # Status
         self.label_status = ctk.CTkLabel(self, text="Prêt", text_color="gray")
         self.label_status.pack(pady=20)
@@ -66,7 +80,28 @@ class SimpleRecorder(ctk.CTk):
         """Fonction appelée en continu par sounddevice pendant l'enregistrement"""
         if status:
             print(f"Status audio: {status}")
-        self.audio_data.append(indata.copy())
+        if self.writer is not None:
+            self.writer.write(indata)
+        else:
+            self.capture.write(indata)
+
+    def cataloguer(self, path):
+        """
+        Ajoute un enregistrement au catalogue. Import différé: catalogue charge corpus
+        (dtw, gmm, sklearn), inutile pour tester un micro sans rien sauvegarder.
+        """
+        if self.catalogue is None:
+            from catalogue import SampleCatalog
+            self.catalogue = SampleCatalog(default_path("samples"), default_path("sample_catalog.sqlite"))
+        self.catalogue.add(path)
+
+    def new_filename(self):
+        """Nom du fichier avec timestamp, dans le dossier 'samples' (créé si besoin)"""
+        dossier = default_path("samples")
+        if not os.path.exists(dossier):
+            os.makedirs(dossier)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(dossier, f"rec_{timestamp}.wav")
 
     def start_recording(self):
         # 1. Récupérer le choix de l'utilisateur
@@ -85,7 +120,10 @@ class SimpleRecorder(ctk.CTk):
 
         # 3. Démarrer l'enregistrement
         try:
-            self.audio_data = []
+            self.capture.reset()
+            self.direct_to_disk = bool(self.check_direct.get())
+            if self.direct_to_disk:
+                self.writer = StreamingWavWriter(self.new_filename(), self.fs)
             # C'est ICI qu'on force le périphérique avec `device=device_id`
             self.stream = sd.InputStream(samplerate=self.fs, channels=1, 
                                          device=device_id, 
@@ -100,8 +138,13 @@ class SimpleRecorder(ctk.CTk):
             self.btn_start.configure(state="disabled")
             self.btn_stop.configure(state="normal", fg_color="green")
             self.combo_mics.configure(state="disabled")
+            self.check_direct.configure(state="disabled")
             
         except Exception as e:
+            if self.writer is not None:
+                self.writer.close()
+                os.remove(self.writer.path)
+                self.writer = None
             self.label_status.configure(text=f"Impossible d'ouvrir le micro : {e}", text_color="red")
 
     def stop_recording(self):
@@ -114,18 +157,21 @@ class SimpleRecorder(ctk.CTk):
         self.is_recording = False
         
         # Sauvegarde
-        if self.audio_data:
-            # Créer un dossier 'enregistrements' s'il n'existe pas
-            if not os.path.exists("samples"):
-                os.makedirs("samples")
-                
-            # Nom du fichier avec timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join("samples", f"rec_{timestamp}.wav")
-            
-            # Convertir la liste en array numpy et sauvegarder
-            audio_array = np.concatenate(self.audio_data, axis=0)
-            sf.write(filename, audio_array, self.fs)
+        if self.writer is not None:
+            # Le fichier est déjà sur le disque: il ne reste qu'à finaliser l'en-tête
+            self.writer.close()
+            if self.writer.frames_written:
+                self.cataloguer(self.writer.path)
+                self.label_status.configure(text=f"Sauvegardé : {self.writer.path}", text_color="white")
+            else:
+                os.remove(self.writer.path)
+                self.label_status.configure(text="Erreur : Audio vide", text_color="red")
+            self.writer = None
+        elif len(self.capture):
+            filename = self.new_filename()
+            # Sauvegarde directe depuis le tampon (pas de copie)
+            sf.write(filename, self.capture.view(), self.fs)
+            self.cataloguer(filename)
             
             self.label_status.configure(text=f"Sauvegardé : {filename}", text_color="white")
         else:
@@ -135,7 +181,13 @@ class SimpleRecorder(ctk.CTk):
         self.btn_start.configure(state="normal")
         self.btn_stop.configure(state="disabled", fg_color="gray")
         self.combo_mics.configure(state="readonly")
+        self.check_direct.configure(state="normal")
 
 if __name__ == "__main__":
-    app = SimpleRecorder()
+    parser = argparse.ArgumentParser(description="Microphone test recorder, saves takes under samples/.")
+    parser.add_argument("--direct", action="store_true",
+                        help="write recordings straight to disk (constant memory, for long recordings)")
+    args = parser.parse_args()
+
+    app = SimpleRecorder(direct_to_disk=args.direct)
     app.mainloop()
\ No newline at end of file
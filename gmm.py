@@ -1,3 +1,4 @@
+import copy
 import os
 import librosa
 import numpy as np
@@ -5,52 +6,136 @@ import joblib
 from sklearn.mixture import GaussianMixture
 from sklearn.preprocessing import StandardScaler
 import warnings
+from functools import partial
+from audio_io import AudioCache, load_audio
+from embeddings import EmbeddingIndex, map_means, supervector
+from feature_store import FeatureStore, default_path, stat_key
+from instrumentation import metrics
+from model_bank import SpeakerModelBank
+from model_registry import ModelRegistry
+from online_verifier import OnlineVerifier
+from streaming_features import StreamingFeatureExtractor
+from workers import map_files
 
 warnings.filterwarnings('ignore')
 
+# Nom du modèle de fond (UBM) contre lequel les locuteurs sont comparés
+UBM_NAME = "Random"
+
+# Paramètres de extract_features, utilisés aussi comme clé du cache de features
+FEATURE_CONFIG = {
+    "extractor": "gmm_mfcc",
+    "version": 1,
+    "sr": 16000,
+    "top_db": 60,
+    "n_mfcc": 20,
+    "delta_order": 1,
+}
+
+
+def compute_features(audio_path, feature_store=None, audio_cache=None):
+    """
+    MFCC + Deltas d'un fichier, de forme (n_frames, n_features).
+    Fonction de module pour pouvoir être exécutée dans les processus de l'enregistrement parallèle.
+    audio_cache: AudioCache optionnel (copies pré-transcodées à 16 kHz).
+    """
+    # Cache disque: évite de redécoder le fichier à chaque démarrage
+    if feature_store is not None:
+        stored = feature_store.load(audio_path, FEATURE_CONFIG)
+        if stored is not None:
+            metrics.count("gmm.feature_store.hits")
+            return stored["features"]
+        metrics.count("gmm.feature_store.misses")
+
+    sr = FEATURE_CONFIG["sr"]
+    with metrics.timer("gmm.load"):
+        y = load_audio(audio_path, sr, audio_cache)
+    with metrics.timer("gmm.trim"):
+        y, _ = librosa.effects.trim(y, top_db=FEATURE_CONFIG["top_db"])
+    with metrics.timer("gmm.mfcc"):
+        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=FEATURE_CONFIG["n_mfcc"])
+        mfcc_delta = librosa.feature.delta(mfcc)
+
+    # Assemblage en une seule matrice de forme (40, n_frames)
+    features = np.vstack([mfcc, mfcc_delta]).T  # Transposition requise par sklearn
+    metrics.observe_size("gmm.frames", len(features))
+
+    if feature_store is not None:
+        feature_store.save(audio_path, FEATURE_CONFIG, {"features": features})
+    return features
+
 
 class GMMVoiceAuth:
-    def __init__(self, n_components=16, model_dir="voice_models"):
+    def __init__(self, n_components=16, model_dir=default_path("voice_models"),
+                 feature_dir=default_path("feature_cache"),
+                 enroll_method="em", relevance_factor=16.0, n_jobs=1,
+                 max_loaded_models=None, max_loaded_bytes=None, audio_dir=default_path("audio_cache")):
         """
         n_components: Le nombre de clusters à modéliser. 16 suffisent pour notre PoC avec peu de données.
+        feature_dir: cache disque des features, partagé avec DTW et l'application (None pour désactiver).
+        enroll_method: "em" (GMM entrainé de zéro) ou "map" (adaptation des moyennes de l'UBM).
+        relevance_factor: poids de l'UBM dans l'adaptation MAP (plus grand = plus proche de l'UBM).
+        n_jobs: nombre de processus pour l'extraction des features à l'enregistrement (None = un par coeur).
+        max_loaded_models / max_loaded_bytes: limite des modèles gardés en mémoire (LRU), None = illimité.
+        audio_dir: copies pré-transcodées à 16 kHz des fichiers, voir audio_io.py (None pour désactiver).
         """
         self.n_components = n_components
         self.model_dir = model_dir
-        self.models = {}
+        self.enroll_method = enroll_method
+        self.relevance_factor = relevance_factor
+        self._bank = None
+        self._bank_version = None
+        self._index = None
+        self._index_version = None
+        self.feature_store = FeatureStore(feature_dir) if feature_dir else None
+        self.n_jobs = n_jobs
+        self.audio_cache = AudioCache(audio_dir, FEATURE_CONFIG["sr"]) if audio_dir else None
 
         if not os.path.exists(model_dir):
             os.makedirs(model_dir)
 
+        # Les modèles déjà sauvegardés sont découverts, puis chargés à la demande
+        self.models = ModelRegistry(model_dir, max_loaded_models, max_loaded_bytes)
+
     def extract_features(self, audio_path):
         """
         Extraction des MFCCs (timbre de voix) + Deltas (vitesse et accélérations).
         Retourne une matrice de forme (n_frames, n_features).
         """
         try:
-            y, sr = librosa.load(audio_path, sr=16000)
-            y, _ = librosa.effects.trim(y)
-            mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=20)
-            mfcc_delta = librosa.feature.delta(mfcc)
-
-            # Assemblage en une seule matrice de forme (40, n_frames)
-            features = np.vstack([mfcc, mfcc_delta])
-            return features.T  # Transposition requise par sklearn
-
+            return compute_features(audio_path, self.feature_store, self.audio_cache)
         except Exception as e:
             print(f"Erreur d'extraction des features de {audio_path}: {e}")
             return None
 
-    def enroll_user(self, name, audio_files):
+    def train_ubm(self, audio_files):
+        """
+        Entrainement du modèle de fond "Random" (UBM), une seule fois, par EM.
+        Les locuteurs enregistrés en mode "map" en sont dérivés.
+        """
+        self.enroll_user(UBM_NAME, audio_files, method="em")
+
+    def enroll_user(self, name, audio_files, method=None, n_jobs=None):
         """
         Entrainement d'un GMM pour l'utilisateur sur base de fichiers audios spécifiés.
+        method: "em" ou "map" (par défaut self.enroll_method).
+        n_jobs: processus d'extraction (par défaut self.n_jobs).
         """
+        method = method or self.enroll_method
         print(f"--- Enregistrement de l'utilisateur: {name} ---")
+
+        if method == "map" and UBM_NAME not in self.models:
+            print(f"Adaptation MAP impossible: modèle \"{UBM_NAME}\" non entrainé (voir train_ubm).")
+            return
+
         features_list = []
 
-        # Assemblage des features de chaque fichier
-        for file in audio_files:
-            feat = self.extract_features(file)
-            if feat is not None:
+        # Assemblage des features de chaque fichier (extraction répartie sur plusieurs processus)
+        extract = partial(compute_features, feature_store=self.feature_store, audio_cache=self.audio_cache)
+        for file, (feat, error) in zip(audio_files, map_files(extract, audio_files, n_jobs or self.n_jobs)):
+            if error is not None:
+                print(f"Erreur d'extraction des features de {file}: {error}")
+            elif feat is not None:
                 features_list.append(feat)
 
         if not features_list:
@@ -59,21 +144,46 @@ class GMMVoiceAuth:
 
         X = np.vstack(features_list)
 
-        # Entrainement des clusters GMM sur base des données vocales entrées
-        gmm = GaussianMixture(
-            n_components=self.n_components,
-            covariance_type='diag',
-            n_init=5,  # Répétition x5
-            verbose=0
-        )
-        gmm.fit(X)
-
-        # Enregistrement du modèle
-        self.models[name] = gmm
-        model_path = os.path.join(self.model_dir, f"{name}.gmm")
+        if method == "map":
+            gmm = self.map_adapt(X)
+        else:
+            # Entrainement des clusters GMM sur base des données vocales entrées
+            gmm = GaussianMixture(
+                n_components=self.n_components,
+                covariance_type='diag',
+                n_init=5,  # Répétition x5
+                verbose=0
+            )
+            gmm.fit(X)
+
+        # Enregistrement du modèle (sur disque d'abord: le registre peut l'évincer de la mémoire)
+        model_path = self.models.path(name)
         joblib.dump(gmm, model_path)
+        self.models[name] = gmm
         print(f"Modèle sauvegardé: {model_path}")
 
+    def remove_user(self, name):
+        """
+        Supprime le modèle d'un utilisateur, sur le disque et dans le registre.
+        """
+        path = self.models.path(name)
+        if os.path.exists(path):
+            os.remove(path)
+        if name in self.models:
+            del self.models[name]
+            print(f"Modèle supprimé: {path}")
+
+    def map_adapt(self, X):
+        """
+        Adaptation MAP des moyennes de l'UBM sur les frames X d'un locuteur (une seule passe).
+        Poids et covariances restent ceux de l'UBM: tous les locuteurs partagent la même structure.
+        """
+        ubm = self.models[UBM_NAME]
+        gmm = copy.deepcopy(ubm)
+        gmm.means_ = map_means(ubm, X, self.relevance_factor)
+        return gmm
+
+    @metrics.timed("gmm.verify")
     def verify_speaker(self, name, test_file):
         """
         Retourne le score de similarité entre le fichier de validation et le modèle entrainé.
@@ -89,9 +199,130 @@ class GMMVoiceAuth:
         gmm = self.models[name]
 
         # Calcul du score (meilleur au plus il est grand)
-        score = gmm.score(features)
+        with metrics.timer("gmm.score"):
+            score = gmm.score(features)
         return score
 
+    def start_online_verification(self, name, input_sr=None, **options):
+        """
+        Vérificateur séquentiel à alimenter bloc par bloc (ex: depuis un callback sounddevice).
+        options: paramètres de OnlineVerifier (margin, alpha, beta, ...).
+        """
+        if name not in self.models or UBM_NAME not in self.models:
+            print(f"Utilisateur {name} ou modèle \"{UBM_NAME}\" non existant.")
+            return None
+        extractor = StreamingFeatureExtractor.from_config(FEATURE_CONFIG, input_sr=input_sr)
+        # Même seuil de silence que le trim de compute_features
+        options.setdefault("trim_db", FEATURE_CONFIG["top_db"])
+        return OnlineVerifier(self.models[name], self.models[UBM_NAME], extractor, **options)
+
+    def verify_speaker_online(self, name, test_file, block_size=1024, **options):
+        """
+        Rejoue test_file comme un flux micro et s'arrête dès que le test séquentiel conclut.
+        Retourne (décision, secondes d'audio utilisées, llr moyen).
+        """
+        verifier = self.start_online_verification(name, **options)
+        if verifier is None:
+            return "Error", 0.0, 0.0
+
+        y = load_audio(test_file, FEATURE_CONFIG["sr"], self.audio_cache)
+        consumed = 0
+        for start in range(0, len(y), block_size):
+            consumed = min(len(y), start + block_size)
+            if verifier.push_audio(y[start:consumed]) is not None:
+                break
+        decision = verifier.finish()
+        return decision, consumed / FEATURE_CONFIG["sr"], verifier.mean_llr
+
+    def score_all(self, features):
+        """
+        Score (log-vraisemblance moyenne) de chaque modèle chargé, calculé en une seule opération matricielle.
+        """
+        # Reconstruite uniquement quand un modèle a été ajouté ou remplacé
+        if self._bank is None or self._bank_version != self.models.version:
+            with metrics.timer("gmm.bank_build"):
+                self._bank = SpeakerModelBank(self.models)
+            self._bank_version = self.models.version
+        metrics.observe_size("gmm.bank_models", len(self._bank))
+        with metrics.timer("gmm.score_all"):
+            return self._bank.score_dict(features)
+
+    def _model_tag(self, name):
+        path = self.models.path(name)
+        return list(stat_key(path)) if os.path.exists(path) else None
+
+    def embedding_index(self):
+        """
+        Index des supervecteurs (moyennes adaptées - UBM) des locuteurs enregistrés en MAP.
+
+        Sauvegardé dans model_dir/embeddings.{npy,json}; seuls les modèles ajoutés ou
+        réentrainés depuis sont relus. Un nouvel UBM invalide tout l'index. Les modèles
+        "em" n'ont pas la structure de l'UBM et n'y figurent pas.
+        """
+        if self._index is not None and self._index_version == self.models.version:
+            return self._index
+        if UBM_NAME not in self.models:
+            return None
+
+        ubm = self.models[UBM_NAME]
+        prefix = os.path.join(self.model_dir, "embeddings")
+        index = self._index or EmbeddingIndex.load(prefix)
+        ubm_tag = self._model_tag(UBM_NAME)
+        if index is None or index.tags.get(UBM_NAME) != ubm_tag:
+            index = EmbeddingIndex(ubm.means_.size)
+        index.tags[UBM_NAME] = ubm_tag
+
+        changed = False
+        for name in self.models:
+            if name == UBM_NAME:
+                continue
+            tag = self._model_tag(name)
+            if name in index and tag is not None and index.tags.get(name) == tag:
+                continue
+            gmm = self.models[name]
+            if gmm.means_.shape != ubm.means_.shape or not np.allclose(gmm.covariances_, ubm.covariances_):
+                # Réentrainé en "em": sa ligne MAP précédente est périmée
+                if name in index:
+                    index.remove(name)
+                    changed = True
+                continue
+            index.add(name, supervector(gmm.means_, ubm), tag)
+            changed = True
+
+        for name in [n for n in index.names if n not in self.models]:
+            index.remove(name)
+            changed = True
+
+        if changed:
+            index.save(prefix)
+        self._index = index
+        self._index_version = self.models.version
+        return index
+
+    def embed(self, features):
+        """
+        Embedding de dimension fixe d'un enregistrement: supervecteur MAP par rapport à l'UBM.
+        """
+        ubm = self.models[UBM_NAME]
+        return supervector(map_means(ubm, features, self.relevance_factor), ubm)
+
+    @metrics.timed("gmm.identify_embedding")
+    def identify_by_embedding(self, test_file, top_k=5):
+        """
+        Identification 1:N par similarité cosinus des supervecteurs: un seul produit
+        matrice-vecteur contre tous les locuteurs, au lieu d'une vraisemblance par locuteur.
+        Retourne les top_k (nom, similarité), la plus grande d'abord.
+        """
+        features = self.extract_features(test_file)
+        if features is None:
+            return []
+        index = self.embedding_index()
+        if index is None:
+            print(f"Erreur: Utilisateur \"{UBM_NAME}\" non existant")
+            return []
+        return index.search(self.embed(features), top_k)
+
+    @metrics.timed("gmm.identify")
     def identify_speaker(self, test_file, safety_margin=10.0):
         """
         Identification du sample de validation. Retourne 'Unknown' si le sample ne ressemble pas suffisamment à un utilisateur existant.
@@ -101,10 +332,12 @@ class GMMVoiceAuth:
             return "Error", 0
 
         # Calcul de l'utilisateur lambda "Random"
-        if "Random" not in self.models:
-            return "Erreur: Utilisateur \"Random\" non existant", 0
+        if UBM_NAME not in self.models:
+            return f"Erreur: Utilisateur \"{UBM_NAME}\" non existant", 0
 
-        ubm_score = self.models["Random"].score(features)
+        # Tous les locuteurs (et "Random") scorés en un seul passage
+        scores = self.score_all(features)
+        ubm_score = scores[UBM_NAME]
 
         best_speaker = "Unknown"
         best_margin = -float('inf')
@@ -113,11 +346,10 @@ class GMMVoiceAuth:
         print(f"  [Baseline] Score d'une personne lambda: {ubm_score:.2f}")
         print("  ------------------------------------------------")
 
-        for name, gmm in self.models.items():
-            if name == "Random":
+        for name, raw_score in scores.items():
+            if name == UBM_NAME:
                 continue
 
-            raw_score = gmm.score(features)
             margin = raw_score - ubm_score
             print(f"  Candidate {name}: Margin = {margin:.2f}")
 
@@ -132,7 +364,12 @@ class GMMVoiceAuth:
 
 if __name__ == "__main__":
     # Validation
-    auth = GMMVoiceAuth(n_components=16)
+    auth = GMMVoiceAuth(n_components=16, enroll_method="map")
+
+    # Modèle de fond, entrainé une seule fois: les locuteurs en sont adaptés (MAP)
+    random_files = ["samples/p01/b1.m4a", "samples/p02/e1.m4a", "samples/p03/x1.m4a",
+                    "samples/p04/j1.m4a", "samples/p08/cam_1.wav", "samples/p09/JIM_1.wav"]
+    auth.train_ubm(random_files)
 
     # Enregistrement
     simon_files = ["samples/p13/simon_1.wav", "samples/p13/simon_2.wav"]
@@ -153,13 +390,12 @@ if __name__ == "__main__":
                    "samples/p17/tiago_05.wav", "samples/p17/tiago_06.wav", "samples/p17/tiago_07.wav", "samples/p17/tiago_08.wav", "samples/p17/tiago_09.wav"]
     auth.enroll_user("Tiago", tiago_files)
 
-    random_files = ["samples/p01/b1.m4a", "samples/p02/e1.m4a", "samples/p03/x1.m4a",
-                    "samples/p04/j1.m4a", "samples/p08/cam_1.wav", "samples/p09/JIM_1.wav"]
-    auth.enroll_user("Random", random_files)
-
     # Validation
     unknown_file = "samples/p17/tiago_10.wav"
     winner, score = auth.identify_speaker(unknown_file)
 
-    print(f"\n>>> Utilisateur identifié : {
-          winner} (Score: {score:.2f})")
+    print(f"\n>>> Utilisateur identifié : {winner} (Score: {score:.2f})")
+
+    # Identification par embeddings (supervecteurs, similarité cosinus)
+    for name, similarity in auth.identify_by_embedding(unknown_file, top_k=3):
+        print(f"  {name}: cosinus = {similarity:.3f}")
@@ -0,0 +1,180 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+# Bornes des histogrammes: durées en secondes, tailles en éléments (frames, échantillons...)
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = tuple(4 ** k for k in range(1, 13))
+
+_NULL = nullcontext()
+
+
+class Histogram:
+    """
+    Histogramme cumulatif à bornes fixes (format Prometheus), plus min/max.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    """
+    Compteurs, chronomètres et histogrammes de tailles du pipeline vocal.
+
+    Désactivé, chaque appel se réduit à un test de booléen (timer() renvoie un
+    contexte vide partagé). Activé par enable() ou la variable VOICE_METRICS=1.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._counters = {}
+        self._timers = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self._sizes.clear()
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe_time(self, name, seconds):
+        with self._lock:
+            histogram = self._timers.get(name)
+            if histogram is None:
+                histogram = self._timers[name] = Histogram(TIME_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_size(self, name, size):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._sizes.get(name)
+            if histogram is None:
+                histogram = self._sizes[name] = Histogram(SIZE_BUCKETS)
+            histogram.observe(size)
+
+    def timer(self, name):
+        """
+        with metrics.timer("dtw.mfcc"): ...
+        """
+        if not self.enabled:
+            return _NULL
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """
+        Décorateur: chronomètre chaque appel de la fonction.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe_time(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timers": {name: h.snapshot() for name, h in self._timers.items()},
+                "sizes": {name: h.snapshot() for name, h in self._sizes.items()},
+            }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix="voice"):
+        """
+        Export au format texte de Prometheus (compteurs + histogrammes).
+        """
+        snap = self.snapshot()
+        lines = []
+
+        def metric_name(name, suffix=""):
+            return f"{prefix}_{name}{suffix}".replace(".", "_").replace("-", "_")
+
+        for name, value in sorted(snap["counters"].items()):
+            full = metric_name(name, "_total")
+            lines += [f"# TYPE {full} counter", f"{full} {value}"]
+
+        for kind, suffix in (("timers", "_seconds"), ("sizes", "")):
+            for name, h in sorted(snap[kind].items()):
+                full = metric_name(name, suffix)
+                lines.append(f"# TYPE {full} histogram")
+                cumulative = 0
+                for bound, n in h["buckets"].items():
+                    cumulative += n
+                    lines.append(f'{full}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"{full}_sum {h['sum']}")
+                lines.append(f"{full}_count {h['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Écrit l'instantané dans path (.prom pour le format Prometheus, JSON sinon).
+        """
+        with open(path, "w") as f:
+            f.write(self.to_prometheus() if path.endswith(".prom") else self.to_json())
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# Instance partagée par tous les modules du pipeline
+metrics = Metrics(enabled=os.environ.get("VOICE_METRICS", "") not in ("", "0"))
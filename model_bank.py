@@ -0,0 +1,93 @@
+import numpy as np
+
+
+class SpeakerModelBank:
+    """
+    Tous les GMM diagonaux des locuteurs empilés dans des tableaux contigus.
+
+    Pour une covariance diagonale:
+        log N(x | mu, prec) = c + x² · (-prec / 2) + x · (mu * prec)
+    donc la log-vraisemblance de chaque frame pour toutes les composantes de tous
+    les locuteurs s'obtient avec un seul produit matriciel [x², x] @ W.
+    """
+
+    def __init__(self, models):
+        """
+        models: dict {nom: GaussianMixture(covariance_type='diag')} ou ModelRegistry.
+        Chaque modèle n'est lu qu'une fois: seuls ses paramètres sont conservés.
+        """
+        self.names = []
+        params = []
+        for name, gmm in models.items():
+            if gmm.covariance_type != 'diag':
+                raise ValueError(f"Modèle {name}: seule la covariance 'diag' est supportée")
+            self.names.append(name)
+            params.append((gmm.means_, gmm.precisions_cholesky_ ** 2, np.log(gmm.weights_)))
+
+        if not self.names:
+            self.n_features = 0
+            self.n_components = 0
+            self.weights = np.zeros((0, 0))
+            self.bias = np.zeros(0)
+            return
+
+        n_speakers = len(self.names)
+        n_components = max(len(p[2]) for p in params)
+        n_features = params[0][0].shape[1]
+
+        means = np.zeros((n_speakers, n_components, n_features))
+        precisions = np.ones((n_speakers, n_components, n_features))
+        # Les composantes de remplissage ont un poids nul (log = -inf)
+        log_weights = np.full((n_speakers, n_components), -np.inf)
+
+        for s, (mu, prec, log_w) in enumerate(params):
+            k = len(log_w)
+            means[s, :k] = mu
+            precisions[s, :k] = prec
+            log_weights[s, :k] = log_w
+        del params
+
+        bias = (log_weights
+                - 0.5 * n_features * np.log(2 * np.pi)
+                + 0.5 * np.sum(np.log(precisions), axis=2)
+                - 0.5 * np.sum(means ** 2 * precisions, axis=2))
+
+        # (2 * n_features, n_speakers * n_components)
+        self.weights = np.concatenate([-0.5 * precisions, means * precisions], axis=2) \
+            .reshape(n_speakers * n_components, 2 * n_features).T.copy()
+        self.bias = bias.reshape(-1)
+        self.n_features = n_features
+        self.n_components = n_components
+
+    def __len__(self):
+        return len(self.names)
+
+    def score(self, features, max_block=4_000_000):
+        """
+        Log-vraisemblance moyenne par frame de chaque locuteur (équivalent de gmm.score).
+        Retourne un vecteur aligné sur self.names.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        n_frames = len(features)
+        n_speakers = len(self.names)
+        if n_speakers == 0 or n_frames == 0:
+            return np.full(n_speakers, -np.inf)
+
+        # Blocs de frames pour borner la mémoire de la matrice (frames, locuteurs * composantes)
+        block = max(1, max_block // (n_speakers * self.n_components))
+        total = np.zeros(n_speakers)
+        for start in range(0, n_frames, block):
+            x = features[start:start + block]
+            log_prob = np.hstack([x ** 2, x]) @ self.weights + self.bias
+            log_prob = log_prob.reshape(len(x), n_speakers, self.n_components)
+
+            # logsumexp sur les composantes, en place pour éviter les copies
+            peak = log_prob.max(axis=2, keepdims=True)
+            log_prob -= peak
+            np.exp(log_prob, out=log_prob)
+            total += (np.log(log_prob.sum(axis=2)) + peak[..., 0]).sum(axis=0)
+
+        return total / n_frames
+
+    def score_dict(self, features):
+        return dict(zip(self.names, self.score(features)))
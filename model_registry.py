@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+
+
+def model_nbytes(model):
+    """
+    Taille mémoire approximative d'un GaussianMixture (somme de ses tableaux).
+    """
+    return sum(getattr(model, attr).nbytes
+               for attr in ("weights_", "means_", "covariances_", "precisions_", "precisions_cholesky_")
+               if hasattr(model, attr))
+
+
+class ModelRegistry:
+    """
+    Registre paresseux des modèles de model_dir, utilisable comme un dict {nom: modèle}.
+
+    Au démarrage, seuls les noms des fichiers <nom>.gmm sont découverts. Un modèle est
+    chargé au premier accès, et au plus max_models modèles / max_bytes octets restent
+    en mémoire (LRU). Un modèle évincé est rechargé depuis le disque si nécessaire.
+    """
+
+    def __init__(self, model_dir, max_models=None, max_bytes=None, extension=".gmm"):
+        self.model_dir = model_dir
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.extension = extension
+        # Incrémenté à chaque ajout/suppression de modèle (pas aux chargements/évictions)
+        self.version = 0
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+        self._paths = {}
+        self._loaded = OrderedDict()  # nom -> (modèle, octets)
+        self._lock = threading.RLock()
+        self.discover()
+
+    def discover(self):
+        """
+        (Re)liste les modèles présents sur le disque sans les charger.
+        """
+        found = {}
+        if os.path.isdir(self.model_dir):
+            for entry in os.scandir(self.model_dir):
+                if entry.is_file() and entry.name.endswith(self.extension):
+                    found[entry.name[:-len(self.extension)]] = entry.path
+
+        with self._lock:
+            # Les modèles ajoutés en mémoire mais pas encore sur disque restent connus
+            for name in self._loaded:
+                found.setdefault(name, self._paths.get(name))
+            if found.keys() != self._paths.keys():
+                self.version += 1
+            self._paths = found
+
+    def path(self, name):
+        return os.path.join(self.model_dir, f"{name}{self.extension}")
+
+    def __contains__(self, name):
+        return name in self._paths
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __iter__(self):
+        return iter(list(self._paths))
+
+    def keys(self):
+        return list(self._paths)
+
+    def __getitem__(self, name):
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None:
+                self._loaded.move_to_end(name)
+                self.hits += 1
+                return entry[0]
+
+            path = self._paths.get(name)
+            if path is None:
+                raise KeyError(name)
+            model = joblib.load(path)
+            self.loads += 1
+            self._insert(name, model)
+            return model
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __setitem__(self, name, model):
+        with self._lock:
+            if name not in self._paths:
+                self._paths[name] = self.path(name)
+            self._insert(name, model)
+            self.version += 1
+
+    def __delitem__(self, name):
+        with self._lock:
+            del self._paths[name]
+            entry = self._loaded.pop(name, None)
+            if entry is not None:
+                self.resident_bytes -= entry[1]
+            self.version += 1
+
+    def items(self):
+        """
+        Parcourt tous les modèles; chacun est chargé à son tour et peut en évincer d'autres.
+        """
+        for name in self:
+            yield name, self[name]
+
+    def values(self):
+        for _, model in self.items():
+            yield model
+
+    def _insert(self, name, model):
+        old = self._loaded.pop(name, None)
+        if old is not None:
+            self.resident_bytes -= old[1]
+        size = model_nbytes(model)
+        self._loaded[name] = (model, size)
+        self.resident_bytes += size
+
+        # Éviction LRU, sans jamais retirer le modèle qu'on vient d'insérer
+        while len(self._loaded) > 1 and (
+                (self.max_models is not None and len(self._loaded) > self.max_models)
+                or (self.max_bytes is not None and self.resident_bytes > self.max_bytes)):
+            _, (_, evicted_size) = self._loaded.popitem(last=False)
+            self.resident_bytes -= evicted_size
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "known": len(self._paths),
+            "resident": len(self._loaded),
+            "resident_bytes": self.resident_bytes,
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+        }
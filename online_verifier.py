@@ -0,0 +1,141 @@
+import numpy as np
+
+
+class OnlineVerifier:
+    """
+    Vérification séquentielle d'un locuteur pendant qu'il parle.
+
+    Chaque frame donne un rapport de log-vraisemblance llr = log p(x|locuteur) - log p(x|UBM).
+    La règle hors-ligne de GMMVoiceAuth est "moyenne(llr) > margin"; ici on applique un
+    SPRT gaussien sur cette moyenne (H1: margin + delta contre H0: margin - delta):
+
+        statistique = 2 * delta * somme(llr - margin) / (variance * correlation)
+
+    Acceptation dès que statistique >= log((1 - beta) / alpha), rejet dès qu'elle
+    passe sous log(beta / (1 - alpha)). correlation compense la forte dépendance entre
+    frames voisines (nombre de frames par observation "indépendante").
+
+    trim_db: comme le trim hors-ligne (librosa.effects.trim), les frames dont l'énergie
+    est à plus de trim_db sous le maximum ne comptent pas: le silence ne pousse pas la
+    statistique vers un rejet. Le maximum n'étant connu qu'au fil de l'eau, chaque frame
+    n'est filtrée qu'après gate_delay frames supplémentaires (None = pas de filtrage).
+    Les frames sous silence_db (dBFS) sont toujours écartées, pour le silence reçu avant
+    la première parole: avec une voix à -20 dBFS ou plus, le trim hors-ligne les retire aussi.
+    """
+
+    def __init__(self, speaker_model, ubm, extractor=None, margin=10.0, delta=5.0,
+                 alpha=0.01, beta=0.01, correlation=10.0, min_frames=30, variance_floor=1.0,
+                 trim_db=None, gate_delay=10, silence_db=-80.0):
+        self.speaker_model = speaker_model
+        self.ubm = ubm
+        self.extractor = extractor
+        self.margin = margin
+        self.delta = delta
+        self.correlation = correlation
+        self.min_frames = min_frames
+        self.variance_floor = variance_floor
+        self.upper = np.log((1 - beta) / alpha)
+        self.lower = np.log(beta / (1 - alpha))
+        self.trim_db = trim_db
+        self.gate_delay = gate_delay
+        self.silence_db = silence_db
+
+        self.decision = None
+        self.n_frames = 0
+        self.statistic = 0.0
+        self._sum = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.n_silent = 0
+        self._received = 0
+        self._peak_db = -np.inf
+        self._pending = []  # (frames, rms_db) en attente du filtrage
+
+    @property
+    def mean_llr(self):
+        return self._sum / self.n_frames if self.n_frames else 0.0
+
+    def push_audio(self, block):
+        """
+        Bloc audio brut (callback sounddevice): passe par l'extracteur en streaming.
+        """
+        if self.decision is not None:
+            return self.decision
+        return self._push_extracted(self.extractor.push(block))
+
+    def _push_extracted(self, frames):
+        # Énergie des frames émises par l'extracteur, pour le filtrage du silence
+        rms = self.extractor.rms[self._received:self._received + len(frames)]
+        self._received += len(frames)
+        return self.push_frames(frames, rms)
+
+    def push_frames(self, frames, rms=None):
+        """
+        Ajoute des frames de features (et leur énergie RMS, pour le filtrage du silence);
+        retourne "accept", "reject" ou None (pas encore décidé).
+        """
+        if self.decision is not None or len(frames) == 0:
+            return self.decision
+
+        if self.trim_db is not None and rms is not None:
+            rms_db = 20.0 * np.log10(np.maximum(1e-5, rms))
+            self._peak_db = max(self._peak_db, rms_db.max())
+            self._pending.append((frames, rms_db))
+            frames = self._release(final=False)
+            if len(frames) == 0:
+                return self.decision
+        return self._update(frames)
+
+    def _release(self, final):
+        """
+        Frames en attente assez anciennes (toutes si final), sans celles sous le seuil de silence.
+        """
+        frames = np.vstack([f for f, _ in self._pending])
+        rms_db = np.concatenate([r for _, r in self._pending])
+        n = len(frames) if final else max(0, len(frames) - self.gate_delay)
+        self._pending = [(frames[n:], rms_db[n:])] if n < len(frames) else []
+
+        voiced = rms_db[:n] > max(self._peak_db - self.trim_db, self.silence_db)
+        self.n_silent += int(n - voiced.sum())
+        return frames[:n][voiced]
+
+    def _update(self, frames):
+        if len(frames) == 0:
+            return self.decision
+
+        llr = self.speaker_model.score_samples(frames) - self.ubm.score_samples(frames)
+
+        # Moyenne et variance courantes (Welford, par lot)
+        n_new = len(llr)
+        batch_mean = llr.mean()
+        total = self.n_frames + n_new
+        shift = batch_mean - self._mean
+        self._m2 += ((llr - batch_mean) ** 2).sum() + shift ** 2 * self.n_frames * n_new / total
+        self._mean += shift * n_new / total
+        self._sum += llr.sum()
+        self.n_frames = total
+
+        if self.n_frames < self.min_frames:
+            return None
+
+        variance = max(self.variance_floor, self._m2 / (self.n_frames - 1))
+        self.statistic = 2 * self.delta * (self._sum - self.margin * self.n_frames) / (variance * self.correlation)
+
+        if self.statistic >= self.upper:
+            self.decision = "accept"
+        elif self.statistic <= self.lower:
+            self.decision = "reject"
+        return self.decision
+
+    def finish(self):
+        """
+        Fin de l'enregistrement sans décision anticipée: règle hors-ligne sur la moyenne.
+        """
+        if self.decision is None:
+            if self.extractor is not None:
+                self._push_extracted(self.extractor.finalize())
+            if self.decision is None and self._pending:
+                self._update(self._release(final=True))
+            if self.decision is None:
+                self.decision = "accept" if self.n_frames and self.mean_llr > self.margin else "reject"
+        return self.decision
@@ -0,0 +1,317 @@
+import queue
+import threading
+from functools import lru_cache
+
+import numpy as np
+import librosa
+import scipy.fft
+import scipy.signal
+
+
+@lru_cache(maxsize=8)
+def mfcc_basis(sr, n_fft=2048, n_mels=128, n_mfcc=20):
+    """
+    Mel filterbank (n_mels, 1 + n_fft // 2) and orthonormal DCT-II matrix (n_mfcc, n_mels),
+    computed once per configuration. Same matrices as librosa.feature.mfcc.
+    """
+    mel = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+    dct = scipy.fft.dct(np.eye(n_mels), type=2, norm='ortho', axis=0)[:n_mfcc]
+    return mel, dct
+
+
+class _Growable:
+    """
+    Row-appendable 2-D array with amortized doubling (no per-frame allocation).
+    """
+
+    def __init__(self, n_cols, capacity=256, dtype=np.float64):
+        self._data = np.empty((capacity, n_cols), dtype=dtype)
+        self.size = 0
+
+    def extend(self, rows):
+        needed = self.size + len(rows)
+        if needed > len(self._data):
+            grown = np.empty((max(needed, 2 * len(self._data)), self._data.shape[1]), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = rows
+        self.size = needed
+
+    def view(self):
+        return self._data[:self.size]
+
+
+class StreamingFeatureExtractor:
+    """
+    Incremental MFCC + delta (+ delta-delta) extraction fed block by block.
+
+    Matches librosa (center=True with zero padding, hann window, slaney mel, power_to_db
+    with top_db=80, ortho DCT, savgol deltas of width 9):
+      - push() returns frames as soon as they are known, with a lookahead of
+        delta_width // 2 frames for the deltas. The 80 dB floor of these online
+        frames uses the running maximum instead of the utterance maximum.
+      - features() applies the silence trim, the floor, the CMS and the deltas on the
+        whole utterance once recording has stopped. Like librosa.effects.trim, the trim
+        cuts the signal (kept as float32) and re-frames it: only the few frames whose
+        window crosses a cut are recomputed, the others are reused as they are.
+    """
+
+    def __init__(self, sr=16000, n_mfcc=13, delta_order=2, input_sr=None,
+                 n_fft=2048, hop_length=512, n_mels=128, top_db=80.0, delta_width=9):
+        self.sr = sr
+        self.n_mfcc = n_mfcc
+        self.delta_order = delta_order
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.top_db = top_db
+        self.delta_width = delta_width
+        self.lookahead = delta_width // 2
+
+        self.mel_basis, self.dct = mfcc_basis(sr, n_fft, n_mels, n_mfcc)
+        self.window = scipy.signal.get_window('hann', n_fft, fftbins=True)
+        self.delta_coeffs = [scipy.signal.savgol_coeffs(delta_width, polyorder=order, deriv=order, use='dot')
+                             for order in range(1, delta_order + 1)]
+
+        self.resampler = None
+        if input_sr is not None and input_sr != sr:
+            import soxr
+            self.resampler = soxr.ResampleStream(input_sr, sr, 1, dtype='float32', quality='HQ')
+
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config, input_sr=None):
+        """
+        Extractor matching a FEATURE_CONFIG dict of dtw.py / gmm.py.
+        """
+        return cls(sr=config["sr"], n_mfcc=config["n_mfcc"], delta_order=config["delta_order"], input_sr=input_sr)
+
+    def reset(self):
+        # Zero padding of center=True: the first frame is centred on sample 0
+        self._pending = np.zeros(self.n_fft // 2)
+        self._n_samples = 0
+        self._signal = _Growable(1, capacity=self.sr * 10, dtype=np.float32)
+        self._log_mel = _Growable(len(self.mel_basis))
+        self._mfcc = _Growable(self.n_mfcc)
+        self._rms = _Growable(1)
+        self._peak_db = -np.inf
+        self._emitted = 0
+        self.finished = False
+
+    @property
+    def n_frames(self):
+        return self._mfcc.size
+
+    @property
+    def rms(self):
+        """
+        RMS energy of every frame computed so far (same framing as librosa.feature.rms).
+        """
+        return self._rms.view()[:, 0]
+
+    def push(self, block):
+        """
+        Consumes one audio block (samples, or samples x channels as given by sounddevice).
+        Returns the newly available feature frames, shape (k, n_features).
+        """
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        if self.resampler is not None:
+            block = self.resampler.resample_chunk(block)
+        self._append_samples(block)
+        return self._emit(final=False)
+
+    def finalize(self):
+        """
+        End of recording: flushes the end padding and returns the last frames.
+        """
+        if self.finished:
+            return np.empty((0, self.n_features))
+        if self.resampler is not None:
+            self._append_samples(self.resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+
+        # Frame count of librosa.stft(center=True): 1 + n_samples // hop
+        expected = 1 + self._n_samples // self.hop_length
+        self._pending = np.concatenate([self._pending, np.zeros(self.n_fft // 2)])
+        self._compute_frames(limit=expected)
+        self.finished = True
+        return self._emit(final=True)
+
+    @property
+    def n_features(self):
+        return self.n_mfcc * (1 + self.delta_order)
+
+    def _append_samples(self, samples):
+        self._n_samples += len(samples)
+        self._signal.extend(samples[:, None])
+        self._pending = np.concatenate([self._pending, samples])
+        self._compute_frames()
+
+    def _compute_frames(self, limit=None):
+        n = 1 + (len(self._pending) - self.n_fft) // self.hop_length
+        if limit is not None:
+            n = min(n, limit - self._mfcc.size)
+        if n <= 0:
+            return
+
+        frames = np.lib.stride_tricks.sliding_window_view(self._pending, self.n_fft)[::self.hop_length][:n]
+        log_mel = self._frame_log_mel(frames)
+
+        # Online floor: running maximum (the exact floor is applied again in features())
+        self._peak_db = max(self._peak_db, log_mel.max())
+        floored = np.maximum(log_mel, self._peak_db - self.top_db)
+
+        self._log_mel.extend(log_mel)
+        self._mfcc.extend(floored @ self.dct.T)
+        self._rms.extend(np.sqrt(np.mean(frames ** 2, axis=1, keepdims=True)))
+        self._pending = self._pending[n * self.hop_length:]
+
+    def _frame_log_mel(self, frames):
+        power = np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2
+        return 10.0 * np.log10(np.maximum(1e-10, power @ self.mel_basis.T))
+
+    def _emit(self, final):
+        mfcc = self._mfcc.view()
+        total = len(mfcc)
+        if total < self.delta_width:
+            if final:
+                self._emitted = total
+            return np.empty((0, self.n_features))
+
+        stop = total if final else total - self.lookahead
+        if stop <= self._emitted:
+            return np.empty((0, self.n_features))
+
+        start = self._emitted
+        rows = [mfcc[start:stop]]
+        for order, coeffs in enumerate(self.delta_coeffs, start=1):
+            rows.append(self._deltas(mfcc, order, coeffs, start, stop))
+        self._emitted = stop
+        return np.hstack(rows)
+
+    def _deltas(self, mfcc, order, coeffs, start, stop):
+        """
+        Savitzky-Golay derivative of frames [start, stop); edges use the polynomial fit
+        of the first/last window like librosa's mode='interp'.
+        """
+        total = len(mfcc)
+        half = self.lookahead
+        out = np.empty((stop - start, self.n_mfcc))
+        for t in range(start, stop):
+            if half <= t < total - half:
+                out[t - start] = coeffs @ mfcc[t - half:t + half + 1]
+        for lo, hi, edge in ((0, half, mfcc[:self.delta_width]), (total - half, total, mfcc[-self.delta_width:])):
+            a, b = max(lo, start), min(hi, stop)
+            if a < b:
+                fitted = scipy.signal.savgol_filter(edge, self.delta_width, polyorder=order, deriv=order,
+                                                    axis=0, mode='interp')
+                offset = 0 if lo == 0 else self.delta_width - (total - a)
+                out[a - start:b - start] = fitted[offset:offset + (b - a)]
+        return out
+
+    def features(self, trim_db=None, cms=False):
+        """
+        Whole-utterance features after finalize(), same as librosa.feature.mfcc (+ deltas)
+        on the signal trimmed by librosa.effects.trim, i.e. the offline extractors of dtw.py
+        and gmm.py (up to resampling differences when input_sr is set):
+        trim_db: silence trimming threshold of librosa.effects.trim (None = no trim).
+        cms: cepstral mean subtraction on the MFCC rows (deltas are unaffected by it).
+        Returns (n_frames, n_features), or None when the utterance is too short.
+        """
+        if not self.finished:
+            self.finalize()
+
+        log_mel = self._log_mel.view()
+        if trim_db is not None:
+            log_mel = self._trimmed_log_mel(trim_db)
+            if log_mel is None:
+                return None
+        if len(log_mel) < self.delta_width:
+            return None
+
+        mfcc = np.maximum(log_mel, log_mel.max() - self.top_db) @ self.dct.T
+        if cms:
+            mfcc = mfcc - mfcc.mean(axis=0, keepdims=True)
+
+        rows = [mfcc]
+        for order in range(1, self.delta_order + 1):
+            rows.append(scipy.signal.savgol_filter(mfcc, self.delta_width, polyorder=order, deriv=order,
+                                                   axis=0, mode='interp'))
+        return np.hstack(rows)
+
+    def _trimmed_log_mel(self, trim_db):
+        """
+        Log-mel frames of the signal cut like librosa.effects.trim, re-framed with center=True.
+        """
+        rms = self.rms
+        rms_db = 20.0 * np.log10(np.maximum(1e-5, rms)) - 20.0 * np.log10(max(1e-5, rms.max()))
+        voiced = np.flatnonzero(rms_db > -trim_db)
+        if len(voiced) == 0:
+            return None
+        signal = self._signal.view()[:, 0]
+        start = voiced[0] * self.hop_length
+        end = min(len(signal), (voiced[-1] + 1) * self.hop_length)
+        n_frames = 1 + (end - start) // self.hop_length
+
+        # Frame k of the cut signal is centred on the same sample as frame voiced[0] + k
+        log_mel = self._log_mel.view()[voiced[0]:voiced[0] + n_frames].copy()
+
+        # ...but the frames whose window crosses a cut see zero padding instead of the neighbouring samples
+        half = self.n_fft // 2
+        centres = np.arange(n_frames) * self.hop_length
+        edges = np.flatnonzero((centres < half) | (centres + half > end - start))
+        padded = np.concatenate([np.zeros(half), signal[start:end], np.zeros(half)])
+        frames = np.stack([padded[c:c + self.n_fft] for c in centres[edges]])
+        log_mel[edges] = self._frame_log_mel(frames)
+        return log_mel
+
+    def features_for_config(self, config):
+        """
+        features() with the trim/CMS settings of a FEATURE_CONFIG dict.
+        """
+        return self.features(trim_db=config.get("top_db"), cms=config.get("cms", False))
+
+
+class ExtractorThread:
+    """
+    Feeds a StreamingFeatureExtractor from a background thread, like capture_buffer.StreamingWavWriter:
+    the recording callback only queues a copy of each block, the STFT runs off the audio thread.
+    """
+
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self.error = None
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def push(self, block):
+        """
+        Called from the audio callback: copy of the block (sounddevice reuses its buffer).
+        """
+        self._queue.put(block.copy())
+
+    def _run(self):
+        while True:
+            block = self._queue.get()
+            if block is None:
+                break
+            if self.error is None:
+                try:
+                    self.extractor.push(block)
+                except Exception as e:
+                    # The queue is still drained so that close() returns
+                    self.error = e
+                    print(f"Streaming feature extraction failed: {e}")
+
+    def close(self):
+        """
+        Waits for the queued blocks, finalizes the extractor and returns it (None after a failure).
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            return None
+        self.extractor.finalize()
+        return self.extractor
@@ -0,0 +1,53 @@
+import numpy as np
+import soundfile as sf
+
+from capture_buffer import CaptureBuffer, StreamingWavWriter, to_pcm16
+
+
+def blocks(n, size=100, channels=1):
+    rng = np.random.default_rng(0)
+    return [rng.normal(size=(size, channels)).astype(np.float32) for _ in range(n)]
+
+
+def test_capture_equals_concatenation():
+    recorded = blocks(7)
+    buffer = CaptureBuffer(capacity=1000)
+    for block in recorded:
+        buffer.write(block)
+
+    assert len(buffer) == 700
+    np.testing.assert_array_equal(buffer.view(), np.concatenate(recorded))
+
+
+def test_capture_grows_past_capacity():
+    recorded = blocks(5, channels=2)
+    buffer = CaptureBuffer(channels=2, capacity=150)
+    for block in recorded:
+        buffer.write(block)
+
+    assert buffer.capacity >= 500
+    np.testing.assert_array_equal(buffer.view(), np.concatenate(recorded))
+
+
+def test_reset_keeps_the_allocation():
+    buffer = CaptureBuffer(capacity=1000)
+    buffer.write(blocks(1)[0])
+    capacity = buffer.capacity
+
+    buffer.reset()
+    assert len(buffer) == 0 and buffer.view().shape == (0, 1)
+    assert buffer.capacity == capacity
+
+
+def test_streaming_writer_writes_every_block(tmp_path):
+    recorded = blocks(20, size=441)
+    path = str(tmp_path / "take.wav")
+    writer = StreamingWavWriter(path, 44100, flush_seconds=0.05)
+    for block in recorded:
+        writer.write(block)
+        block[:] = 0  # sounddevice reuses its buffer: the writer must have copied it
+    writer.close()
+
+    data, sr = sf.read(path, dtype="float32", always_2d=True)
+    assert sr == 44100 and writer.frames_written == len(data) == 20 * 441
+    np.testing.assert_allclose(data, to_pcm16(np.concatenate(blocks(20, size=441))) / 32768.0, atol=1 / 32768)
@@ -0,0 +1,50 @@
+import numpy as np
+import soundfile as sf
+
+from catalogue import SampleCatalog
+
+
+def _write(path, seconds=0.5, sr=16000):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sf.write(str(path), np.zeros(int(seconds * sr)), sr)
+
+
+def test_sync_tracks_added_and_removed_files(tmp_path):
+    root = tmp_path / "samples"
+    _write(root / "p01" / "Simon_1.wav")
+    _write(root / "p01" / "Simon_2.wav", seconds=1.0)
+    _write(root / "Lea_1.wav")
+    catalogue = SampleCatalog(str(root), str(tmp_path / "catalogue.sqlite"))
+
+    assert catalogue.sync() == (3, 0)
+    assert catalogue.sync() == (0, 0)
+    assert catalogue.list_paths() == ["Lea_1.wav", "p01/Simon_1.wav", "p01/Simon_2.wav"]
+    assert catalogue.list_paths("") == ["Lea_1.wav"]
+
+    takes = catalogue.by_speaker("Simon", "p01")
+    assert [t["take"] for t in takes] == [1, 2]
+    assert takes[1]["duration"] == 1.0
+
+    (root / "p01" / "Simon_1.wav").unlink()
+    assert catalogue.sync() == (0, 1)
+    assert len(catalogue) == 2
+    catalogue.close()
+
+
+def test_next_take_skips_files_added_since_sync(tmp_path):
+    root = tmp_path / "samples"
+    _write(root / "Simon_1.wav")
+    _write(root / "Simona_4.wav")
+    catalogue = SampleCatalog(str(root), str(tmp_path / "catalogue.sqlite"))
+    catalogue.sync()
+    assert catalogue.next_take("Simon") == 2
+    assert catalogue.next_take("Lea") == 1
+
+    # Written after the sync, unknown to the index: must not be overwritten
+    _write(root / "Simon_2.wav")
+    _write(root / "Simon_3.wav")
+    assert catalogue.next_take("Simon") == 4
+
+    catalogue.add(str(root / "Simon_2.wav"))
+    assert catalogue.next_take("Simon") == 4
+    catalogue.close()
@@ -0,0 +1,66 @@
+import io
+import json
+import sys
+
+import compare_batch
+import comparaison
+from compare_batch import _json_number, compare_pairs, read_pairs
+
+
+def test_read_pairs_header_and_delimiters(tmp_path, capsys):
+    listing = tmp_path / "pairs.csv"
+    listing.write_text("sample1,sample2\n# comment\n\na.wav,b.wav\nc.wav;d.m4a\ne.wav\tf.wav\ng.wav h.wav\nlonely.wav\n")
+    pairs = read_pairs(str(listing), root="root")
+
+    assert pairs == [("root/a.wav", "root/b.wav"), ("root/c.wav", "root/d.m4a"),
+                     ("root/e.wav", "root/f.wav"), ("root/g.wav", "root/h.wav")]
+    out = capsys.readouterr().out
+    assert "line 1 as a header" in out
+    assert "line 8" in out
+
+
+def test_read_pairs_reports_dropped_first_line(tmp_path, capsys):
+    # A first pair with an unknown extension is skipped as a header, but not silently
+    listing = tmp_path / "pairs.txt"
+    listing.write_text("a.flac b.flac\nc.wav d.wav\n")
+    assert read_pairs(str(listing)) == [("c.wav", "d.wav")]
+    assert "a.flac" in capsys.readouterr().out
+
+
+def test_read_pairs_leaves_stdin_open(monkeypatch):
+    stdin = io.StringIO("a.wav b.wav\n")
+    monkeypatch.setattr(sys, "stdin", stdin)
+    assert read_pairs("-") == [("a.wav", "b.wav")]
+    assert not stdin.closed
+
+
+def test_json_number():
+    assert _json_number(2) == 2.0
+    assert _json_number(float("inf")) is None
+    assert _json_number(float("nan")) is None
+
+
+def test_failed_transcription_gives_an_error_record(tmp_path, monkeypatch):
+    paths = []
+    for name in ("a.wav", "b.wav"):
+        (tmp_path / name).write_bytes(b"")
+        paths.append(str(tmp_path / name))
+    monkeypatch.setattr(compare_batch, "_extract", lambda path, feature_dir, audio_dir: True)
+    monkeypatch.setattr(compare_batch, "_score_pair",
+                        lambda pair, feature_dir, audio_dir: (80.0, {"distance_dtw": None}))
+
+    def transcrire(path, modele, cache, decodeur, strict=False):
+        if path == paths[1]:
+            raise RuntimeError("decoder crashed")
+        return "bonjour", ["bonjour"], 1
+    monkeypatch.setattr(comparaison, "transcrire", transcrire)
+
+    output = io.StringIO()
+    verdicts = compare_pairs([tuple(paths)], output, feature_dir=str(tmp_path / "features"), audio_dir=None,
+                             transcription_dir=str(tmp_path / "transcriptions"), n_jobs=1)
+
+    record = json.loads(output.getvalue())
+    assert "decoder crashed" in record["error"]
+    assert "verdict" not in record and "text_ratio" not in record
+    assert record["distance_dtw"] is None
+    assert verdicts == {"error": 1}
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from dtw_engine import band_radius, dtw
+
+
+def naive_dtw(x, y, band=None):
+    """
+    Textbook O(n*m) dynamic programme, tracking the length of the optimal path.
+    """
+    n, m = len(x), len(y)
+    radius = band_radius(n, m, band)
+    D = np.full((n + 1, m + 1), np.inf)
+    L = np.zeros((n + 1, m + 1), dtype=int)
+    D[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(max(1, i - radius), min(m, i + radius) + 1):
+            cost = np.linalg.norm(x[i - 1] - y[j - 1])
+            prev = min((D[i - 1, j - 1], L[i - 1, j - 1]), (D[i - 1, j], L[i - 1, j]), (D[i, j - 1], L[i, j - 1]),
+                       key=lambda c: c[0])
+            D[i, j] = cost + prev[0]
+            L[i, j] = prev[1] + 1
+    return D[n, m], L[n, m]
+
+
+@pytest.mark.parametrize("n, m, band", [(1, 1, None), (1, 7, None), (12, 12, None), (20, 33, None),
+                                        (33, 20, None), (25, 30, 3), (30, 30, 0), (40, 25, 5)])
+def test_dtw_matches_naive_dp(n, m, band):
+    rng = np.random.default_rng(n * 100 + m)
+    x, y = rng.normal(size=(n, 4)), rng.normal(size=(m, 4))
+
+    dist, path_length = dtw(x, y, band=band)
+    expected_dist, expected_length = naive_dtw(x, y, band=band)
+
+    assert abs(dist - expected_dist) <= 1e-12 * max(1.0, expected_dist)
+    assert path_length == expected_length
+
+
+def test_dtw_abandon_above():
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=(30, 4)), rng.normal(size=(35, 4))
+    dist, path_length = dtw(x, y)
+
+    assert dtw(x, y, abandon_above=dist * 2) == (dist, path_length)
+    assert dtw(x, y, abandon_above=dist / 2) == (float("inf"), 0)
+
+
+def test_dtw_empty_sequence():
+    assert dtw(np.zeros((0, 3)), np.zeros((5, 3))) == (float("inf"), 0)
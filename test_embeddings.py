@@ -0,0 +1,35 @@
+import numpy as np
+
+from embeddings import EmbeddingIndex
+
+
+def test_search_add_remove():
+    index = EmbeddingIndex(3, capacity=2)
+    index.add("x", [1.0, 0.0, 0.0])
+    index.add("y", [0.0, 2.0, 0.0])
+    index.add("xy", [1.0, 1.0, 0.0])
+    assert len(index) == 3
+
+    top = index.search([1.0, 0.1, 0.0], k=2)
+    assert [name for name, _ in top] == ["x", "xy"]
+    assert top[0][1] > top[1][1]
+
+    index.remove("x")
+    assert "x" not in index and len(index) == 2
+    # The last row took the freed slot
+    assert index.search([0.0, 1.0, 0.0], k=1)[0][0] == "y"
+    np.testing.assert_allclose(np.linalg.norm(index.matrix, axis=1), 1.0, rtol=1e-6)
+
+
+def test_save_and_load(tmp_path):
+    index = EmbeddingIndex(2)
+    index.add("a", [3.0, 4.0], tag=[1, 2])
+    index.add("b", [0.0, 1.0])
+    prefix = str(tmp_path / "embeddings")
+    index.save(prefix)
+
+    loaded = EmbeddingIndex.load(prefix)
+    assert loaded.names == ["a", "b"]
+    assert loaded.tags["a"] == [1, 2]
+    np.testing.assert_allclose(loaded.matrix, index.matrix)
+    assert EmbeddingIndex.load(str(tmp_path / "missing")) is None
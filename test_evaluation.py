@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from evaluation import _trial_scores, eer, error_rates, gmm_matrix, split_enrollment, summarize
+
+# Sorted scores: 1 (n), 2 (n), 3 (t), 3.5 (n), 4 (t)
+TARGET = [4.0, 3.0]
+NONTARGET = [3.5, 1.0, 2.0]
+
+
+def test_error_rates_toy_set():
+    p_miss, p_fa, thresholds = error_rates(np.array(TARGET), np.array(NONTARGET))
+
+    np.testing.assert_array_equal(thresholds, [1.0, 2.0, 3.0, 3.5, 4.0, np.inf])
+    np.testing.assert_allclose(p_miss, [0, 0, 0, 0.5, 0.5, 1])
+    np.testing.assert_allclose(p_fa, [1, 2 / 3, 1 / 3, 1 / 3, 0, 0])
+
+
+def test_eer_toy_set():
+    rate, threshold = eer(*error_rates(np.array(TARGET), np.array(NONTARGET)))
+    assert rate == pytest.approx(1 / 3)
+    assert threshold == 3.5
+
+
+def test_eer_separable_scores():
+    rate, threshold = eer(*error_rates(np.array([5.0, 6.0]), np.array([1.0, 2.0])))
+    assert rate == 0.0
+    assert 2.0 < threshold <= 5.0
+
+
+def test_summarize_distances():
+    # DTW distances: lower is better, thresholds are returned as distances
+    report = summarize([1.0, 2.0], [5.0, 6.0], higher_is_better=False)
+    assert report["eer"] == 0.0
+    assert 2.0 <= report["eer_threshold"] < 5.0
+    assert summarize([], [1.0])["error"] == "not enough trials"
+
+
+def test_split_enrollment():
+    paths = ["a_1", "a_2", "a_3", "a_4", "b_1", "c_1", "c_2"]
+    labels = ["a", "a", "a", "a", "b", "c", "c"]
+    enrollment, trials = split_enrollment(paths, labels)
+    assert enrollment == {"a": ["a_1", "a_2"], "c": ["c_1"]}
+    # Single-take speakers are impostor trials only
+    assert trials == [2, 3, 4, 6]
+
+
+def test_trial_scores_skip_copies_of_enrollment_files():
+    # Trial 0 is a copy of one of a's enrollment files, trial 1 a genuine take
+    matrix = np.array([[9.0, 1.0], [5.0, np.nan]])
+    labels = ["a", "a"]
+    digests = ["copy", "other"]
+    enrolled = {"a": {"copy"}, "b": {"b1"}}
+    target, nontarget = _trial_scores(matrix, [0, 1], ["a", "b"], labels, digests, enrolled)
+    assert target == [5.0]
+    assert nontarget == [1.0]
+
+
+def test_gmm_matrix_refuses_non_empty_model_dir(tmp_path):
+    (tmp_path / "Random.gmm").write_bytes(b"model")
+    with pytest.raises(ValueError):
+        gmm_matrix(["a_1", "a_2"], ["a", "a"], model_dir=str(tmp_path))
+    assert (tmp_path / "Random.gmm").read_bytes() == b"model"
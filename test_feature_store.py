@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+
+from feature_store import FeatureCache, FeatureStore
+
+CONFIG = {"extractor": "test", "sr": 16000, "version": 1}
+
+
+def write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+
+def test_store_round_trip(tmp_path):
+    store = FeatureStore(str(tmp_path / "cache"))
+    audio = write(tmp_path / "a.wav", b"first take")
+    features = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+    assert store.load(audio, CONFIG) is None
+    store.save(audio, CONFIG, {"mfcc": features})
+    loaded = store.load(audio, CONFIG)
+
+    assert list(loaded) == ["mfcc"]
+    np.testing.assert_array_equal(loaded["mfcc"], features)
+    assert store.contains_digest(store.content_digest(audio), CONFIG)
+
+
+def test_store_invalidated_when_content_changes(tmp_path):
+    store = FeatureStore(str(tmp_path / "cache"))
+    audio = write(tmp_path / "a.wav", b"first take")
+    store.save(audio, CONFIG, {"mfcc": np.ones(3)})
+
+    # Re-recorded: same path, different content (and size, so the stat key changes too)
+    write(audio, b"second, longer take")
+    assert store.load(audio, CONFIG) is None
+
+
+def test_store_invalidated_when_config_changes(tmp_path):
+    store = FeatureStore(str(tmp_path / "cache"))
+    audio = write(tmp_path / "a.wav", b"first take")
+    store.save(audio, CONFIG, {"mfcc": np.ones(3)})
+
+    assert store.load(audio, dict(CONFIG, version=2)) is None
+    assert store.load(audio, dict(CONFIG, sr=22050)) is None
+    assert store.load(audio, dict(CONFIG)) is not None
+
+
+def test_store_keyed_by_content_not_path(tmp_path):
+    store = FeatureStore(str(tmp_path / "cache"))
+    audio = write(tmp_path / "a.wav", b"first take")
+    store.save(audio, CONFIG, {"mfcc": np.ones(3)})
+
+    # Copied or moved file, or only touched: still a hit
+    copy = write(tmp_path / "copy.wav", b"first take")
+    assert store.load(copy, CONFIG) is not None
+    os.utime(audio, ns=(0, 0))
+    assert store.load(audio, CONFIG) is not None
+
+def test_cache_dropped_when_file_changes(tmp_path):
+    cache = FeatureCache()
+    audio = write(tmp_path / "a.wav", b"first take")
+    cache.put(audio, np.ones(3))
+    assert cache.get(audio) is not None
+
+    write(audio, b"second, longer take")
+    assert cache.get(audio) is None
+    assert cache.invalidations == 1
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    a, b, c = (write(tmp_path / f"{name}.wav", name.encode()) for name in "abc")
+    cache = FeatureCache(max_bytes=2 * np.ones(3).nbytes)
+    cache.put(a, np.ones(3))
+    cache.put(b, np.ones(3))
+    assert cache.get(a) is not None  # b is now the least recently used
+
+    cache.put(c, np.ones(3))
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.evictions == 1
+    assert cache.current_bytes <= cache.max_bytes
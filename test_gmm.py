@@ -0,0 +1,61 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.mixture import GaussianMixture
+
+from embeddings import map_means
+from gmm import UBM_NAME, GMMVoiceAuth
+
+
+@pytest.fixture
+def ubm():
+    rng = np.random.default_rng(0)
+    return GaussianMixture(4, covariance_type="diag", random_state=0).fit(rng.normal(size=(400, 3)))
+
+
+def test_map_means_limits(ubm):
+    X = np.random.default_rng(1).normal(loc=0.5, size=(200, 3))
+
+    # No prior weight: one EM update of the means from the UBM posteriors
+    resp = ubm.predict_proba(X)
+    expected = (resp.T @ X) / resp.sum(axis=0)[:, None]
+    np.testing.assert_allclose(map_means(ubm, X, relevance_factor=0.0), expected, rtol=1e-9)
+
+    # Overwhelming prior weight: the UBM means are kept
+    np.testing.assert_allclose(map_means(ubm, X, relevance_factor=1e12), ubm.means_, atol=1e-9)
+
+
+def test_map_adapt_only_moves_means(ubm, tmp_path):
+    auth = GMMVoiceAuth(model_dir=str(tmp_path), feature_dir=None, audio_dir=None)
+    auth.models[UBM_NAME] = ubm
+    X = np.random.default_rng(2).normal(loc=1.0, size=(300, 3))
+
+    speaker = auth.map_adapt(X)
+
+    np.testing.assert_array_equal(speaker.weights_, ubm.weights_)
+    np.testing.assert_array_equal(speaker.covariances_, ubm.covariances_)
+    assert not np.allclose(speaker.means_, ubm.means_)
+    # The UBM itself is left untouched and the adapted model fits the speaker better
+    assert auth.models[UBM_NAME] is ubm
+    assert speaker.score(X) > ubm.score(X)
+
+
+def _store(auth, name, model):
+    joblib.dump(model, auth.models.path(name))
+    auth.models[name] = model
+
+
+def test_em_reenrollment_drops_the_embedding_row(ubm, tmp_path):
+    auth = GMMVoiceAuth(model_dir=str(tmp_path), feature_dir=None, audio_dir=None)
+    _store(auth, UBM_NAME, ubm)
+    X = np.random.default_rng(3).normal(loc=1.0, size=(300, 3))
+    _store(auth, "simon", auth.map_adapt(X))
+    assert "simon" in auth.embedding_index()
+
+    # Re-enrolled with plain EM: no longer comparable to the UBM
+    _store(auth, "simon", GaussianMixture(2, covariance_type="diag", random_state=0).fit(X))
+    assert "simon" not in auth.embedding_index()
+
+    # The saved index no longer holds the stale row either
+    reloaded = GMMVoiceAuth(model_dir=str(tmp_path), feature_dir=None, audio_dir=None)
+    assert "simon" not in reloaded.embedding_index()
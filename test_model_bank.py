@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from sklearn.mixture import GaussianMixture
+
+from model_bank import SpeakerModelBank
+
+
+def fitted(n_components, seed, n_features=5):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(loc=seed, size=(300, n_features))
+    return GaussianMixture(n_components, covariance_type="diag", random_state=seed).fit(X)
+
+
+def test_bank_matches_per_model_score():
+    # Different numbers of components exercise the zero-weight padding
+    models = {"a": fitted(4, 0), "b": fitted(2, 1), "c": fitted(3, 2)}
+    bank = SpeakerModelBank(models)
+    features = np.random.default_rng(3).normal(size=(200, 5))
+
+    scores = bank.score_dict(features)
+    assert list(scores) == ["a", "b", "c"]
+    for name, gmm in models.items():
+        assert scores[name] == pytest.approx(gmm.score(features), rel=1e-9)
+
+
+def test_bank_blocks_do_not_change_scores():
+    bank = SpeakerModelBank({"a": fitted(4, 0), "b": fitted(4, 1)})
+    features = np.random.default_rng(4).normal(size=(101, 5))
+    np.testing.assert_allclose(bank.score(features, max_block=8), bank.score(features), rtol=1e-12)
+
+
+def test_empty_bank_and_unsupported_covariance():
+    assert len(SpeakerModelBank({})) == 0
+    assert SpeakerModelBank({}).score(np.zeros((3, 5))).shape == (0,)
+
+    full = GaussianMixture(2, covariance_type="full").fit(np.random.default_rng(0).normal(size=(50, 2)))
+    with pytest.raises(ValueError):
+        SpeakerModelBank({"full": full})
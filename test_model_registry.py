@@ -0,0 +1,56 @@
+import os
+
+import joblib
+import numpy as np
+from sklearn.mixture import GaussianMixture
+
+from model_registry import ModelRegistry
+
+
+def save_models(model_dir, names):
+    rng = np.random.default_rng(0)
+    for seed, name in enumerate(names):
+        gmm = GaussianMixture(2, covariance_type="diag", random_state=seed).fit(rng.normal(loc=seed, size=(50, 3)))
+        joblib.dump(gmm, os.path.join(model_dir, f"{name}.gmm"))
+
+
+def test_discover_is_lazy(tmp_path):
+    save_models(tmp_path, ["a", "b"])
+    registry = ModelRegistry(str(tmp_path))
+
+    assert sorted(registry) == ["a", "b"]
+    assert registry.loads == 0
+    assert registry.get("missing") is None
+
+
+def test_evicted_model_is_reloaded_identical(tmp_path):
+    save_models(tmp_path, ["a", "b", "c"])
+    registry = ModelRegistry(str(tmp_path), max_models=2)
+
+    first = registry["a"]
+    means = first.means_.copy()
+    registry["b"]
+    registry["c"]
+    assert registry.stats()["resident"] == 2
+    assert registry.evictions == 1
+
+    # "a" was the least recently used: it comes back from disk, unchanged
+    reloaded = registry["a"]
+    assert reloaded is not first
+    np.testing.assert_array_equal(reloaded.means_, means)
+    assert registry.loads == 4
+
+
+def test_version_tracks_additions_not_loads(tmp_path):
+    save_models(tmp_path, ["a"])
+    registry = ModelRegistry(str(tmp_path), max_models=1)
+    version = registry.version
+
+    registry["a"]
+    assert registry.version == version
+
+    registry["new"] = registry["a"]
+    assert registry.version > version and "new" in registry
+    version = registry.version
+    del registry["new"]
+    assert registry.version > version and "new" not in registry
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from sklearn.mixture import GaussianMixture
+
+from online_verifier import OnlineVerifier
+
+
+@pytest.fixture(scope="module")
+def models():
+    rng = np.random.default_rng(0)
+    ubm = GaussianMixture(4, covariance_type="diag", random_state=0).fit(rng.normal(size=(2000, 3)))
+    speaker = GaussianMixture(4, covariance_type="diag", random_state=0).fit(rng.normal(loc=2.0, size=(2000, 3)))
+    return speaker, ubm
+
+
+def push_in_blocks(verifier, frames, rms=None, block=10):
+    for start in range(0, len(frames), block):
+        chunk_rms = None if rms is None else rms[start:start + block]
+        if verifier.push_frames(frames[start:start + block], chunk_rms) is not None:
+            return start + block
+    return len(frames)
+
+
+def test_early_accept_and_reject(models):
+    speaker, ubm = models
+    rng = np.random.default_rng(1)
+
+    genuine = OnlineVerifier(speaker, ubm, margin=0.0)
+    used = push_in_blocks(genuine, rng.normal(loc=2.0, size=(1000, 3)))
+    assert genuine.decision == "accept" and used < 1000
+
+    impostor = OnlineVerifier(speaker, ubm, margin=0.0)
+    used = push_in_blocks(impostor, rng.normal(loc=-1.0, size=(1000, 3)))
+    assert impostor.decision == "reject" and used < 1000
+
+
+def test_no_decision_before_min_frames(models):
+    speaker, ubm = models
+    verifier = OnlineVerifier(speaker, ubm, margin=0.0, min_frames=30)
+    assert verifier.push_frames(np.random.default_rng(2).normal(loc=2.0, size=(29, 3))) is None
+    assert verifier.finish() == "accept"
+
+
+def test_silent_frames_are_not_scored(models):
+    speaker, ubm = models
+    rng = np.random.default_rng(3)
+    # 50 loud speaker frames, then 200 frames 70 dB lower that would look like an impostor
+    frames = np.vstack([rng.normal(loc=2.0, size=(50, 3)), rng.normal(loc=-1.0, size=(200, 3))])
+    rms = np.concatenate([np.full(50, 0.3), np.full(200, 0.3 * 10 ** (-70 / 20))])
+
+    gated = OnlineVerifier(speaker, ubm, margin=0.0, min_frames=1000, trim_db=60)
+    push_in_blocks(gated, frames, rms)
+    assert gated.finish() == "accept"
+    assert gated.n_frames == 50 and gated.n_silent == 200
+
+    ungated = OnlineVerifier(speaker, ubm, margin=0.0, min_frames=1000)
+    push_in_blocks(ungated, frames, rms)
+    assert ungated.finish() == "reject"
+    assert ungated.n_frames == 250
+
+
+def test_leading_silence_below_floor_is_dropped(models):
+    speaker, ubm = models
+    rng = np.random.default_rng(4)
+    # Digital silence first: its own running peak cannot gate it, the absolute floor does
+    frames = np.vstack([rng.normal(loc=-1.0, size=(40, 3)), rng.normal(loc=2.0, size=(40, 3))])
+    rms = np.concatenate([np.full(40, 1e-6), np.full(40, 0.3)])
+
+    verifier = OnlineVerifier(speaker, ubm, margin=0.0, min_frames=1000, trim_db=60)
+    push_in_blocks(verifier, frames, rms)
+    assert verifier.finish() == "accept"
+    assert verifier.n_silent == 40
@@ -0,0 +1,72 @@
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+import dtw
+import gmm
+from streaming_features import ExtractorThread, StreamingFeatureExtractor
+
+SR = 16000
+
+
+@pytest.fixture
+def utterance():
+    """
+    Quiet noise, 1.5 s of harmonic "speech" with a varying pitch, quiet noise again.
+    """
+    rng = np.random.default_rng(0)
+    t = np.arange(int(1.5 * SR)) / SR
+    voiced = 0.3 * np.sin(2 * np.pi * (150 + 60 * np.sin(3 * t)) * t) + 0.05 * rng.normal(size=len(t))
+
+    def silence(seconds):
+        return 1e-4 * rng.normal(size=int(seconds * SR))
+
+    return np.concatenate([silence(0.4), voiced, silence(0.7)]).astype(np.float32)
+
+
+def stream(config, y, block=1000):
+    extractor = StreamingFeatureExtractor.from_config(config)
+    frames = [extractor.push(y[i:i + block]) for i in range(0, len(y), block)]
+    frames.append(extractor.finalize())
+    return extractor, np.vstack(frames)
+
+
+@pytest.mark.parametrize("module, offline", [(dtw, dtw.compute_dynamic_features), (gmm, gmm.compute_features)])
+def test_trimmed_features_match_offline_extractors(tmp_path, utterance, module, offline):
+    path = str(tmp_path / "take.wav")
+    sf.write(path, utterance, SR, subtype="FLOAT")
+
+    extractor, _ = stream(module.FEATURE_CONFIG, utterance)
+    features = extractor.features_for_config(module.FEATURE_CONFIG)
+    expected = offline(path, None, None)
+
+    assert features.shape == expected.shape
+    np.testing.assert_allclose(features, expected, atol=1e-3)
+
+
+def test_untrimmed_features_match_librosa(utterance):
+    extractor, _ = stream(dtw.FEATURE_CONFIG, utterance)
+    mfcc = librosa.feature.mfcc(y=utterance, sr=SR, n_mfcc=13)
+
+    np.testing.assert_allclose(extractor.features()[:, :13], mfcc.T, atol=1e-3)
+
+
+def test_pushed_frames_match_whole_utterance_when_loudest_first():
+    # With the loudest frame first, the running 80 dB floor is the utterance floor
+    rng = np.random.default_rng(1)
+    y = (np.linspace(0.5, 0.05, 2 * SR) * rng.normal(size=2 * SR)).astype(np.float32)
+    extractor, pushed = stream(gmm.FEATURE_CONFIG, y)
+
+    np.testing.assert_allclose(pushed, extractor.features(), atol=1e-6)
+
+
+def test_extractor_thread_matches_direct_push(utterance):
+    thread = ExtractorThread(StreamingFeatureExtractor.from_config(dtw.FEATURE_CONFIG))
+    for i in range(0, len(utterance), 1024):
+        thread.push(utterance[i:i + 1024, None])
+    extractor = thread.close()
+
+    direct, _ = stream(dtw.FEATURE_CONFIG, utterance, block=1024)
+    np.testing.assert_array_equal(extractor.features_for_config(dtw.FEATURE_CONFIG),
+                                  direct.features_for_config(dtw.FEATURE_CONFIG))
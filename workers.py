@@ -0,0 +1,34 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+
+def _safe_call(func, item):
+    try:
+        return func(item), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def map_files(func, paths, n_jobs=1):
+    """
+    Applies func to every path across a process pool, preserving the input order.
+
+    func must be picklable (module-level function or functools.partial of one).
+    Returns one (result, error) tuple per path: error is None on success, otherwise
+    the exception message, so one bad file never aborts the others.
+    n_jobs: number of worker processes (1 = in-process, None = one per core).
+    """
+    paths = list(paths)
+    if n_jobs is None:
+        n_jobs = default_jobs()
+    n_jobs = min(n_jobs, len(paths))
+
+    if n_jobs <= 1:
+        return [_safe_call(func, p) for p in paths]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(_safe_call, [func] * len(paths), paths))